@@ -0,0 +1,63 @@
+import random
+import time
+import tracemalloc
+from dataclasses import dataclass
+from common.models import KillfeedEvent, intern_id
+
+# run from repo root: python -m benchmarks.models_bench
+
+EVENTS = 1_000_000
+PLAYERS = 200
+
+
+# what KillfeedEvent used to be, with a fresh id string for every parsed line
+@dataclass
+class LegacyKillfeedEvent:
+    event_type: str
+    date: str
+    killer_id: str
+    user_name: str
+    killed_id: str
+    killed_user_name: str
+
+
+def make_events(event_cls, intern) -> list:
+    rng = random.Random(0)
+    events = []
+    for _ in range(EVENTS):
+        killer = rng.randrange(PLAYERS)
+        killed = rng.randrange(PLAYERS)
+        events.append(
+            event_cls(
+                "Killfeed",
+                "2024.10.12-21.33.28",
+                intern(f"SA{killer:012d}"),
+                "John Wayne",
+                intern(f"SA{killed:012d}"),
+                "Blattant Ottobloking",
+            )
+        )
+    return events
+
+
+def measure(label: str, event_cls, intern) -> int:
+    tracemalloc.start()
+    start = time.perf_counter()
+    events = make_events(event_cls, intern)
+    elapsed = time.perf_counter() - start
+    (current, _) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{label:<24} {current / 1024 / 1024:>10,.1f} MiB {elapsed:>8.2f}s for {len(events)} events"
+    )
+    return current
+
+
+def main():
+    legacy = measure("legacy dataclass", LegacyKillfeedEvent, lambda x: x)
+    compact = measure("slotted + interned", KillfeedEvent, intern_id)
+    print(f"memory saved: {1 - compact / legacy:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import time
+from datetime import datetime
+from common import parsers
+
+# run from repo root: python -m benchmarks.parsers_bench
+
+ITERATIONS = 100_000
+SAMPLES = {
+    "killfeed": "Killfeed: 2024.10.12-21.33.28: SA213123AKA872 (John Wayne (smartass)) killed ASDDU1231215GR (Blattant Ottobloking)",
+    "login": "Login: 2024.10.12-21.23.58: John Wayne (SA213123AKA872) logged in",
+    "chat": "Chat: SA213123AKA872, John Wayne, (ALL) gg, well fought",
+    "matchstate": "MatchState: In progress",
+}
+PARSERS = {
+    "killfeed": parsers.parse_killfeed_event,
+    "login": parsers.parse_login_event,
+    "chat": parsers.parse_chat_event,
+    "matchstate": parsers.parse_matchstate,
+}
+# what parse_event used to be built on, compiled again for every line
+LEGACY_GROK = {
+    "killfeed": r"%{WORD:event_type}: %{NOTSPACE:date}: (?:%{NOTSPACE:killer_id})? \(%{GREEDYDATA:user_name}\) killed (?:%{NOTSPACE:killed_id})? \(%{GREEDYDATA:killed_user_name}\)",
+    "login": r"%{WORD:event_type}: %{NOTSPACE:date}: %{GREEDYDATA:user_name} \(%{WORD:player_id}\) logged %{WORD:instance}",
+    "chat": r"%{WORD:event_type}: %{NOTSPACE:player_id}, %{GREEDYDATA:user_name}, \(%{WORD:channel}\) %{GREEDYDATA:message}",
+    "matchstate": r"MatchState: %{GREEDYDATA:state}",
+}
+
+
+def measure(label: str, fn, line: str, iterations: int = ITERATIONS) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(line)
+    elapsed = time.perf_counter() - start
+    rate = iterations / elapsed
+    print(f"{label:<28} {rate:>14,.0f} events/sec")
+    return rate
+
+
+def main():
+    try:
+        from pygrok import Grok
+    except ImportError:
+        Grok = None
+        print("pygrok not installed, skipping the legacy baseline")
+    print(f"{ITERATIONS} iterations per case")
+    for event, line in SAMPLES.items():
+        engine = measure(f"{event} (parser)", PARSERS[event], line)
+        if Grok is None:
+            continue
+        grok_pattern = LEGACY_GROK[event]
+        # a fraction of the iterations, building the pattern dominates
+        legacy = measure(
+            f"{event} (legacy grok)",
+            lambda x: Grok(grok_pattern).match(x),
+            line,
+            ITERATIONS // 100,
+        )
+        print(f"{event} speedup: {engine / legacy:.0f}x")
+    date = "2024.10.12-21.23.58"
+    sliced = measure("date (sliced)", parsers.parse_date.__wrapped__, date)
+    measure("date (cached)", parsers.parse_date, date)
+    legacy = measure(
+        "date (strptime)", lambda x: datetime.strptime(x, parsers.DATE_FORMAT), date
+    )
+    print(f"date speedup, uncached: {sliced / legacy:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
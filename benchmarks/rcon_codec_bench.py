@@ -0,0 +1,66 @@
+import struct
+import time
+from rcon import codec
+
+# run from repo root: python -m benchmarks.rcon_codec_bench
+
+ITERATIONS = 500_000
+SAMPLE_COMMAND = (
+    "say JohnWick has defeated KevinSpacey and claimed the vacant REX title"
+)
+SAMPLE_EVENT = "Killfeed: 2024.10.12-21.33.28: SA213123AKA872 (John Wayne (smartass)) killed ASDDU1231215GR (Blattant Ottobloking)"
+
+
+# what RconPacket.pack and RconClient.recv_pkt used to do
+def legacy_encode(pkt_id: int, pkt_type: int, body: str) -> bytes:
+    return struct.pack(
+        "<3i{0}s".format(len(body) + 2),
+        len(body) + 10,
+        pkt_id,
+        pkt_type,
+        bytearray(body, "utf-8"),
+    )
+
+
+def legacy_decode(header: bytes, body_bytes: bytes) -> tuple[int, int, str]:
+    (_, pkt_id, pkt_type) = struct.unpack("<3i", header)
+    body_raw = body_bytes.decode()
+    return (pkt_id, pkt_type, body_raw.rstrip("\x00").rstrip())
+
+
+def codec_decode(header: bytes, body_bytes: bytes) -> tuple[int, int, str]:
+    (_, pkt_id, pkt_type) = codec.decode_header(header)
+    return (pkt_id, pkt_type, codec.decode_body(body_bytes))
+
+
+def measure(label: str, fn) -> float:
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    rate = ITERATIONS / elapsed
+    print(f"{label:<28} {rate:>14,.0f} packets/sec")
+    return rate
+
+
+def main():
+    event_packet = codec.encode_packet(0, 0, SAMPLE_EVENT)
+    header_size = codec.HEADER_SIZE
+    header = event_packet[:header_size]
+    payload = event_packet[header_size:]
+    print(f"{ITERATIONS} iterations per case")
+    legacy_enc = measure(
+        "encode (legacy)", lambda i: legacy_encode(i, 2, SAMPLE_COMMAND)
+    )
+    codec_enc = measure(
+        "encode (codec)", lambda i: codec.encode_packet(i, 2, SAMPLE_COMMAND)
+    )
+    legacy_dec = measure("decode (legacy)", lambda i: legacy_decode(header, payload))
+    codec_dec = measure("decode (codec)", lambda i: codec_decode(header, payload))
+    measure("decode (codec, whole frame)", lambda i: codec.decode_packet(event_packet))
+    print(f"encode speedup: {codec_enc / legacy_enc:.2f}x")
+    print(f"decode speedup: {codec_dec / legacy_dec:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,23 +5,24 @@ from common import logger, parsers
 from common.compute import compute_time_txt
 from common.discord import make_embed
 from common.gc_shield import backtask
-from rcon.rcon_pool import RconConnectionPool
+from rcon.query_cache import RconQueryCache
+from rcon.rcon_pool import RconPriority
 import discord
 
 
 class InfoBoard(Board):
 
-    rcon_pool: RconConnectionPool
+    rcon_query_cache: RconQueryCache
 
     def __init__(
         self,
-        rcon_pool: RconConnectionPool,
+        rcon_query_cache: RconQueryCache,
         client: discord.Client,
         channel_id: int,
         time_interval: int | None = 60,
     ):
         super().__init__(client, channel_id, time_interval)
-        self.rcon_pool = rcon_pool
+        self.rcon_query_cache = rcon_query_cache
 
     @property
     def file_path(self) -> str:
@@ -33,20 +34,9 @@ class InfoBoard(Board):
                 raise ValueError(
                     "{self.__class__.__name__}: Channel {self._channel_id} not loaded"
                 )
-            server_info_raw = ""
-            player_list_raw = ""
-            client = await self.rcon_pool.get_client()
-            try:
-                server_info_raw = await client.execute("info")
-                player_list_raw = await client.execute("playerlist")
-            except Exception as e:
-                logger.error(
-                    f"[InfoBoard] Error obtaining server info and playerlist: {e}"
-                )
-                client.used = 120
-                raise e
-            finally:
-                await self.rcon_pool.release_client(client)
+            (server_info_raw, player_list_raw) = await self.rcon_query_cache.query_many(
+                ["info", "playerlist"], RconPriority.BACKGROUND
+            )
 
             server_info = parsers.parse_server_info(server_info_raw)
             if not server_info:
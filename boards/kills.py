@@ -71,7 +71,7 @@ class KillsScoreboard(Board):
                 f"{self.__class__.__name__}: Channel {self._channel_id} not loaded"
             )
         top_20_items: list[dict] = (
-            await self._kills_collection.find()
+            await self._kills_collection.find({}, {"kills": 0})
             .sort("kill_count", -1)
             .limit(20)
             .to_list()
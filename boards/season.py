@@ -104,7 +104,8 @@ class SeasonScoreboard(Board):
             return
         top_20_items: list[dict] = (
             await self._kills_collection.find(
-                {f"season.{self._season_cfg.name}": {"$exists": True}}
+                {f"season.{self._season_cfg.name}": {"$exists": True}},
+                {"kills": 0},
             )
             .sort(f"season.{self._season_cfg.name}.kill_count", -1)
             .limit(20)
@@ -1,6 +1,7 @@
 import numpy as np
 from itertools import takewhile
 import math
+from typing import Iterable
 
 
 def compute_gate(value: int, gates: list[int]) -> int | None:
@@ -133,3 +134,37 @@ def split_chunks(sample: str, chunk_size: int) -> list[str]:
             else:
                 batches.append(curr)
     return batches
+
+
+def compute_roster_diff(
+    known: dict[str, str], online: dict[str, str]
+) -> tuple[dict[str, str], dict[str, str]]:
+    """Players online but not known, and known but no longer online, as id -> name"""
+    joined = {
+        player_id: user_name
+        for (player_id, user_name) in online.items()
+        if player_id not in known
+    }
+    left = {
+        player_id: user_name
+        for (player_id, user_name) in known.items()
+        if player_id not in online
+    }
+    return (joined, left)
+
+
+def compute_untagged_name(user_name: str, tag_format: str, tags: Iterable[str]) -> str:
+    """user_name without any of the formatted tags put in front of it in game"""
+    for tag in tags:
+        if tag:
+            user_name = user_name.replace(tag_format.format(tag), "")
+    return user_name.strip() or user_name
+
+
+def compute_flush_interval(
+    rate: float, target_size: int, min_secs: float, max_secs: float
+) -> float:
+    """Seconds it takes to collect target_size items at rate per second, kept within bounds"""
+    if rate <= 0:
+        return max_secs
+    return min(max_secs, max(min_secs, target_size / rate))
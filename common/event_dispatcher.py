@@ -0,0 +1,90 @@
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable
+from reactivex import Observable, Subject
+from common import logger
+from common.metrics import METRICS
+from common.parsers import (
+    parse_chat_event,
+    parse_killfeed_event,
+    parse_login_event,
+    parse_matchstate,
+)
+
+MALFORMED_PREFIX = "<malformed>"
+
+
+@dataclass
+class EventRoute:
+    parser: Callable[[str], Any]
+    subject: Subject
+    # whether lines the parser couldn't make sense of are kept from subscribers
+    skip_unparsed: bool = False
+
+
+def line_prefix(line: str) -> str:
+    (prefix, separator, _) = line.partition(":")
+    if not separator or not prefix.isalnum() or len(prefix) > 32:
+        return MALFORMED_PREFIX
+    return prefix
+
+
+class EventDispatcher:
+    """Routes raw listener lines by prefix token to the parser and stream registered for it
+
+    Each line is classified and parsed once, the parsed event is multicast to
+    every subscriber of its stream
+    """
+
+    _routes: dict[str, EventRoute]
+    unknown: Counter[str]
+
+    def __init__(self) -> None:
+        self._routes = {}
+        self.unknown = Counter()
+
+    def register(
+        self, prefix: str, parser: Callable[[str], Any], skip_unparsed: bool = False
+    ) -> Observable:
+        if prefix in self._routes:
+            raise ValueError(f"Event prefix {prefix} already registered")
+        route = EventRoute(parser, Subject(), skip_unparsed)
+        self._routes[prefix] = route
+        return route.subject
+
+    def stream(self, prefix: str) -> Observable:
+        route = self._routes.get(prefix)
+        if route is None:
+            raise KeyError(f"No event registered for prefix {prefix}")
+        return route.subject
+
+    def on_next(self, value: str) -> None:
+        prefix = line_prefix(value)
+        route = self._routes.get(prefix)
+        if route is None:
+            self.unknown[prefix] += 1
+            METRICS.increment(f"events.unknown.{prefix}")
+            logger.debug(f"EventDispatcher: no route for '{value}'")
+            return
+        event = route.parser(value)
+        if event is None:
+            METRICS.increment(f"events.unparsed.{prefix}")
+            if route.skip_unparsed:
+                return
+        route.subject.on_next(event)
+
+    @classmethod
+    def with_default_events(cls) -> "EventDispatcher":
+        dispatcher = cls()
+        for prefix, (parser, skip_unparsed) in DEFAULT_EVENTS.items():
+            dispatcher.register(prefix, parser, skip_unparsed)
+        return dispatcher
+
+
+# prefix token -> (parser, skip_unparsed), new event types only need an entry here
+DEFAULT_EVENTS: dict[str, tuple[Callable[[str], Any], bool]] = {
+    "Killfeed": (parse_killfeed_event, False),
+    "Login": (parse_login_event, False),
+    "Chat": (parse_chat_event, True),
+    "MatchState": (parse_matchstate, False),
+}
@@ -0,0 +1,129 @@
+import bisect
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# upper bounds in milliseconds, anything slower lands in the overflow bucket
+DEFAULT_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class Histogram:
+    _bounds: tuple[float, ...]
+    _buckets: list[int]
+    count: int
+    total: float
+    min: float
+    max: float
+
+    def __init__(self, bounds: tuple[float, ...] = DEFAULT_BUCKETS_MS) -> None:
+        self._bounds = bounds
+        self._buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0
+
+    def observe(self, value: float):
+        self._buckets[bisect.bisect_left(self._bounds, value)] += 1
+        if not self.count or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    def percentile(self, percent: float) -> float:
+        """Upper bound of the bucket holding the given percentile, capped at the max seen"""
+        if not self.count:
+            return 0
+        target = self.count * percent / 100
+        seen = 0
+        for index, bucket_count in enumerate(self._buckets):
+            seen += bucket_count
+            if seen >= target:
+                if index < len(self._bounds):
+                    return min(self._bounds[index], self.max)
+                break
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": round(self.mean, 3),
+            "min": round(self.min, 3),
+            "max": round(self.max, 3),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "buckets": {
+                str(bound): bucket_count
+                for (bound, bucket_count) in zip([*self._bounds, "inf"], self._buckets)
+                if bucket_count
+            },
+        }
+
+
+class MetricsRegistry:
+    histograms: dict[str, Histogram]
+    counters: Counter[str]
+    # last reported value, for levels like queue depth
+    gauges: dict[str, float]
+    started: float
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self):
+        self.histograms = {}
+        self.counters = Counter()
+        self.gauges = {}
+        self.started = time.time()
+
+    def observe(self, name: str, value_ms: float):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(value_ms)
+
+    def increment(self, name: str, amount: int = 1):
+        self.counters[name] += amount
+
+    def set_gauge(self, name: str, value: float):
+        self.gauges[name] = value
+
+    @contextmanager
+    def timer(self, name: str):
+        """Observe the block's duration in ms under name, works around awaits too"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def snapshot(self, prefix: str = "") -> dict:
+        return {
+            "started": self.started,
+            "taken": time.time(),
+            "counters": {
+                name: value
+                for (name, value) in sorted(self.counters.items())
+                if name.startswith(prefix)
+            },
+            "gauges": {
+                name: value
+                for (name, value) in sorted(self.gauges.items())
+                if name.startswith(prefix)
+            },
+            "histograms": {
+                name: histogram.as_dict()
+                for (name, histogram) in sorted(self.histograms.items())
+                if name.startswith(prefix)
+            },
+        }
+
+
+METRICS = MetricsRegistry()
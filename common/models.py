@@ -1,9 +1,31 @@
+import sys
 from dataclasses import dataclass, field
+from typing import overload
 
 from common.compute import compute_time_txt
 
 
-@dataclass
+@overload
+def intern_id(player_id: str) -> str: ...
+
+
+@overload
+def intern_id(player_id: None) -> None: ...
+
+
+def intern_id(player_id: str | None) -> str | None:
+    """Same str object for every occurrence of a playfab id
+
+    Ids are interned as events are parsed, so the player store, killstreak tally and
+    kill buffers all key on one shared copy; unreferenced ids are still collected
+    """
+    if not player_id:
+        return player_id
+    return sys.intern(player_id)
+
+
+# events are multicast to every subscriber, frozen so none can change them under the others
+@dataclass(slots=True, frozen=True)
 class KillfeedEvent:
     event_type: str
     date: str
@@ -13,16 +35,18 @@ class KillfeedEvent:
     killed_user_name: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class LoginEvent:
     event_type: str
     date: str
     user_name: str
     player_id: str
     instance: str
+    # made up by the reconciler from a playerlist snapshot, the player didn't just join
+    reconciled: bool = False
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ChatEvent:
     event_type: str
     player_id: str
@@ -46,7 +70,7 @@ class Player:
     user_name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class KillRecord:
     player_id: str
     user_name: str
@@ -73,7 +97,6 @@ class KillScore(Player):
     kill_count: int
     death_count: int
     rank: int | None
-    kills: dict[str, int] = field(default_factory=dict)
     achievements: dict[str, int] = field(default_factory=dict)
     ratio: float | None = field(init=False)
 
@@ -1,6 +1,8 @@
+from collections import Counter
 from datetime import datetime
-from pygrok import Grok
+from functools import lru_cache
 import re
+from typing import Mapping
 from common.models import (
     ChatEvent,
     KillRecord,
@@ -8,64 +10,114 @@ from common.models import (
     LoginEvent,
     Player,
     ServerInfo,
+    intern_id,
 )
 from config_client.models import SeasonConfig
+from common.metrics import METRICS
 
-GROK_KILLFEED_EVENT = r"%{WORD:event_type}: %{NOTSPACE:date}: (?:%{NOTSPACE:killer_id})? \(%{GREEDYDATA:user_name}\) killed (?:%{NOTSPACE:killed_id})? \(%{GREEDYDATA:killed_user_name}\)"
-GROK_LOGIN_EVENT = r"%{WORD:event_type}: %{NOTSPACE:date}: %{GREEDYDATA:user_name} \(%{WORD:player_id}\) logged %{WORD:instance}"
+# compiled once, these expand the grok patterns the parsers were first written with
+# (WORD -> \b\w+\b, NOTSPACE -> \S+, GREEDYDATA -> .*) and match the same way, unanchored
+KILLFEED_EVENT = re.compile(
+    r"(?P<event_type>\b\w+\b): (?P<date>\S+): (?:(?P<killer_id>\S+))? \((?P<user_name>.*)\) killed (?:(?P<killed_id>\S+))? \((?P<killed_user_name>.*)\)"
+)
+LOGIN_EVENT = re.compile(
+    r"(?P<event_type>\b\w+\b): (?P<date>\S+): (?P<user_name>.*) \((?P<player_id>\b\w+\b)\) logged (?P<instance>\b\w+\b)"
+)
 DATE_FORMAT = r"%Y.%m.%d-%H.%M.%S"
-GROK_CHAT_EVENT = r"%{WORD:event_type}: %{NOTSPACE:player_id}, %{GREEDYDATA:user_name}, \(%{WORD:channel}\) %{GREEDYDATA:message}"
-GROK_SERVER_INFO = r"HostName: %{GREEDYDATA:host}\nServerName: %{GREEDYDATA:server_name}\nVersion: %{GREEDYDATA:version}\nGameMode: %{GREEDYDATA:game_mode}\nMap: %{GREEDYDATA:map}"
-GROK_PLAYERLIST_ROW = (
-    r"%{NOTSPACE:player_id}, %{GREEDYDATA:user_name}, %{GREEDYDATA}, %{GREEDYDATA}"
+# YYYY.MM.DD-HH.MM.SS as the server writes it, always zero padded
+# every third character from the 5th on is a separator
+DATE_SEPARATORS = "..-.."
+DATE_LENGTH = 19
+# a login storm repeats the same second many times over
+DATE_CACHE_SIZE = 64
+CHAT_EVENT = re.compile(
+    r"(?P<event_type>\b\w+\b): (?P<player_id>\S+), (?P<user_name>.*), \((?P<channel>\b\w+\b)\) (?P<message>.*)"
 )
-GROK_MATCHSTATE = r"MatchState: %{GREEDYDATA:state}"
+SERVER_INFO = re.compile(
+    r"HostName: (?P<host>.*)\nServerName: (?P<server_name>.*)\nVersion: (?P<version>.*)\nGameMode: (?P<game_mode>.*)\nMap: (?P<map>.*)"
+)
+PLAYERLIST_ROW = re.compile(r"(?P<player_id>\S+), (?P<user_name>.*), .*, .*")
+MATCHSTATE = re.compile(r"MatchState: (?P<state>.*)")
 
 
-def parse_event(event: str, grok_pattern: str) -> tuple[bool, dict[str, str] | None]:
-    pattern = Grok(grok_pattern)
-    match = pattern.match(event)
+def parse_event(
+    event: str, pattern: re.Pattern[str]
+) -> tuple[bool, dict[str, str] | None]:
+    match = pattern.search(event)
     if not match:
-        return (False, match)
+        return (False, None)
     else:
-        return (True, match)
+        return (True, match.groupdict())
 
 
 def parse_killfeed_event(event: str) -> KillfeedEvent | None:
-    (success, parsed) = parse_event(event, GROK_KILLFEED_EVENT)
+    METRICS.increment("parsers.killfeed")
+    (success, parsed) = parse_event(event, KILLFEED_EVENT)
     if not success or not parsed:
         return None
+    parsed["killer_id"] = intern_id(parsed["killer_id"])
+    parsed["killed_id"] = intern_id(parsed["killed_id"])
     return KillfeedEvent(**parsed)
 
 
 def parse_login_event(event: str) -> LoginEvent | None:
-    (success, parsed) = parse_event(event, GROK_LOGIN_EVENT)
+    METRICS.increment("parsers.login")
+    (success, parsed) = parse_event(event, LOGIN_EVENT)
     if not success or not parsed:
         return None
-    return LoginEvent(**parsed)
+    return LoginEvent(
+        parsed["event_type"],
+        parsed["date"],
+        parsed["user_name"],
+        intern_id(parsed["player_id"]),
+        parsed["instance"],
+    )
 
 
 def parse_chat_event(event: str) -> ChatEvent | None:
+    METRICS.increment("parsers.chat")
     without_new_lines = r" \ ".join(event.splitlines())
-    (success, parsed) = parse_event(without_new_lines, GROK_CHAT_EVENT)
+    (success, parsed) = parse_event(without_new_lines, CHAT_EVENT)
     if not success or not parsed:
         return None
+    parsed["player_id"] = intern_id(parsed["player_id"])
     return ChatEvent(**parsed)
 
 
+@lru_cache(maxsize=DATE_CACHE_SIZE)
 def parse_date(date_str: str) -> datetime:
-    return datetime.strptime(date_str, DATE_FORMAT)
+    """Parse DATE_FORMAT by slicing its fixed width fields, strptime takes whatever doesn't fit"""
+    if len(date_str) != DATE_LENGTH or date_str[4::3] != DATE_SEPARATORS:
+        return datetime.strptime(date_str, DATE_FORMAT)
+    digits = (
+        date_str[0:4]
+        + date_str[5:7]
+        + date_str[8:10]
+        + date_str[11:13]
+        + date_str[14:16]
+        + date_str[17:19]
+    )
+    if not digits.isascii() or not digits.isdigit():
+        return datetime.strptime(date_str, DATE_FORMAT)
+    return datetime(
+        int(digits[0:4]),
+        int(digits[4:6]),
+        int(digits[6:8]),
+        int(digits[8:10]),
+        int(digits[10:12]),
+        int(digits[12:14]),
+    )
 
 
 def parse_server_info(raw: str) -> ServerInfo | None:
-    (success, parsed) = parse_event(raw, GROK_SERVER_INFO)
+    (success, parsed) = parse_event(raw, SERVER_INFO)
     if not success or not parsed:
         return None
     return ServerInfo(**parsed)
 
 
 def parse_playerlist_row(raw: str) -> Player | None:
-    (success, parsed) = parse_event(raw, GROK_PLAYERLIST_ROW)
+    (success, parsed) = parse_event(raw, PLAYERLIST_ROW)
     if not success or not parsed:
         return None
     return Player(**parsed)
@@ -78,12 +130,22 @@ def parse_playerlist(raw: str) -> list[Player]:
 
 
 def parse_matchstate(raw: str) -> str | None:
-    (success, parsed) = parse_event(raw, GROK_MATCHSTATE)
+    METRICS.increment("parsers.matchstate")
+    (success, parsed) = parse_event(raw, MATCHSTATE)
     if not success or not parsed:
         return None
     return parsed.get("state", None)
 
 
+def transform_death_count_to_db(
+    player_id: str, count: int, season: SeasonConfig | None = None
+) -> dict:
+    death_update = {"$set": {"playfab_id": player_id}, "$inc": {"death_count": count}}
+    if season and season.is_active:
+        death_update["$inc"][f"season.{season.name}.death_count"] = count
+    return death_update
+
+
 def transform_kill_record_to_db(
     record: KillRecord, season: SeasonConfig | None = None
 ) -> tuple[list[dict], dict]:
@@ -96,11 +158,7 @@ def transform_kill_record_to_db(
 
     total = 0
     for id, count in record.kills.items():
-        update["$inc"][f"kills.{id}"] = count
-        death_update = {"$set": {"playfab_id": id}, "$inc": {"death_count": count}}
-        death_updates.append(death_update)
-        if season and season.is_active:
-            death_update["$inc"][f"season.{season.name}.death_count"] = count
+        death_updates.append(transform_death_count_to_db(id, count, season))
         total += count
     update["$inc"]["kill_count"] = total
     if season and season.is_active:
@@ -108,5 +166,44 @@ def transform_kill_record_to_db(
     return (death_updates, update)
 
 
+def transform_kill_edges_to_db(
+    record: KillRecord, player_ids: Mapping[str, int]
+) -> list[dict]:
+    """Kill edges keyed by the players' dense ids, see db_kills.player_ids"""
+    killer_id = player_ids[record.player_id]
+    return [
+        {
+            "$set": {"killer_id": killer_id, "victim_id": player_ids[id]},
+            "$inc": {"count": count},
+        }
+        for id, count in record.kills.items()
+    ]
+
+
+def transform_kill_records_to_db(
+    records: list[KillRecord],
+    player_ids: Mapping[str, int],
+    season: SeasonConfig | None = None,
+    unattributed_deaths: Mapping[str, int] | None = None,
+) -> tuple[list[dict], list[dict], list[dict]]:
+    """Like transform_kill_record_to_db for a whole batch, with one death update per victim
+
+    unattributed_deaths are deaths with no killer id, counted for the victim only
+    returns (death updates, killer updates, kill edge updates)
+    """
+    updates = []
+    edge_updates = []
+    deaths: Counter[str] = Counter(unattributed_deaths or {})
+    for record in records:
+        (_, update) = transform_kill_record_to_db(record, season)
+        updates.append(update)
+        edge_updates.extend(transform_kill_edges_to_db(record, player_ids))
+        deaths.update(record.kills)
+    death_updates = [
+        transform_death_count_to_db(id, count, season) for id, count in deaths.items()
+    ]
+    return (death_updates, updates, edge_updates)
+
+
 def is_playfab_id_format(arg: str):
     return re.search(r"^([A-Z0-9]{14,16})+$", arg) is not None
@@ -0,0 +1,148 @@
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from common import logger
+from config_client.models import SeasonConfig
+from db_kills.kill_edges import KILL_EDGE_INDEXES, KILL_EDGES_COLLECTION
+from db_kills.player_ids import PLAYER_ID_INDEXES, PLAYER_IDS_COLLECTION
+
+# collection -> indexes the suite's queries rely on, created on startup
+REQUIRED_INDEXES: dict[str, list[IndexModel]] = {
+    "kills": [
+        IndexModel([("playfab_id", ASCENDING)], name="playfab_id"),
+        IndexModel([("kill_count", DESCENDING)], name="kill_count"),
+    ],
+    "playtime": [
+        IndexModel([("playfab_id", ASCENDING)], name="playfab_id"),
+        IndexModel([("minutes", DESCENDING)], name="minutes"),
+    ],
+    "live_session": [
+        IndexModel(
+            [("playfab_id", ASCENDING), ("login", DESCENDING)],
+            name="playfab_id_login",
+        ),
+    ],
+    KILL_EDGES_COLLECTION: KILL_EDGE_INDEXES,
+    PLAYER_IDS_COLLECTION: PLAYER_ID_INDEXES,
+}
+SEASON_INDEX_PREFIX = "season_"
+
+
+def season_index_name(season: SeasonConfig) -> str:
+    return f"{SEASON_INDEX_PREFIX}{season.name}_kill_count"
+
+
+def season_indexes(season: SeasonConfig) -> dict[str, list[IndexModel]]:
+    """Season boards only rank the players that took part, so does the index"""
+    season_key = f"season.{season.name}"
+    return {
+        "kills": [
+            IndexModel(
+                [(f"{season_key}.kill_count", DESCENDING)],
+                name=season_index_name(season),
+                partialFilterExpression={season_key: {"$exists": True}},
+            )
+        ]
+    }
+
+
+def required_indexes(
+    season: SeasonConfig | None = None,
+) -> dict[str, list[IndexModel]]:
+    indexes = {name: list(models) for (name, models) in REQUIRED_INDEXES.items()}
+    if season:
+        for name, models in season_indexes(season).items():
+            indexes.setdefault(name, []).extend(models)
+    return indexes
+
+
+def is_managed_index(index_name: str, managed: list[IndexModel]) -> bool:
+    return index_name.startswith(SEASON_INDEX_PREFIX) or index_name in [
+        model.document["name"] for model in managed
+    ]
+
+
+def _index_spec(index: dict) -> tuple:
+    # index_information and IndexModel.document describe an index the same way, keys aside
+    key = [(field, int(direction)) for (field, direction) in dict(index["key"]).items()]
+    return (key, bool(index.get("unique", False)), index.get("partialFilterExpression"))
+
+
+async def _create_indexes(
+    collection: AsyncIOMotorCollection, models: list[IndexModel]
+) -> dict[str, str]:
+    """Create every index that is missing, returns index name -> error of those that failed"""
+    failures: dict[str, str] = {}
+    for model in models:
+        index_name = model.document["name"]
+        try:
+            # creating an index that already exists with the same spec does nothing
+            await collection.create_indexes([model])
+        except Exception as e:
+            logger.error(
+                f"Failed to create index {index_name} on {collection.name}: {e}"
+            )
+            failures[f"{collection.name}.{index_name}"] = str(e)
+    return failures
+
+
+async def ensure_indexes(
+    database: AsyncIOMotorDatabase, season: SeasonConfig | None = None
+) -> dict[str, str]:
+    failures: dict[str, str] = {}
+    for name, models in required_indexes(season).items():
+        failures.update(await _create_indexes(database[name], models))
+    return failures
+
+
+async def ensure_season_indexes(
+    database: AsyncIOMotorDatabase, season: SeasonConfig
+) -> dict[str, str]:
+    failures: dict[str, str] = {}
+    for name, models in season_indexes(season).items():
+        failures.update(await _create_indexes(database[name], models))
+    return failures
+
+
+async def rebuild_indexes(
+    database: AsyncIOMotorDatabase, season: SeasonConfig | None = None
+) -> dict[str, str]:
+    """Bring the indexes the suite manages in line with their definitions, other indexes are left alone
+
+    Missing indexes are created and those defined differently are dropped and created
+    again, except unique ones: upserts rely on them while the bot runs, a changed unique
+    index is reported instead. Indexes of past seasons are dropped.
+    returns "collection.index" -> error of every index that could not be brought in line
+    """
+    failures: dict[str, str] = {}
+    for name, models in required_indexes(season).items():
+        collection = database[name]
+        wanted = {model.document["name"]: model.document for model in models}
+        existing = await collection.index_information()
+        for index_name, index in existing.items():
+            if not is_managed_index(index_name, models):
+                continue
+            if index_name in wanted and _index_spec(index) == _index_spec(
+                wanted[index_name]
+            ):
+                continue
+            if index.get("unique", False):
+                failures[f"{name}.{index_name}"] = (
+                    "unique index differs from its definition, drop it by hand"
+                )
+                continue
+            try:
+                await collection.drop_index(index_name)
+            except Exception as e:
+                logger.error(f"Failed to drop index {index_name} on {name}: {e}")
+                failures[f"{name}.{index_name}"] = str(e)
+        failures.update(
+            await _create_indexes(
+                collection,
+                [
+                    model
+                    for model in models
+                    if f"{name}.{model.document['name']}" not in failures
+                ],
+            )
+        )
+    return failures
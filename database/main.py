@@ -1,7 +1,9 @@
 from motor.motor_asyncio import (
     AsyncIOMotorClient,
+    AsyncIOMotorCollection,
     AsyncIOMotorDatabase,
 )
+from pymongo.errors import OperationFailure
 from config_client.data import bot_config
 
 
@@ -16,3 +18,29 @@ def load_db() -> AsyncIOMotorDatabase:
     db_client = AsyncIOMotorClient(db_connection)
     database = db_client[db_name]
     return database
+
+
+STORAGE_STATS = ("count", "size", "storageSize", "totalIndexSize")
+
+
+async def _storage_stats(collection: AsyncIOMotorCollection) -> dict:
+    try:
+        stats = await collection.aggregate(
+            [{"$collStats": {"storageStats": {}}}]
+        ).to_list()
+    except OperationFailure:
+        # collection doesn't exist yet
+        stats = []
+    return stats[0].get("storageStats", {}) if stats else {}
+
+
+async def get_storage_stats(collection: AsyncIOMotorCollection) -> dict[str, int]:
+    """Document count and bytes taken by a collection, zeros if it doesn't exist yet"""
+    storage = await _storage_stats(collection)
+    return {key: storage.get(key, 0) for key in STORAGE_STATS}
+
+
+async def get_index_sizes(collection: AsyncIOMotorCollection) -> dict[str, int]:
+    """Bytes taken by each index of a collection, by index name"""
+    storage = await _storage_stats(collection)
+    return dict(storage.get("indexSizes", {}))
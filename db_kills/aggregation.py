@@ -1,29 +1,46 @@
-def get_killed_players_pipeline(playfab_id: str):
+from db_kills.player_ids import PLAYER_IDS_COLLECTION
+
+
+def get_killed_players_pipeline(playfab_id: str, player_id: int):
+    """Runs on the kill edges collection, player_id being the dense id of playfab_id"""
     return [
-        {"$match": {"playfab_id": playfab_id}},
+        {"$match": {"killer_id": player_id}},
+        {"$sort": {"count": -1}},
         {
-            "$project": {
-                "kills": {"$objectToArray": "$kills"},
-                "killer_name": "$user_name",
+            "$lookup": {
+                "from": PLAYER_IDS_COLLECTION,
+                "localField": "victim_id",
+                "foreignField": "_id",
+                "as": "victim",
             }
         },
-        {"$unwind": {"path": "$kills"}},
+        {"$unwind": {"path": "$victim"}},
         {
             "$lookup": {
                 "from": "kills",
-                "localField": "kills.k",
+                "localField": "victim.playfab_id",
                 "foreignField": "playfab_id",
                 "as": "player",
             }
         },
         {"$unwind": {"path": "$player"}},
+        {
+            "$lookup": {
+                "from": "kills",
+                "pipeline": [
+                    {"$match": {"playfab_id": playfab_id}},
+                    {"$project": {"_id": 0, "user_name": 1}},
+                ],
+                "as": "killer",
+            }
+        },
+        {"$unwind": {"path": "$killer"}},
         {
             "$project": {
                 "user_name": "$player.user_name",
                 "playfab_id": "$player.playfab_id",
-                "times_killed": "$kills.v",
-                "killer_name": 1,
+                "times_killed": "$count",
+                "killer_name": "$killer.user_name",
             }
         },
-        {"$sort": {"times_killed": -1}},
     ]
@@ -0,0 +1,159 @@
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from common import logger
+from common.metrics import METRICS
+from db_kills.player_ids import PlayerIds
+
+# one document per killer and victim pair: {killer_id, victim_id, count}, ids as
+# handed out by db_kills.player_ids
+KILL_EDGES_COLLECTION = "kill_edges"
+KILL_EDGE_INDEXES = [
+    IndexModel(
+        [("killer_id", ASCENDING), ("victim_id", ASCENDING)],
+        name="killer_victim",
+        unique=True,
+    ),
+    IndexModel([("killer_id", ASCENDING), ("count", DESCENDING)], name="killer_count"),
+]
+# kills documents, or edges keyed by playfab id, migrated per round and the pause between rounds
+MIGRATION_BATCH_SIZE = 100
+EDGE_MIGRATION_BATCH_SIZE = 1000
+# startup and the admin command may both ask for a migration
+_migration_lock = asyncio.Lock()
+MIGRATION_PAUSE_SECS = 0.1
+
+
+def _merged_edge(killer_id: int, victim_id: int, count: int, source) -> UpdateOne:
+    # adds the count of a source once, running the migration again leaves the edge as is
+    merged = {"$ifNull": ["$merged", []]}
+    return UpdateOne(
+        {"killer_id": killer_id, "victim_id": victim_id},
+        [
+            {
+                "$set": {
+                    "count": {
+                        "$cond": [
+                            {"$in": [source, merged]},
+                            "$count",
+                            {"$add": [{"$ifNull": ["$count", 0]}, count]},
+                        ]
+                    },
+                    "merged": {"$setUnion": [merged, [source]]},
+                }
+            }
+        ],
+        upsert=True,
+    )
+
+
+async def _migrate_kills_maps(
+    kills_collection: AsyncIOMotorCollection,
+    edges_collection: AsyncIOMotorCollection,
+    player_ids: PlayerIds,
+) -> int:
+    """Kill edges out of the kills map legacy kills documents carry"""
+    migrated_edges = 0
+    while True:
+        records: list[dict] = (
+            await kills_collection.find(
+                {"kills": {"$exists": True}}, {"playfab_id": 1, "kills": 1}
+            )
+            .limit(MIGRATION_BATCH_SIZE)
+            .to_list()
+        )
+        if not records:
+            return migrated_edges
+        ids = await player_ids.encode_many(
+            {record.get("playfab_id") for record in records}.union(
+                *[record.get("kills", {}).keys() for record in records]
+            )
+        )
+        # records without a playfab id (bot kills of old) have no edges to keep
+        operations = [
+            _merged_edge(
+                ids[record["playfab_id"]],
+                ids[victim_id],
+                count,
+                f"kills:{record['playfab_id']}",
+            )
+            for record in records
+            if record.get("playfab_id") in ids
+            for (victim_id, count) in record.get("kills", {}).items()
+            if victim_id in ids
+        ]
+        if operations:
+            await edges_collection.bulk_write(operations, ordered=False)
+        # only once every edge of a record is written
+        await kills_collection.update_many(
+            {"_id": {"$in": [record["_id"] for record in records]}},
+            {"$unset": {"kills": ""}},
+        )
+        METRICS.increment("db_kills.migrated_edges", len(operations))
+        migrated_edges += len(operations)
+        await asyncio.sleep(MIGRATION_PAUSE_SECS)
+
+
+async def _encode_playfab_id_edges(
+    edges_collection: AsyncIOMotorCollection, player_ids: PlayerIds
+) -> int:
+    """Kill edges still keyed by playfab ids rewritten with dense ids"""
+    encoded_edges = 0
+    while True:
+        edges: list[dict] = (
+            await edges_collection.find({"killer_id": {"$type": "string"}})
+            .limit(EDGE_MIGRATION_BATCH_SIZE)
+            .to_list()
+        )
+        if not edges:
+            return encoded_edges
+        ids = await player_ids.encode_many(
+            {edge["killer_id"] for edge in edges}
+            | {edge.get("victim_id") for edge in edges}
+        )
+        operations = [
+            _merged_edge(
+                ids[edge["killer_id"]],
+                ids[edge["victim_id"]],
+                edge.get("count", 0),
+                edge["_id"],
+            )
+            for edge in edges
+            if edge["killer_id"] in ids and edge.get("victim_id") in ids
+        ]
+        if operations:
+            await edges_collection.bulk_write(operations, ordered=False)
+        await edges_collection.delete_many(
+            {"_id": {"$in": [edge["_id"] for edge in edges]}}
+        )
+        METRICS.increment("db_kills.encoded_edges", len(edges))
+        encoded_edges += len(edges)
+        await asyncio.sleep(MIGRATION_PAUSE_SECS)
+
+
+async def migrate_kill_edges(
+    kills_collection: AsyncIOMotorCollection,
+    edges_collection: AsyncIOMotorCollection,
+    player_ids: PlayerIds,
+) -> tuple[int, int]:
+    """Move every kills map, and every edge keyed by playfab ids, into encoded kill edges
+
+    Safe to interrupt and run again: sources are only removed once their edges are
+    written, and an edge only takes the count of each source once.
+    returns (edges migrated from kills maps, edges encoded)
+    """
+    async with _migration_lock:
+        migrated_edges = await _migrate_kills_maps(
+            kills_collection, edges_collection, player_ids
+        )
+        encoded_edges = await _encode_playfab_id_edges(edges_collection, player_ids)
+        if migrated_edges or encoded_edges:
+            # every source is gone, nothing left to count twice
+            await edges_collection.update_many(
+                {"merged": {"$exists": True}}, {"$unset": {"merged": ""}}
+            )
+    if migrated_edges or encoded_edges:
+        logger.info(
+            f"DbKills - Migrated {migrated_edges} kill edges from kills maps, encoded {encoded_edges} kill edges"
+        )
+    return (migrated_edges, encoded_edges)
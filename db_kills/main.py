@@ -1,32 +1,108 @@
 import asyncio
+import time
+from collections import Counter
 from reactivex import Observable
 from motor.motor_asyncio import (
     AsyncIOMotorCollection,
 )
 from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from common.gc_shield import backtask
 from common.models import KillRecord, PlayerStore, KillfeedEvent
 from common import logger, parsers
+from common.compute import compute_flush_interval
+from common.metrics import METRICS
+from db_kills.player_ids import PlayerIds
+from rcon.event_journal import (
+    LINE_RECEIVED_AT,
+    read_checkpoint,
+    read_journal,
+    write_checkpoint,
+)
 from seasons.season_controller import SEASON_TOPIC, SeasonEvent
 from config_client.models import SeasonConfig
 
 
+# records everything received before it made it to the kills collection
+JOURNAL_CHECKPOINT = "db_kills"
+# kills buffered before a flush is forced, bounds memory and what a crash can lose
+DEFAULT_FLUSH_MAX_KILLS = 500
+DEFAULT_FLUSH_MAX_SECS = 60
+FLUSH_MIN_SECS = 5
+# busy servers write about this many kills at once, quiet ones wait up to the max age
+FLUSH_TARGET_KILLS = 100
+# weight of the latest flush in the kill rate estimate
+KILL_RATE_SMOOTHING = 0.3
+# operations per bulk write, and bulk writes in flight at once
+WRITE_CHUNK_SIZE = 500
+WRITE_CONCURRENCY = 4
+
+
+def _newest(received_at: float | None, other: float | None) -> float | None:
+    if received_at is None or other is None:
+        return received_at if other is None else other
+    return max(received_at, other)
+
+
 class DbKills:
     _collection: AsyncIOMotorCollection
-    _pending_records: list[KillRecord]
+    _edges_collection: AsyncIOMotorCollection
+    _player_ids: PlayerIds
+    # killer id -> kills since the last flush
+    _pending_records: dict[str, KillRecord]
+    # victim id -> deaths with no killer id since the last flush
+    _unattributed_deaths: Counter[str]
+    _pending_kills: int
+    # journal receive time of the newest line folded into the pending records
+    _pending_received_at: float | None
+    # newest receive time flushed but not checkpointed, held while writes are unconfirmed
+    _unsaved_received_at: float | None
+    # written but not confirmed by the DB, sent again with the next flush
+    _unconfirmed_kill_ops: list[UpdateOne]
+    _unconfirmed_death_ops: list[UpdateOne]
+    _unconfirmed_edge_ops: list[UpdateOne]
+    _flush_requested: asyncio.Event
+    _flush_max_kills: int
+    _flush_max_secs: float
+    _kill_rate: float
+    _last_flush_at: float
     _bot_index = 0
     _player_store: PlayerStore
     _season: SeasonConfig | None = None
+    _journal_directory: str | None
+    _created_at: float
 
     def __init__(
         self,
         db_collection: AsyncIOMotorCollection,
+        edges_collection: AsyncIOMotorCollection,
+        player_ids: PlayerIds,
         killfeed_observable: Observable[KillfeedEvent | None],
         player_store: PlayerStore,
         season: SeasonConfig | None,
+        journal_directory: str | None = None,
+        flush_max_kills: int = DEFAULT_FLUSH_MAX_KILLS,
+        flush_max_secs: float = DEFAULT_FLUSH_MAX_SECS,
     ):
-        self._pending_records = []
+        self._pending_records = {}
+        self._unattributed_deaths = Counter()
+        self._pending_kills = 0
+        self._pending_received_at = None
+        self._unsaved_received_at = None
+        self._unconfirmed_kill_ops = []
+        self._unconfirmed_death_ops = []
+        self._unconfirmed_edge_ops = []
+        self._flush_requested = asyncio.Event()
+        self._flush_max_kills = max(1, flush_max_kills)
+        self._flush_max_secs = max(FLUSH_MIN_SECS, flush_max_secs)
+        self._kill_rate = 0
+        self._last_flush_at = time.time()
+        self._journal_directory = journal_directory
+        # anything journaled from here on also reaches us live
+        self._created_at = time.time()
         self._collection = db_collection
+        self._edges_collection = edges_collection
+        self._player_ids = player_ids
         self._player_store = player_store
         self._season = season
 
@@ -36,7 +112,7 @@ class DbKills:
         SEASON_TOPIC.subscribe(_load_season)
 
         def _launch_kill_feed_task(event: KillfeedEvent | None):
-            backtask(self._process_killfeed(event))
+            backtask(self._process_killfeed(event, LINE_RECEIVED_AT.get()))
 
         killfeed_observable.subscribe(_launch_kill_feed_task)
 
@@ -46,62 +122,263 @@ class DbKills:
         else:
             self._season = await SeasonConfig.aload()
 
+    def _flush_interval(self) -> float:
+        return compute_flush_interval(
+            self._kill_rate, FLUSH_TARGET_KILLS, FLUSH_MIN_SECS, self._flush_max_secs
+        )
+
     async def _start_process(self):
         while True:
-            await asyncio.sleep(60)
-            records = [*self._pending_records]
-            self._pending_records = []
-            tasks = []
-            for record in records:
-                (death_updates, mutation) = parsers.transform_kill_record_to_db(
-                    record, self._season
+            try:
+                async with asyncio.timeout(self._flush_interval()):
+                    await self._flush_requested.wait()
+            except TimeoutError:
+                pass
+            await self._flush()
+
+    async def _flush(self):
+        self._flush_requested.clear()
+        now = time.time()
+        records = list(self._pending_records.values())
+        unattributed_deaths = self._unattributed_deaths
+        kills = self._pending_kills
+        received_at = self._pending_received_at
+        self._pending_records = {}
+        self._unattributed_deaths = Counter()
+        self._pending_kills = 0
+        self._pending_received_at = None
+        elapsed = now - self._last_flush_at
+        self._last_flush_at = now
+        if elapsed > 0:
+            self._kill_rate += KILL_RATE_SMOOTHING * (kills / elapsed - self._kill_rate)
+        METRICS.set_gauge("db_kills.kill_rate", self._kill_rate)
+        METRICS.observe("db_kills.flush_size", kills)
+        try:
+            player_ids = await self._player_ids.encode_many(
+                {record.player_id for record in records}.union(
+                    *[record.kills.keys() for record in records]
+                )
+            )
+        except Exception:
+            # nothing was written, the next flush takes them again
+            self._restore(records, unattributed_deaths, kills, received_at)
+            raise
+        (death_updates, mutations, edge_updates) = parsers.transform_kill_records_to_db(
+            records, player_ids, self._season, unattributed_deaths
+        )
+        kill_ops = self._unconfirmed_kill_ops + [
+            UpdateOne(
+                {"playfab_id": mutation["$set"]["playfab_id"]}, mutation, upsert=True
+            )
+            for mutation in mutations
+        ]
+        death_ops = self._unconfirmed_death_ops + [
+            UpdateOne({"playfab_id": death_update["$set"]["playfab_id"]}, death_update)
+            for death_update in death_updates
+        ]
+        edge_ops = self._unconfirmed_edge_ops + [
+            UpdateOne(
+                {
+                    "killer_id": edge_update["$set"]["killer_id"],
+                    "victim_id": edge_update["$set"]["victim_id"],
+                },
+                edge_update,
+                upsert=True,
+            )
+            for edge_update in edge_updates
+        ]
+        self._unsaved_received_at = _newest(self._unsaved_received_at, received_at)
+        if not kill_ops and not death_ops and not edge_ops:
+            logger.debug("DbKills - No kill records to update")
+            await self._save_written_checkpoint()
+            return
+        started = time.perf_counter()
+        with METRICS.timer("db_kills.flush"):
+            # killers are upserted before deaths land, a victim may be new in this batch
+            (modified, self._unconfirmed_kill_ops) = await self._bulk_write(
+                self._collection, kill_ops
+            )
+            if self._unconfirmed_kill_ops:
+                # held back with the killers they may depend on
+                self._unconfirmed_death_ops = death_ops
+                (edges_modified, self._unconfirmed_edge_ops) = await self._bulk_write(
+                    self._edges_collection, edge_ops
                 )
-                tasks.append(
-                    UpdateOne({"playfab_id": record.player_id}, mutation, upsert=True)
+                modified += edges_modified
+            else:
+                (
+                    (deaths_modified, self._unconfirmed_death_ops),
+                    (edges_modified, self._unconfirmed_edge_ops),
+                ) = await asyncio.gather(
+                    self._bulk_write(self._collection, death_ops),
+                    self._bulk_write(self._edges_collection, edge_ops),
                 )
-                for death_update in death_updates:
-                    tasks.append(
-                        UpdateOne(
-                            {"playfab_id": death_update["$set"]["playfab_id"]},
-                            death_update,
-                        )
+                modified += deaths_modified + edges_modified
+        METRICS.observe(
+            "db_kills.flush_ops", len(kill_ops) + len(death_ops) + len(edge_ops)
+        )
+        unconfirmed = (
+            len(self._unconfirmed_kill_ops)
+            + len(self._unconfirmed_death_ops)
+            + len(self._unconfirmed_edge_ops)
+        )
+        if unconfirmed:
+            # the checkpoint stays put until they're written, they're retried next flush
+            METRICS.set_gauge("db_kills.unconfirmed_ops", unconfirmed)
+            logger.error(
+                f"DbKills - {unconfirmed} kill updates failed to write, retrying next flush"
+            )
+            return
+        METRICS.set_gauge("db_kills.unconfirmed_ops", 0)
+        logger.debug(
+            f"DbKills - Flushed {kills} kills as {len(kill_ops)} killer, {len(death_ops)} victim "
+            f"and {len(edge_ops)} kill edge updates, "
+            f"{modified} modified in {time.perf_counter() - started:.3f}s"
+        )
+        await self._save_written_checkpoint()
+
+    async def _save_written_checkpoint(self):
+        # lines received after it may still be queued or pending, only what's written counts
+        if self._unsaved_received_at is None:
+            return
+        checkpoint = self._unsaved_received_at
+        self._unsaved_received_at = None
+        await self._save_checkpoint(checkpoint)
+
+    def _restore(
+        self,
+        records: list[KillRecord],
+        unattributed_deaths: Counter[str],
+        kills: int,
+        received_at: float | None,
+    ):
+        for record in records:
+            target = self._pending_records.setdefault(
+                record.player_id, KillRecord(record.player_id, record.user_name, {})
+            )
+            for killed_id, count in record.kills.items():
+                target.kills[killed_id] = target.kills.get(killed_id, 0) + count
+        self._unattributed_deaths.update(unattributed_deaths)
+        self._pending_kills += kills
+        self._pending_received_at = _newest(self._pending_received_at, received_at)
+
+    async def _bulk_write(
+        self, collection: AsyncIOMotorCollection, operations: list[UpdateOne]
+    ) -> tuple[int, list[UpdateOne]]:
+        """Unordered bulk writes of at most WRITE_CHUNK_SIZE operations, WRITE_CONCURRENCY at once
+
+        returns (documents modified, operations that may not have been applied)
+        """
+        semaphore = asyncio.Semaphore(WRITE_CONCURRENCY)
+
+        async def write_chunk(chunk: list[UpdateOne]) -> tuple[int, list[UpdateOne]]:
+            async with semaphore:
+                try:
+                    result = await collection.bulk_write(chunk, ordered=False)
+                except BulkWriteError as e:
+                    # unordered, everything but the reported operations went through
+                    METRICS.increment("db_kills.write_errors")
+                    failed = {error["index"] for error in e.details["writeErrors"]}
+                    return (
+                        e.details.get("nModified", 0) + e.details.get("nUpserted", 0),
+                        [chunk[index] for index in sorted(failed)],
                     )
-            if len(tasks) == 0:
-                logger.debug("DbKills - No kill records to update")
-                continue
-            bulk_write = await self._collection.bulk_write(tasks)
-            logger.debug(
-                f"DbKills - Updated {len(tasks)} kill records: {bulk_write.bulk_api_result}"
+                except Exception as e:
+                    METRICS.increment("db_kills.write_errors")
+                    logger.error(f"DbKills - Bulk write failed: {e}")
+                    return (0, chunk)
+                return (result.modified_count + result.upserted_count, [])
+
+        chunks: list[list[UpdateOne]] = []
+        for start in range(0, len(operations), WRITE_CHUNK_SIZE):
+            end = start + WRITE_CHUNK_SIZE
+            chunks.append(operations[start:end])
+        results = await asyncio.gather(*[write_chunk(chunk) for chunk in chunks])
+        return (
+            sum(modified for (modified, _) in results),
+            [operation for (_, failed) in results for operation in failed],
+        )
+
+    async def _save_checkpoint(self, checkpoint: float):
+        if not self._journal_directory:
+            return
+        try:
+            await asyncio.to_thread(
+                write_checkpoint,
+                self._journal_directory,
+                JOURNAL_CHECKPOINT,
+                checkpoint,
+            )
+        except Exception as e:
+            logger.error(f"DbKills - Failed to save journal checkpoint: {e}")
+
+    def _read_unsaved_kills(self, since: float) -> list[tuple[float, str]]:
+        return [
+            (received_at, line)
+            for (received_at, line) in read_journal(
+                self._journal_directory or "", since, self._created_at
             )
+            if line.startswith("Killfeed:")
+        ]
 
-    async def _process_killfeed(self, kill_event: KillfeedEvent | None):
+    async def replay(self):
+        """Count again kills journaled by a previous run but never written to the DB"""
+        if not self._journal_directory:
+            return
+        since = await asyncio.to_thread(
+            read_checkpoint, self._journal_directory, JOURNAL_CHECKPOINT
+        )
+        if since is None:
+            # journal is new, nothing before it was lost to it
+            await self._save_checkpoint(self._created_at)
+            return
+        lines = await asyncio.to_thread(self._read_unsaved_kills, since)
+        for received_at, line in lines:
+            await self._process_killfeed(
+                parsers.parse_killfeed_event(line), received_at
+            )
+        logger.info(f"DbKills - Replayed {len(lines)} unsaved kills from journal")
+
+    def _count_pending(self):
+        self._pending_kills += 1
+        if self._pending_kills >= self._flush_max_kills:
+            self._flush_requested.set()
+
+    async def _process_killfeed(
+        self, kill_event: KillfeedEvent | None, received_at: float | None = None
+    ):
         try:
+            # even a line with nothing to count is taken care of once the next flush is written
+            self._pending_received_at = _newest(self._pending_received_at, received_at)
             if kill_event is None or kill_event.killed_id is None:
                 return
             killed_id = kill_event.killed_id
             killer_id = kill_event.killer_id
-
-            if kill_event is None or killed_id is None:
+            if killer_id is None:
+                # bots and the environment kill too, the victim still died
+                METRICS.increment("db_kills.unattributed")
+                self._unattributed_deaths[killed_id] += 1
+                self._count_pending()
                 return
-            target: KillRecord = next(
-                iter([el for el in self._pending_records if el.player_id == killer_id]),
-                KillRecord(
+            target = self._pending_records.get(killer_id, None)
+            if target is None:
+                target = KillRecord(
                     killer_id,
                     self._player_store.players.get(killer_id, None)
                     or kill_event.user_name,
                     {},
-                ),
-            )
-            if target.kills.get(killed_id, None):
-                target.kills[killed_id] += 1
-            else:
-                target.kills[killed_id] = 1
-            if target not in self._pending_records:
-                self._pending_records.append(target)
+                )
+                self._pending_records[killer_id] = target
+            target.kills[killed_id] = target.kills.get(killed_id, 0) + 1
+            self._count_pending()
         except Exception as e:
             logger.error(f"Something went wrong {e}")
 
     async def start(self):
+        try:
+            await self.replay()
+        except Exception as e:
+            logger.error(f"DbKills - Failed to replay journal: {e}")
         while True:
             try:
                 await self._start_process()
@@ -0,0 +1,86 @@
+import asyncio
+from typing import Iterable
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+from pymongo.errors import BulkWriteError
+
+# {_id: dense id, playfab_id}, plus the sequence document below
+PLAYER_IDS_COLLECTION = "player_ids"
+# the one document that isn't a player, holds the next id to hand out
+SEQUENCE_ID = "sequence"
+PLAYER_ID_INDEXES = [
+    IndexModel([("playfab_id", ASCENDING)], name="playfab_id", unique=True)
+]
+
+
+class PlayerIds:
+    """Dense integer ids standing in for playfab ids in stored kill relationships
+
+    Ids are handed out in blocks from a sequence document and never change, so every
+    id seen is cached for the life of the process
+    """
+
+    _collection: AsyncIOMotorCollection
+    _ids: dict[str, int]
+    _assign_lock: asyncio.Lock
+
+    def __init__(self, collection: AsyncIOMotorCollection) -> None:
+        self._collection = collection
+        self._ids = {}
+        self._assign_lock = asyncio.Lock()
+
+    def _remember(self, playfab_id: str, player_id: int):
+        self._ids[playfab_id] = player_id
+
+    async def _load(self, query: dict):
+        async for record in self._collection.find(query):
+            self._remember(record["playfab_id"], record["_id"])
+
+    async def lookup_many(self, playfab_ids: Iterable[str | None]) -> dict[str, int]:
+        """Ids of the players that have one, without handing out new ones"""
+        wanted = {playfab_id for playfab_id in playfab_ids if playfab_id}
+        missing = [playfab_id for playfab_id in wanted if playfab_id not in self._ids]
+        if missing:
+            await self._load({"playfab_id": {"$in": missing}})
+        return {
+            playfab_id: self._ids[playfab_id]
+            for playfab_id in wanted
+            if playfab_id in self._ids
+        }
+
+    async def lookup(self, playfab_id: str) -> int | None:
+        return (await self.lookup_many([playfab_id])).get(playfab_id, None)
+
+    async def encode_many(self, playfab_ids: Iterable[str | None]) -> dict[str, int]:
+        """Ids of every player, handing out new ones to those that have none yet
+
+        Missing ids (None or empty) are left out rather than given one
+        """
+        wanted = {playfab_id for playfab_id in playfab_ids if playfab_id}
+        async with self._assign_lock:
+            known = await self.lookup_many(wanted)
+            missing = sorted(wanted - known.keys())
+            if missing:
+                await self._assign(missing)
+        return {playfab_id: self._ids[playfab_id] for playfab_id in wanted}
+
+    async def _assign(self, playfab_ids: list[str]):
+        sequence = await self._collection.find_one_and_update(
+            {"_id": SEQUENCE_ID},
+            {"$inc": {"next": len(playfab_ids)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        first = sequence["next"] - len(playfab_ids)
+        try:
+            await self._collection.insert_many(
+                [
+                    {"_id": first + index, "playfab_id": playfab_id}
+                    for (index, playfab_id) in enumerate(playfab_ids)
+                ],
+                ordered=False,
+            )
+        except BulkWriteError:
+            # another process got to some of them first, their ids stand
+            pass
+        await self._load({"playfab_id": {"$in": playfab_ids}})
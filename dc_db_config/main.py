@@ -3,9 +3,9 @@ import json
 import time
 import discord
 from discord.ext import commands
-from motor.motor_asyncio import AsyncIOMotorCollection
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
 from common import logger
-from config_client.models import BotConfig
+from config_client.models import BotConfig, SeasonConfig
 from common.discord import (
     BotHelper,
     bot_config_channel_checker,
@@ -13,26 +13,43 @@ from common.discord import (
 )
 from pymongo import UpdateOne
 from aiofiles import open as aio_open
+from database.indexes import rebuild_indexes, required_indexes
+from database.main import get_index_sizes, get_storage_stats
+from db_kills.kill_edges import migrate_kill_edges
+from db_kills.player_ids import PLAYER_IDS_COLLECTION, PlayerIds
+
+
+def mebibytes(size: int) -> str:
+    return f"{size / 1024 / 1024:.2f} MiB"
 
 
 class DcDbConfig(commands.Cog):
     _client: commands.Bot
     _cfg: BotConfig
     _playtime_collection: AsyncIOMotorCollection
+    _database: AsyncIOMotorDatabase
     _kills_collection: AsyncIOMotorCollection
+    _kill_edges_collection: AsyncIOMotorCollection
+    _player_ids: PlayerIds
     _cmd_group: commands.Group
 
     def __init__(
         self,
         client: commands.Bot,
         bot_config: BotConfig,
+        database: AsyncIOMotorDatabase,
         playtime_collection: AsyncIOMotorCollection,
         kills_collection: AsyncIOMotorCollection,
+        kill_edges_collection: AsyncIOMotorCollection,
+        player_ids: PlayerIds,
     ) -> None:
         self._client = client
         self._cfg = bot_config
+        self._database = database
         self._playtime_collection = playtime_collection
         self._kills_collection = kills_collection
+        self._kill_edges_collection = kill_edges_collection
+        self._player_ids = player_ids
         self.db.add_check(bot_config_channel_checker(bot_config))
         super().__init__()
 
@@ -109,6 +126,103 @@ class DcDbConfig(commands.Cog):
             embed.color = 15548997  # red
             await ctx.message.reply(embed=embed)
 
+    @db.command(
+        description="move pairwise kill counts into kill edges keyed by compact player ids, reports storage before and after",
+    )
+    async def encode_ids(self, ctx: commands.Context):
+        if (
+            self._cfg.config_bot_channel
+            and ctx.channel.id != self._cfg.config_bot_channel
+        ):
+            return
+        embed = self.make_embed(ctx)
+        try:
+            collections = [
+                self._kills_collection,
+                self._kill_edges_collection,
+                self._database[PLAYER_IDS_COLLECTION],
+            ]
+            before = [await get_storage_stats(c) for c in collections]
+            (migrated_edges, encoded_edges) = await migrate_kill_edges(
+                self._kills_collection, self._kill_edges_collection, self._player_ids
+            )
+            after = [await get_storage_stats(c) for c in collections]
+            embed.add_field(name="Edges from kills maps", value=str(migrated_edges))
+            embed.add_field(name="Edges encoded", value=str(encoded_edges))
+            for collection, stats_before, stats_after in zip(
+                collections, before, after
+            ):
+                embed.add_field(
+                    name=collection.name,
+                    value="\n".join(
+                        [
+                            f"documents: {stats_before['count']} -> {stats_after['count']}",
+                            f"data: {mebibytes(stats_before['size'])} -> {mebibytes(stats_after['size'])}",
+                            f"indexes: {mebibytes(stats_before['totalIndexSize'])} -> {mebibytes(stats_after['totalIndexSize'])}",
+                        ]
+                    ),
+                    inline=False,
+                )
+            await ctx.reply(embed=embed)
+        except Exception as e:
+            logger.error(f"Failed to encode kill edges: {e}")
+            embed.add_field(name="Success", value=str(False), inline=False)
+            embed.add_field(name="Error", value=str(e), inline=False)
+            embed.color = 15548997  # red
+            await ctx.message.reply(embed=embed)
+
+    @db.command(
+        description="list indexes the bot relies on with their sizes, `rebuild` creates missing ones and rebuilds changed ones",
+        usage="[rebuild]",
+    )
+    async def indexes(self, ctx: commands.Context, action: str = "list"):
+        if (
+            self._cfg.config_bot_channel
+            and ctx.channel.id != self._cfg.config_bot_channel
+        ):
+            return
+        embed = self.make_embed(ctx)
+        try:
+            if action not in ("list", "rebuild"):
+                raise ValueError(f"Unknown action {action}, expected list or rebuild")
+            database = self._database
+            season = (
+                await SeasonConfig.aload() if await SeasonConfig.aexists() else None
+            )
+            if action == "rebuild":
+                failures = await rebuild_indexes(database, season)
+                if not failures:
+                    embed.description = "Indexes rebuilt"
+                else:
+                    embed.description = f"{len(failures)} indexes failed to rebuild"
+                    embed.color = 15548997  # red
+                    embed.add_field(
+                        name="Failures",
+                        value="\n".join(
+                            f"{index}: {error}" for (index, error) in failures.items()
+                        ),
+                        inline=False,
+                    )
+            for name, models in required_indexes(season).items():
+                sizes = await get_index_sizes(database[name])
+                lines = [
+                    f"{index_name}: {mebibytes(size)}"
+                    for (index_name, size) in sizes.items()
+                ]
+                lines.extend(
+                    f"{model.document['name']}: missing"
+                    for model in models
+                    if model.document["name"] not in sizes
+                )
+                embed.add_field(name=name, value="\n".join(lines), inline=False)
+            await ctx.reply(embed=embed)
+        except Exception as e:
+            logger.error(f"Failed to {action} indexes: {e}")
+            embed.add_field(name="Success", value=str(False), inline=False)
+            embed.add_field(name="Error", value=str(e), inline=False)
+            embed.color = 15548997  # red
+            await ctx.message.reply(embed=embed)
+
     @db.command(
         description="export playtime data as json, compatible with server side mods such as Night's Playtime. Will also write the export to ./persist/ folder"
     )
@@ -7,16 +7,26 @@ from motor.motor_asyncio import (
     AsyncIOMotorDatabase,
 )
 from rank_compute.playtime import get_playtime
-from rcon.rcon_pool import RconConnectionPool
-from rank_compute.kills import get_kills, get_season_kills
+from rcon.query_cache import RconQueryCache
+from rcon.rcon_pool import RconPriority
+from rank_compute.kills import (
+    get_killed_players,
+    get_kills,
+    get_season_kills,
+    get_versus_counts,
+)
 from config_client.models import SeasonConfig
 import re
-from db_kills import aggregation
+from db_kills.kill_edges import KILL_EDGES_COLLECTION
+from db_kills.player_ids import PlayerIds
 from discord.ext.pages import Paginator, Page
 
 
 def register_dc_player_commands(
-    bot: Bot, db: AsyncIOMotorDatabase, rcon_pool: RconConnectionPool
+    bot: Bot,
+    db: AsyncIOMotorDatabase,
+    rcon_query_cache: RconQueryCache,
+    player_ids: PlayerIds,
 ) -> None:
     def make_embed(ctx: Context):
         embed = common_make_embed(str(ctx.command), color=discord.Colour(3447003))
@@ -150,19 +160,9 @@ def register_dc_player_commands(
     async def playerlist(ctx: Context):
         embed = make_embed(ctx)
         try:
-            player_list_raw: str = ""
-            client = await rcon_pool.get_client()
-            try:
-                player_list_raw = await client.execute("playerlist")
-            except Exception as e:
-                if client:
-                    logger.info(
-                        f"Rcon Client {client.id} encountered error, expiring it, error: {e}"
-                    )
-                    client.used = 120  # force expire
-                raise e
-            finally:
-                await rcon_pool.release_client(client)
+            player_list_raw = await rcon_query_cache.query(
+                "playerlist", RconPriority.INTERACTIVE
+            )
             players = parsers.parse_playerlist(player_list_raw)
 
             players_text = (
@@ -195,7 +195,7 @@ def register_dc_player_commands(
                     query = {"playfab_id": player}
                 else:
                     query = {"user_name": re.compile(f".*{player}.*", re.IGNORECASE)}
-                r = await collection.find_one(query)
+                r = await collection.find_one(query, {"kills": 0})
                 if r is None:
                     raise Exception(f"{player} not found")
                 data.append(r)
@@ -203,16 +203,21 @@ def register_dc_player_commands(
             player2_data = data[1]
             player1_id = player1_data.get("playfab_id", None)
             player2_id = player2_data.get("playfab_id", None)
-            player1_kills: dict = player1_data.get("kills", {})
-            player2_kills: dict = player2_data.get("kills", {})
+            if player1_id is None or player2_id is None:
+                raise Exception(
+                    f"{player1 if player1_id is None else player2} has no playfab id"
+                )
+            (player1_kills, player2_kills) = await get_versus_counts(
+                player1_id, player2_id, db[KILL_EDGES_COLLECTION], player_ids
+            )
             embed.add_field(
                 name=player1_data.get("user_name", "None"),
-                value=player1_kills.get(player2_id, 0),
+                value=str(player1_kills),
             )
             embed.add_field(name=":vs:", value="")
             embed.add_field(
                 name=player2_data.get("user_name", "None"),
-                value=player2_kills.get(player1_id, 0),
+                value=str(player2_kills),
             )
         except Exception as e:
             embed.add_field(name="Success", value=str(False), inline=False)
@@ -228,13 +233,11 @@ def register_dc_player_commands(
     )(versus)
 
     async def kills(ctx: Context, playfab_id: str):
-        collection = db["kills"]
+        collection = db[KILL_EDGES_COLLECTION]
         try:
             killed_str: str = ""
             killer_name: str = ""
-            async for player in collection.aggregate(
-                aggregation.get_killed_players_pipeline(playfab_id)
-            ):
+            for player in await get_killed_players(playfab_id, collection, player_ids):
                 if not killer_name:
                     killer_name = player.get("killer_name", "Unknown")
                 killed_name = player.get("user_name", "Unknown")
@@ -7,15 +7,19 @@ from common.models import ChatEvent
 from config_client.models import PtConfig, SeasonConfig
 from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorCollection
 
-from rank_compute.kills import get_kills, get_season_kills
+from db_kills.kill_edges import KILL_EDGES_COLLECTION
+from db_kills.player_ids import PlayerIds
+from rank_compute.kills import get_kills, get_season_kills, get_versus_counts
 from rank_compute.playtime import get_playtime
-from rcon.rcon_pool import RconConnectionPool
+from rcon.rcon_pool import RconConnectionPool, RconPriority
 
 
 class IngameCommands(Observer[ChatEvent | None]):
     _config: PtConfig | None
     _playtime_collection: AsyncIOMotorCollection
     _kills_collection: AsyncIOMotorCollection
+    _kill_edges_collection: AsyncIOMotorCollection
+    _player_ids: PlayerIds
     _rcon_pool: RconConnectionPool
 
     def __init__(
@@ -23,15 +27,18 @@ class IngameCommands(Observer[ChatEvent | None]):
         config: PtConfig | None,
         db: AsyncIOMotorDatabase,
         rcon_pool: RconConnectionPool,
+        player_ids: PlayerIds,
     ) -> None:
         self._playtime_collection = db["playtime"]
         self._kills_collection = db["kills"]
+        self._kill_edges_collection = db[KILL_EDGES_COLLECTION]
+        self._player_ids = player_ids
         self._config = config
         self._rcon_pool = rcon_pool
         super().__init__()
 
     async def rcon_say(self, msg: str):
-        client = await self._rcon_pool.get_client()
+        client = await self._rcon_pool.get_client(RconPriority.INTERACTIVE)
         try:
             await client.execute(f"say {msg}")
         except Exception as e:
@@ -41,7 +48,7 @@ class IngameCommands(Observer[ChatEvent | None]):
             client.used = 120
             raise e
         finally:
-            await self._rcon_pool.release_client(client)
+            await self._rcon_pool.release_client(client, RconPriority.INTERACTIVE)
 
     async def handle_playtime(self, playfab_id: str, user_name: str):
         user_playtime = await get_playtime(playfab_id, self._playtime_collection)
@@ -95,8 +102,12 @@ class IngameCommands(Observer[ChatEvent | None]):
         elif other_kdr is None:
             full_msg = f"{argument} has no recorded kdr"
         else:
-            player_1_kills = self_kdr.kills.get(other_kdr.player_id, 0)
-            player_2_kills = other_kdr.kills.get(self_kdr.player_id, 0)
+            (player_1_kills, player_2_kills) = await get_versus_counts(
+                self_kdr.player_id,
+                other_kdr.player_id,
+                self._kill_edges_collection,
+                self._player_ids,
+            )
             full_msg = f"{self_kdr.user_name} {player_1_kills} vs {player_2_kills} {other_kdr.user_name}"
         await self.rcon_say(full_msg)
 
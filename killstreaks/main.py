@@ -5,7 +5,7 @@ from common.compute import compute_gate
 from common.gc_shield import backtask
 from config_client.data import ks_config
 from config_client.models import KsConfig
-from rcon.rcon_pool import RconConnectionPool
+from rcon.rcon_pool import RconConnectionPool, RconPriority
 from common.models import KillfeedEvent
 
 
@@ -34,7 +34,7 @@ class KillStreaks(Observer[KillfeedEvent | None]):
         super().__init__()
 
     async def rcon_say(self, msg: str):
-        client = await self._rcon_pool.get_client()
+        client = await self._rcon_pool.get_client(RconPriority.GAMEPLAY)
         try:
             await client.execute(f"say {msg}")
         except Exception as e:
@@ -44,7 +44,7 @@ class KillStreaks(Observer[KillfeedEvent | None]):
             client.used = 120
             raise e
         finally:
-            await self._rcon_pool.release_client(client)
+            await self._rcon_pool.release_client(client, RconPriority.GAMEPLAY)
 
     async def handle_killer_streak(self, user_name: str, playfabId: str):
         current_streak = self.tally.get(playfabId, 0)
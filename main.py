@@ -13,25 +13,29 @@ from common.discord import ObservableDiscordClient, common_intents, BotHelper
 from ingame_cmd.main import IngameCommands
 from persistent_titles.main import PersistentTitles
 from migrant_titles.main import MigrantTitles, MigrantComputeEvent
+from rcon.event_journal import EventJournal
+from rcon.ingest_queue import OverflowPolicy
 from rcon.rcon_listener import RconListener
+from rcon.redundant_listener import RedundantListener
 from rcon.rcon_pool import RconConnectionPool
+from rcon.query_cache import RconQueryCache
+from database.indexes import ensure_indexes, ensure_season_indexes
+from db_kills.kill_edges import KILL_EDGES_COLLECTION, migrate_kill_edges
 from db_kills.main import DbKills
+from db_kills.player_ids import PLAYER_IDS_COLLECTION, PlayerIds
+from player_reconciler.main import PlayerReconciler
 from boards.playtime import PlayTimeScoreboard
 from killstreaks.main import KillStreaks
 from discord.ext.commands import Bot, Cog
-from reactivex import operators, Observable, empty
-from common.parsers import (
-    parse_chat_event,
-    parse_login_event,
-    parse_killfeed_event,
-    parse_matchstate,
-)
+from reactivex import Observable, Subject, empty, merge
+from common.event_dispatcher import EventDispatcher
 from config_client.models import BotConfig, PtConfig, SeasonConfig
 from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorClient
 from typing import Coroutine
 from monitoring.chat_logs import ChatLogs
+from monitoring.metrics import MetricsCommands
 from seasons.dc_config import SeasonAdminCommands
-from seasons.season_controller import SEASON_TOPIC, SeasonWatch
+from seasons.season_controller import SEASON_TOPIC, SeasonEvent, SeasonWatch
 from dc_db_config.main import DcDbConfig
 
 load_dotenv()
@@ -58,6 +62,10 @@ class MordhauRconSuite:
     killstreaks: KillStreaks | None = None
     _initial_season_cfg: SeasonConfig | None = None
     rcon_pool: RconConnectionPool
+    rcon_query_cache: RconQueryCache
+    journal: EventJournal | None = None
+    event_dispatcher: EventDispatcher
+    player_ids: PlayerIds
 
     @property
     def playtime_collection(self):
@@ -71,6 +79,10 @@ class MordhauRconSuite:
     def kills_collection(self):
         return self._database["kills"]
 
+    @property
+    def kill_edges_collection(self):
+        return self._database[KILL_EDGES_COLLECTION]
+
     def __init__(
         self,
         bot_config: BotConfig,
@@ -79,11 +91,20 @@ class MordhauRconSuite:
     ):
         self._bot_config = bot_config
         self._pt_config = pt_config
-        self.rcon_pool = RconConnectionPool(3)
+        self.rcon_pool = RconConnectionPool(
+            3,
+            max_in_flight=self._bot_config.rcon_max_in_flight or 1,
+            min_idle=self._bot_config.rcon_min_idle or 0,
+        )
+        self.tasks.add(self.rcon_pool.start())
+        self.rcon_query_cache = RconQueryCache(
+            self.rcon_pool, self._bot_config.rcon_query_cache_ttl or 0
+        )
         if SeasonConfig.exists():
             self._initial_season_cfg = SeasonConfig.load()
         self.set_up_db()
         self.set_up_discord(loop)
+        self.set_up_journal()
         if self._bot_config.use_bulk_listener:
             self.set_up_bulk_listeners()
         else:
@@ -160,7 +181,7 @@ class MordhauRconSuite:
         cogs.append(BoardCommands(self._dc_bot, self._bot_config))
         if self._bot_config.info_board_enabled():
             info_board = InfoBoard(
-                self.rcon_pool,
+                self.rcon_query_cache,
                 self._dc_bot,
                 self._bot_config.info_channel or 0,
                 self._bot_config.info_refresh_time,
@@ -171,6 +192,9 @@ class MordhauRconSuite:
 
     def set_up_experiences(self):
         self.player_store = PlayerStore()
+        reconciled_logins: Subject[LoginEvent | None] = Subject()
+        if self._bot_config.reconcile_interval:
+            self.login_events = merge(self.login_events, reconciled_logins)
         if self._bot_config.title:
             self.migrant_titles = MigrantTitles(
                 self.killfeed_events, self.player_store, self.rcon_pool
@@ -201,15 +225,35 @@ class MordhauRconSuite:
             ),
             self._database,
             self.rcon_pool,
+            self.player_ids,
         )
         self.db_kills = DbKills(
             self.kills_collection,
+            self.kill_edges_collection,
+            self.player_ids,
             self.killfeed_events,
             self.player_store,
             self._initial_season_cfg,
+            self.journal.directory if self.journal else None,
+            self._bot_config.kills_flush_max_kills or 500,
+            self._bot_config.kills_flush_max_secs or 60,
         )
         self.chat_events.subscribe(self.ingame_commands)
         self.login_events.subscribe(self._entrance_desk)
+        if self._bot_config.reconcile_interval:
+            player_reconciler = PlayerReconciler(
+                self.rcon_query_cache,
+                self.player_store,
+                reconciled_logins.on_next,
+                self._pt_config,
+                self._bot_config.reconcile_interval,
+            )
+            self.tasks.add(player_reconciler.start())
+        # roster and map change with these, cached info/playerlist would be stale
+        self.login_events.subscribe(
+            lambda _: self.rcon_query_cache.invalidate("playerlist")
+        )
+        self.matchstate_events.subscribe(lambda _: self.rcon_query_cache.invalidate())
 
         SEASON_TOPIC.subscribe(lambda x: logger.info(f"Season event {x}"))
         SEASON_TOPIC.subscribe(
@@ -247,6 +291,30 @@ class MordhauRconSuite:
             return None
         db_client = AsyncIOMotorClient(db_connection)
         self._database = db_client[db_name]
+        self.player_ids = PlayerIds(self._database[PLAYER_IDS_COLLECTION])
+        self.tasks.add(self._prepare_db())
+
+        def _index_new_season(event: SeasonEvent):
+            if event is SeasonEvent.CREATE:
+                backtask(self._index_season())
+
+        SEASON_TOPIC.subscribe(_index_new_season)
+
+    async def _prepare_db(self):
+        await ensure_indexes(self._database, self._initial_season_cfg)
+        try:
+            await migrate_kill_edges(
+                self.kills_collection, self.kill_edges_collection, self.player_ids
+            )
+        except Exception as e:
+            # kills are still recorded, versus and kills commands miss legacy counts
+            logger.error(f"Kill edges migration failed: {e}")
+
+    async def _index_season(self):
+        try:
+            await ensure_season_indexes(self._database, await SeasonConfig.aload())
+        except Exception as e:
+            logger.error(f"Failed to index new season: {e}")
 
     def set_up_discord(self, loop: asyncio.AbstractEventLoop):
         self._dc_bot = Bot(
@@ -254,17 +322,23 @@ class MordhauRconSuite:
         )
         d_token = self._bot_config.d_token
         self._dc_client = ObservableDiscordClient(intents=common_intents, loop=loop)
-        register_dc_player_commands(self._dc_bot, self._database, self.rcon_pool)
+        register_dc_player_commands(
+            self._dc_bot, self._database, self.rcon_query_cache, self.player_ids
+        )
         self._dc_bot.add_cog(
             DcDbConfig(
                 self._dc_bot,
                 self._bot_config,
+                self._database,
                 self.playtime_collection,
                 self.kills_collection,
+                self.kill_edges_collection,
+                self.player_ids,
             )
         )
         self._dc_bot.add_cog(BotHelper(self._dc_bot, self._bot_config))
         self._dc_bot.add_cog(SeasonAdminCommands(self._dc_bot, self._bot_config))
+        self._dc_bot.add_cog(MetricsCommands(self._dc_bot, self._bot_config))
         self.tasks.update(
             [
                 self._dc_bot.start(token=d_token),
@@ -272,45 +346,79 @@ class MordhauRconSuite:
             ]
         )
 
-    def set_up_bulk_listeners(self):
-        events_to_listen = ["login", "killfeed", "chat", "matchstate"]
-        bulk_listener = RconListener(event=events_to_listen)
-        self.login_events = bulk_listener.pipe(
-            operators.filter(lambda x: x.startswith("Login")),
-            operators.map(parse_login_event),
+    def set_up_journal(self):
+        if not self._bot_config.journal_enabled:
+            return
+        self.journal = EventJournal(
+            segment_bytes=(self._bot_config.journal_segment_mb or 16) * 1024 * 1024,
+            segment_secs=(self._bot_config.journal_segment_mins or 60) * 60,
+            compress=bool(self._bot_config.journal_compress),
         )
-        self.killfeed_events = bulk_listener.pipe(
-            operators.filter(lambda x: x.startswith("Killfeed")),
-            operators.map(parse_killfeed_event),
+        self.tasks.add(self.journal.start())
+
+    def _make_rcon_listener(
+        self, event: list[str] | str, journal: EventJournal | None
+    ) -> RconListener:
+        return RconListener(
+            event=event,
+            queue_size=self._bot_config.listener_queue_size or 10000,
+            overflow_policy=OverflowPolicy(
+                self._bot_config.listener_overflow_policy or "drop_by_type"
+            ),
+            journal=journal,
         )
-        self.chat_events = bulk_listener.pipe(
-            operators.filter(lambda x: x.startswith("Chat")),
-            operators.map(parse_chat_event),
-            operators.filter(lambda x: x is not None),
+
+    def _make_listener(
+        self, event: list[str] | str
+    ) -> RconListener | RedundantListener:
+        if not self._bot_config.listener_standby:
+            return self._make_rcon_listener(event, self.journal)
+        # journaled once both streams are merged, not per connection
+        return RedundantListener(
+            self._make_rcon_listener(event, None),
+            self._make_rcon_listener(event, None),
+            journal=self.journal,
         )
-        self.matchstate_events = bulk_listener.pipe(
-            operators.filter(lambda x: x.startswith("MatchState")),
-            operators.map(parse_matchstate),
+
+    def _serve_commands_over(self, listener: RconListener | RedundantListener):
+        if not self._bot_config.listener_serves_commands:
+            return
+        self.rcon_pool.attach_listener(
+            listener.primary if isinstance(listener, RedundantListener) else listener
         )
+
+    def _bind_event_streams(self, dispatcher: EventDispatcher):
+        self.event_dispatcher = dispatcher
+        self.login_events = dispatcher.stream("Login")
+        self.killfeed_events = dispatcher.stream("Killfeed")
+        self.chat_events = dispatcher.stream("Chat")
+        self.matchstate_events = dispatcher.stream("MatchState")
+
+    def set_up_bulk_listeners(self):
+        events_to_listen = ["login", "killfeed", "chat", "matchstate"]
+        bulk_listener = self._make_listener(events_to_listen)
+        # classifies and parses each line once, then multicasts to every subscriber
+        dispatcher = EventDispatcher.with_default_events()
+        bulk_listener.subscribe(dispatcher.on_next)
+        self._bind_event_streams(dispatcher)
+        self._serve_commands_over(bulk_listener)
         self.tasks.add(bulk_listener.start())
 
     def set_up_listeners(self):
-        chat_listener = RconListener("chat")
-        killfeed_listener = RconListener("killfeed")
-        login_listener = RconListener("login")
-        matchstate_listener = RconListener("matchstate")
-        self.login_events = login_listener.pipe(
-            operators.map(parse_login_event),
-        )
-        self.killfeed_events = killfeed_listener.pipe(
-            operators.map(parse_killfeed_event),
-        )
-        self.chat_events = chat_listener.pipe(
-            operators.map(parse_chat_event),
-        )
-        self.matchstate_events = matchstate_listener.pipe(
-            operators.map(parse_matchstate)
-        )
+        chat_listener = self._make_listener("chat")
+        killfeed_listener = self._make_listener("killfeed")
+        login_listener = self._make_listener("login")
+        matchstate_listener = self._make_listener("matchstate")
+        dispatcher = EventDispatcher.with_default_events()
+        for listener in [
+            chat_listener,
+            killfeed_listener,
+            login_listener,
+            matchstate_listener,
+        ]:
+            listener.subscribe(dispatcher.on_next)
+        self._bind_event_streams(dispatcher)
+        self._serve_commands_over(chat_listener)
         self.tasks.update(
             [
                 chat_listener.start(),
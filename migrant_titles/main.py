@@ -1,4 +1,3 @@
-import asyncio
 from dataclasses import dataclass
 from reactivex import Observable, Subject
 from common.gc_shield import backtask
@@ -7,7 +6,7 @@ from config_client.data import pt_config, bot_config
 from common import logger
 import random
 
-from rcon.rcon_pool import RconConnectionPool
+from rcon.rcon_pool import RconConnectionPool, RconPriority
 
 DEFAULT_REX_TITLE = "REX"
 
@@ -47,17 +46,18 @@ class TitleCompute(Subject[MigrantComputeEvent]):
         self._rcon_pool = rcon_pool
         super().__init__()
 
-    async def _execute_command(self, command: str) -> None:
-        client = await self._rcon_pool.get_client()
+    async def _execute_commands(self, commands: list[str]) -> list[str | Exception]:
+        client = await self._rcon_pool.get_client(RconPriority.GAMEPLAY)
         try:
-            await client.execute(command)
-        except Exception as e:
-            logger.info(
-                f"[TitleCompute] Rcon client {client.id} failed to execute command `{command}`, expiring client"
-            )
-            raise e
+            results = await client.execute_many(commands)
         finally:
-            await self._rcon_pool.release_client(client)
+            await self._rcon_pool.release_client(client, RconPriority.GAMEPLAY)
+        for command, result in zip(commands, results):
+            if isinstance(result, Exception):
+                logger.info(
+                    f"[TitleCompute] Rcon client {client.id} failed to execute command `{command}`: {result}"
+                )
+        return results
 
     def _sanitize_name(self, playfab_id: str, current_name: str):
         login_username = self._player_store.players.get(playfab_id, None)
@@ -65,28 +65,44 @@ class TitleCompute(Subject[MigrantComputeEvent]):
         target_name = rename or login_username or current_name
         return target_name.replace(f"[{self.rex_tile}]", "").lstrip()
 
-    def _remove_rex(self, playfab_id: str, user_name):
-        target_name = self._sanitize_name(playfab_id, user_name)
-        task = backtask(
-            self._execute_command(f"renameplayer {playfab_id} {target_name}")
-        )
-
-        def callback(_task: asyncio.Task):
-            self.on_next(MigrantComputeEvent("removed", playfab_id, target_name))
-
-        task.add_done_callback(callback)
-
     def _get_migrancy_text(self, templates: list[str], killer: str, killed: str):
         template = random.choice(templates)
         txt = template.format(killer, killed, self.rex_tile)
         return txt
 
-    async def _place_rex(self, playfab_id: str, user_name):
-        target_name = self._sanitize_name(playfab_id, user_name)
-        await self._execute_command(
-            f"renameplayer {playfab_id} [{self.rex_tile}] {target_name}"
-        )
-        self.on_next(MigrantComputeEvent("placed", playfab_id, target_name))
+    async def _migrate_rex(
+        self,
+        announcement: str | None,
+        new_rex: tuple[str, str] | None,
+        old_rex: tuple[str, str] | None,
+    ):
+        """Announce, tag new rex and untag old rex in a single RCON batch"""
+        commands: list[str] = []
+        if announcement:
+            commands.append(f"say {announcement}")
+        placed: MigrantComputeEvent | None = None
+        removed: MigrantComputeEvent | None = None
+        if new_rex:
+            (playfab_id, user_name) = new_rex
+            target_name = self._sanitize_name(playfab_id, user_name)
+            commands.append(
+                f"renameplayer {playfab_id} [{self.rex_tile}] {target_name}"
+            )
+            placed = MigrantComputeEvent("placed", playfab_id, target_name)
+        if old_rex:
+            (playfab_id, user_name) = old_rex
+            target_name = self._sanitize_name(playfab_id, user_name)
+            commands.append(f"renameplayer {playfab_id} {target_name}")
+            removed = MigrantComputeEvent("removed", playfab_id, target_name)
+        try:
+            results = await self._execute_commands(commands)
+            placed_result = results[1 if announcement else 0] if placed else None
+            if placed and not isinstance(placed_result, Exception):
+                self.on_next(placed)
+        finally:
+            # removal is always notified so the player gets their regular tag back
+            if removed:
+                self.on_next(removed)
 
     def _process_killfeed_event(self, event_data: KillfeedEvent | None):
         if event_data is None:
@@ -100,15 +116,19 @@ class TitleCompute(Subject[MigrantComputeEvent]):
                 empty_tile_msg = self._get_migrancy_text(
                     VACANCY_MIGRANCY_TEMPLATES, killer, killed
                 )
-                backtask(self._execute_command(f"say {empty_tile_msg}"))
-                backtask(self._place_rex(killer_playfab_id, killer))
+                backtask(
+                    self._migrate_rex(empty_tile_msg, (killer_playfab_id, killer), None)
+                )
                 self.current_rex = killer_playfab_id
             elif killed_playfab_id and self.current_rex == killed_playfab_id:
                 title_msg = self._get_migrancy_text(MIGRANCY_TEMPLATES, killer, killed)
-                backtask(self._execute_command(f"say {title_msg}"))
-                if killer_playfab_id:
-                    backtask(self._place_rex(killer_playfab_id, killer))
-                self._remove_rex(killed_playfab_id, killed)
+                backtask(
+                    self._migrate_rex(
+                        title_msg,
+                        (killer_playfab_id, killer) if killer_playfab_id else None,
+                        (killed_playfab_id, killed),
+                    )
+                )
                 self.current_rex = killer_playfab_id
             elif (
                 killer.rstrip().startswith(f"[{self.rex_tile}]")
@@ -116,16 +136,17 @@ class TitleCompute(Subject[MigrantComputeEvent]):
                 and killer_playfab_id != self.current_rex
             ):
                 # this is a bug, boy has REX in his name but isn't actually current rex
-                self._remove_rex(killer_playfab_id, killer)
+                backtask(self._migrate_rex(None, None, (killer_playfab_id, killer)))
             # note: uncomment this for solo debug
             # elif killer_playfab_id == self.current_rex:
             #     self.current_rex = ""
             #     backtask(
-            #         self._execute_command(
-            #             f"say {killer} has defeated {killed} and claimed his {self.rex_tile} title"
+            #         self._migrate_rex(
+            #             f"{killer} has defeated {killed} and claimed his {self.rex_tile} title",
+            #             None,
+            #             (killer_playfab_id, killer),
             #         )
             #     )
-            #     self._remove_rex(killer_playfab_id, killer)
         except Exception as e:
             logger.error(f"Failed to process REX tag compute, {str(e)}")
 
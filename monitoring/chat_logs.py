@@ -7,7 +7,7 @@ from common.discord import channel_checker, make_embed
 from config_client.models import BotConfig
 from common import logger
 from discord.ext import commands
-from rcon.rcon_pool import RconConnectionPool
+from rcon.rcon_pool import RconConnectionPool, RconPriority
 
 
 class ChatLogs(Observer[ChatEvent | None]):
@@ -50,7 +50,7 @@ class ChatLogs(Observer[ChatEvent | None]):
         author = ctx.author.display_name
         try:
             logger.info(f"{self.__class__.__name__}: {ctx.command} '{msg}'")
-            client = await self._rcon_pool.get_client()
+            client = await self._rcon_pool.get_client(RconPriority.INTERACTIVE)
             try:
                 r = await client.execute(f"say {author} > {msg}")
                 logger.info(f"{self.__class__.__name__}: {r}")
@@ -61,7 +61,7 @@ class ChatLogs(Observer[ChatEvent | None]):
                 client.used = 120
                 raise e
             finally:
-                await self._rcon_pool.release_client(client)
+                await self._rcon_pool.release_client(client, RconPriority.INTERACTIVE)
             await ctx.message.add_reaction("👌")
         except Exception as e:
             embed = make_embed(str(ctx.command), color=discord.Colour(15548997))
@@ -0,0 +1,123 @@
+import io
+import json
+import time
+import discord
+from discord.ext import commands
+from aiofiles import open as aio_open
+from common import logger
+from common.discord import (
+    BotHelper,
+    bot_config_channel_checker,
+    make_embed as common_make_embed,
+)
+from common.metrics import METRICS
+from config_client.models import BotConfig
+
+# discord caps embed field values at 1024 characters
+FIELD_VALUE_LIMIT = 1000
+
+
+def chunk_lines(lines: list[str], limit: int = FIELD_VALUE_LIMIT) -> list[str]:
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0
+    for line in lines:
+        if current and size + len(line) + 1 > limit:
+            chunks.append("\n".join(current))
+            current = []
+            size = 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+class MetricsCommands(commands.Cog):
+    _client: commands.Bot
+    _cfg: BotConfig
+
+    def __init__(self, client: commands.Bot, bot_config: BotConfig) -> None:
+        self._client = client
+        self._cfg = bot_config
+        self.metrics.add_check(bot_config_channel_checker(bot_config))
+        super().__init__()
+
+    def make_embed(self, ctx: commands.Context):
+        embed = common_make_embed(str(ctx.command), color=discord.Colour(2899536))
+        return embed
+
+    @commands.group(invoke_without_command=False, description="Metrics commands")
+    async def metrics(self, ctx: commands.Context):
+        if ctx.subcommand_passed is None:
+            helper = self._client.get_cog("BotHelper")
+            if not isinstance(helper, BotHelper) or not ctx.command:
+                return
+            await helper.help(ctx, ctx.command.name)  # type: ignore
+
+    @metrics.command(
+        description="show collected metrics, optionally only those starting with a prefix",
+        usage="<optional_prefix>",
+        help="rcon.pool",
+    )
+    async def show(self, ctx: commands.Context, prefix: str = ""):
+        embed = self.make_embed(ctx)
+        try:
+            snapshot = METRICS.snapshot(prefix)
+            uptime_mins = int((snapshot["taken"] - snapshot["started"]) / 60)
+            embed.description = f"Collected over the last {uptime_mins} minutes"
+            histogram_lines = [
+                f"`{name}` n={h['count']} p50={h['p50']}ms p95={h['p95']}ms p99={h['p99']}ms max={h['max']}ms"
+                for (name, h) in snapshot["histograms"].items()
+            ]
+            counter_lines = [
+                f"`{name}` {value}"
+                for (name, value) in [
+                    *snapshot["counters"].items(),
+                    *snapshot["gauges"].items(),
+                ]
+            ]
+            for chunk in chunk_lines(histogram_lines):
+                embed.add_field(name="Latencies", value=chunk, inline=False)
+            for chunk in chunk_lines(counter_lines):
+                embed.add_field(name="Counters", value=chunk, inline=False)
+            if not histogram_lines and not counter_lines:
+                embed.add_field(name="Metrics", value="Nothing recorded yet")
+            await ctx.reply(embed=embed)
+        except Exception as e:
+            embed.add_field(name="Success", value=str(False), inline=False)
+            embed.add_field(name="Error", value=str(e), inline=False)
+            embed.color = 15548997  # red
+            await ctx.message.reply(embed=embed)
+
+    @metrics.command(
+        description="export a snapshot of all metrics as json, will also write it to ./persist/ folder"
+    )
+    async def export(self, ctx: commands.Context):
+        embed = self.make_embed(ctx)
+        try:
+            json_str = json.dumps(METRICS.snapshot(), indent=2)
+            file_name = f"metrics_export_{int(time.time())}.json"
+            async with aio_open(f"./persist/{file_name}", "w") as f:
+                await f.write(json_str)
+            file = discord.File(
+                fp=io.BytesIO(json_str.encode("utf-8")),
+                filename=file_name,
+                description="Exported metrics snapshot",
+            )
+            await ctx.message.reply(
+                f"Exported metrics. Also written to `./persist/{file_name}`", file=file
+            )
+        except Exception as e:
+            logger.error(f"Failed to export metrics: {e}")
+            embed.add_field(name="Success", value=str(False), inline=False)
+            embed.add_field(name="Error", value=str(e), inline=False)
+            embed.color = 15548997  # red
+            await ctx.message.reply(embed=embed)
+
+    @metrics.command(description="reset all collected metrics")
+    async def reset(self, ctx: commands.Context):
+        METRICS.reset()
+        embed = self.make_embed(ctx)
+        embed.add_field(name="Success", value=str(True))
+        await ctx.reply(embed=embed)
@@ -6,7 +6,7 @@ from common.models import LoginEvent
 from persistent_titles.playtime_client import PlaytimeClient
 from common.compute import compute_gate_text
 from config_client.models import PtConfig
-from rcon.rcon_pool import RconConnectionPool
+from rcon.rcon_pool import RconConnectionPool, RconPriority
 
 
 class LoginObserver(Observer[LoginEvent | None]):
@@ -51,7 +51,7 @@ class LoginObserver(Observer[LoginEvent | None]):
         tag_formatted = self.get_tag(target_tag)
         sanitized_username = user_name.replace(tag_formatted, "")
         new_user_name = " ".join([tag_formatted, sanitized_username])
-        client = await self._rcon_pool.get_client()
+        client = await self._rcon_pool.get_client(RconPriority.BACKGROUND)
         try:
             await client.execute(f"renameplayer {playfab_id} {new_user_name}")
         except Exception as e:
@@ -61,7 +61,7 @@ class LoginObserver(Observer[LoginEvent | None]):
             client.used = 120
             raise e
         finally:
-            await self._rcon_pool.release_client(client)
+            await self._rcon_pool.release_client(client, RconPriority.BACKGROUND)
 
     async def handle_salute(self, event_data: LoginEvent):
         playfab_id = event_data.player_id
@@ -71,7 +71,7 @@ class LoginObserver(Observer[LoginEvent | None]):
         await asyncio.sleep(
             self._config.salute_timer
         )  # so player can see his own salute
-        client = await self._rcon_pool.get_client()
+        client = await self._rcon_pool.get_client(RconPriority.GAMEPLAY)
         try:
             await client.execute(f"say {target_salute}")
         except Exception as e:
@@ -81,14 +81,14 @@ class LoginObserver(Observer[LoginEvent | None]):
             client.used = 120
             raise e
         finally:
-            await self._rcon_pool.release_client(client)
+            await self._rcon_pool.release_client(client, RconPriority.GAMEPLAY)
 
     async def handle_rename(self, event_data: LoginEvent):
         playfab_id = event_data.player_id
         rename = self.get_rename(playfab_id)
         if not rename:
             return
-        client = await self._rcon_pool.get_client()
+        client = await self._rcon_pool.get_client(RconPriority.BACKGROUND)
         try:
             await client.execute(f"renameplayer {playfab_id} {rename}")
         except Exception as e:
@@ -98,13 +98,14 @@ class LoginObserver(Observer[LoginEvent | None]):
             client.used = 120
             raise e
         finally:
-            await self._rcon_pool.release_client(client)
+            await self._rcon_pool.release_client(client, RconPriority.BACKGROUND)
 
     def on_next(self, event_data: LoginEvent | None) -> None:
         if not event_data:
             return
         order = event_data.instance.lower()
-        if order == "out":
+        # reconciled logins weren't seen joining, renaming or saluting them now comes out of the blue
+        if order == "out" or event_data.reconciled:
             return
         backtask(self.handle_rename(event_data))
         backtask(self.handle_salute(event_data))
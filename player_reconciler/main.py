@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime
+from typing import Callable
+from common import logger
+from common.compute import compute_roster_diff, compute_untagged_name
+from common.metrics import METRICS
+from common.models import LoginEvent, PlayerStore
+from common.parsers import DATE_FORMAT, parse_playerlist
+from config_client.models import PtConfig
+from rcon.query_cache import RconQueryCache
+from rcon.rcon_pool import RconPriority
+
+DEFAULT_INTERVAL_SECS = 60
+
+
+class PlayerReconciler:
+    """Heals the player store from playerlist snapshots when login events were missed
+
+    Missed logins and logouts are emitted as login events marked as reconciled, so
+    sessions and the player store catch up while titles and salutes, meant for players
+    joining, leave them be. A difference is
+    only acted on once two snapshots in a row agree on it, a login or logout landing
+    between a snapshot and the diff is not a miss
+    """
+
+    _query_cache: RconQueryCache
+    _player_store: PlayerStore
+    _emit: Callable[[LoginEvent], None]
+    _pt_config: PtConfig
+    _interval_secs: float
+    # id -> (name, date first noticed), waiting for the next snapshot to confirm
+    _suspected_joined: dict[str, tuple[str, str]]
+    _suspected_left: dict[str, tuple[str, str]]
+
+    def __init__(
+        self,
+        query_cache: RconQueryCache,
+        player_store: PlayerStore,
+        emit: Callable[[LoginEvent], None],
+        pt_config: PtConfig,
+        interval_secs: float = DEFAULT_INTERVAL_SECS,
+    ) -> None:
+        self._query_cache = query_cache
+        self._player_store = player_store
+        self._emit = emit
+        self._pt_config = pt_config
+        self._interval_secs = interval_secs
+        self._suspected_joined = {}
+        self._suspected_left = {}
+
+    def _confirm(
+        self,
+        suspected: dict[str, tuple[str, str]],
+        found: dict[str, str],
+        date: str,
+    ) -> tuple[dict[str, tuple[str, str]], list[tuple[str, str, str]]]:
+        """Split found into (still suspected, confirmed as id, name, date first noticed)"""
+        still_suspected: dict[str, tuple[str, str]] = {}
+        confirmed: list[tuple[str, str, str]] = []
+        for player_id, user_name in found.items():
+            if player_id in suspected:
+                (_, noticed_at) = suspected[player_id]
+                confirmed.append((player_id, user_name, noticed_at))
+            else:
+                still_suspected[player_id] = (user_name, date)
+        return (still_suspected, confirmed)
+
+    async def reconcile(self):
+        raw = await self._query_cache.query("playerlist", RconPriority.BACKGROUND)
+        # playerlist shows names as tagged in game, the store keeps them as players logged in
+        tags = [
+            *self._pt_config.tags.values(),
+            *self._pt_config.playtime_tags.values(),
+        ]
+        online = {
+            player.player_id: compute_untagged_name(
+                player.user_name, self._pt_config.tag_format, tags
+            )
+            for player in parse_playerlist(raw)
+        }
+        (joined, left) = compute_roster_diff(self._player_store.players, online)
+        # the player was online, or gone, by the snapshot that first showed it
+        date = datetime.now().strftime(DATE_FORMAT)
+        (self._suspected_joined, missed_logins) = self._confirm(
+            self._suspected_joined, joined, date
+        )
+        (self._suspected_left, missed_logouts) = self._confirm(
+            self._suspected_left, left, date
+        )
+        for player_id, user_name, noticed_at in missed_logins:
+            logger.info(f"PlayerReconciler: missed login of {user_name} ({player_id})")
+            METRICS.increment("reconciler.missed_login")
+            self._emit(
+                LoginEvent("Login", noticed_at, user_name, player_id, "in", True)
+            )
+        for player_id, user_name, noticed_at in missed_logouts:
+            logger.info(f"PlayerReconciler: missed logout of {user_name} ({player_id})")
+            METRICS.increment("reconciler.missed_logout")
+            self._emit(
+                LoginEvent("Login", noticed_at, user_name, player_id, "out", True)
+            )
+
+    async def start(self):
+        while True:
+            await asyncio.sleep(self._interval_secs)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.error(f"PlayerReconciler: failed to reconcile players: {e}")
@@ -8,6 +8,11 @@ import re
 from config_client.models import SeasonConfig
 from pymongo import UpdateOne
 from common import logger
+from db_kills import aggregation
+from db_kills.player_ids import PlayerIds
+
+# pairwise kills live in the kill edges collection, legacy documents may still carry them
+WITHOUT_KILLS_MAP = {"kills": 0}
 
 
 async def get_kills(
@@ -18,21 +23,18 @@ async def get_kills(
         query = {"playfab_id": argument}
     else:
         query = {"user_name": re.compile(f".*{argument}.*", re.IGNORECASE)}
-    kills_rec: dict | None = await collection.find_one(query)
+    kills_rec: dict | None = await collection.find_one(query, WITHOUT_KILLS_MAP)
     if kills_rec is None:
         return None
     user_name = kills_rec.get("user_name", "<Unknown>")
     player_id = kills_rec["playfab_id"]
     kill_count = kills_rec.get("kill_count", 0)
-    kills = kills_rec.get("kills", {})
     achievements = kills_rec.get("achiev", {})
     rank = 0
     if get_rank:
         rank = await collection.count_documents({"kill_count": {"$gt": kill_count}})
     death_count = kills_rec.get("death_count", 0)
-    return KillScore(
-        player_id, user_name, kill_count, death_count, rank, kills, achievements
-    )
+    return KillScore(player_id, user_name, kill_count, death_count, rank, achievements)
 
 
 async def get_season_kills(
@@ -46,7 +48,7 @@ async def get_season_kills(
         query = {"playfab_id": argument}
     else:
         query = {"user_name": re.compile(f".*{argument}.*", re.IGNORECASE)}
-    kills_rec: dict | None = await collection.find_one(query)
+    kills_rec: dict | None = await collection.find_one(query, WITHOUT_KILLS_MAP)
     if kills_rec is None:
         return None
     user_name = kills_rec.get("user_name", "<Unknown>")
@@ -54,13 +56,47 @@ async def get_season_kills(
     kill_count = season_dict.get("kill_count", 0)
     death_count = season_dict.get("death_count", 0)
     player_id = kills_rec["playfab_id"]
-    kills = kills_rec.get("kills", {})
     rank = None
     if get_rank and kill_count and death_count:
         rank = await collection.count_documents(
             {f"season.{season_config.name}.kill_count": {"$gt": kill_count}}
         )
-    return KillScore(player_id, user_name, kill_count, death_count, rank, kills)
+    return KillScore(player_id, user_name, kill_count, death_count, rank)
+
+
+async def get_versus_counts(
+    player1_id: str,
+    player2_id: str,
+    edges_collection: AsyncIOMotorCollection,
+    player_ids: PlayerIds,
+) -> tuple[int, int]:
+    """Times player1 killed player2 and times player2 killed player1"""
+    ids = await player_ids.lookup_many([player1_id, player2_id])
+    if len(ids) < 2:
+        return (0, 0)
+    counts: dict[int, int] = {}
+    async for edge in edges_collection.find(
+        {
+            "$or": [
+                {"killer_id": ids[player1_id], "victim_id": ids[player2_id]},
+                {"killer_id": ids[player2_id], "victim_id": ids[player1_id]},
+            ]
+        }
+    ):
+        counts[edge["killer_id"]] = edge.get("count", 0)
+    return (counts.get(ids[player1_id], 0), counts.get(ids[player2_id], 0))
+
+
+async def get_killed_players(
+    playfab_id: str, edges_collection: AsyncIOMotorCollection, player_ids: PlayerIds
+) -> list[dict]:
+    """Players killed by playfab_id, most killed first"""
+    player_id = await player_ids.lookup(playfab_id)
+    if player_id is None:
+        return []
+    return await edges_collection.aggregate(
+        aggregation.get_killed_players_pipeline(playfab_id, player_id)
+    ).to_list()
 
 
 async def update_achieved_ranks(
@@ -0,0 +1,110 @@
+import random
+import time
+from enum import Enum
+from common import logger
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_BASE_BACKOFF_SECS = 2
+DEFAULT_MAX_BACKOFF_SECS = 60
+
+
+class BreakerState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(ConnectionError):
+    pass
+
+
+class CircuitBreaker:
+    """Trips after consecutive failures, then lets a single probe through once the backoff ends
+
+    Each trip in a row doubles the backoff, up to max_backoff_secs, with jitter so
+    several breakers don't probe a restarting server in lockstep
+    """
+
+    _name: str
+    _failure_threshold: int
+    _base_backoff_secs: float
+    _max_backoff_secs: float
+    _failures: int
+    _trips: int
+    _retry_at: float
+    _probing: bool
+    state: BreakerState
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        base_backoff_secs: float = DEFAULT_BASE_BACKOFF_SECS,
+        max_backoff_secs: float = DEFAULT_MAX_BACKOFF_SECS,
+    ) -> None:
+        self._name = name
+        self._failure_threshold = max(1, failure_threshold)
+        self._base_backoff_secs = base_backoff_secs
+        self._max_backoff_secs = max_backoff_secs
+        self._failures = 0
+        self._trips = 0
+        self._retry_at = 0
+        self._probing = False
+        self.state = BreakerState.CLOSED
+
+    @property
+    def retry_in(self) -> float:
+        return max(0, self._retry_at - time.monotonic())
+
+    def before_attempt(self):
+        """Raise CircuitOpenError unless an attempt is allowed right now"""
+        if self.state == BreakerState.CLOSED:
+            return
+        if self.state == BreakerState.OPEN:
+            if time.monotonic() < self._retry_at:
+                raise CircuitOpenError(
+                    f"{self._name} circuit open, retrying in {self.retry_in:.1f}s"
+                )
+            logger.info(f"{self._name} circuit half open, probing...")
+            self.state = BreakerState.HALF_OPEN
+            self._probing = False
+        if self._probing:
+            raise CircuitOpenError(f"{self._name} circuit half open, probe in flight")
+        self._probing = True
+
+    def record_success(self):
+        if self.state != BreakerState.CLOSED:
+            logger.info(f"{self._name} circuit closed after {self._trips} trip(s)")
+        self.state = BreakerState.CLOSED
+        self._failures = 0
+        self._trips = 0
+        self._probing = False
+
+    def record_abandoned(self):
+        # attempt cancelled before it could tell anything, let another caller probe
+        self._probing = False
+
+    def record_failure(self):
+        if self.state == BreakerState.OPEN:
+            # an attempt let through before the trip, the backoff already accounts for it
+            return
+        self._failures += 1
+        self._probing = False
+        if (
+            self.state == BreakerState.HALF_OPEN
+            or self._failures >= self._failure_threshold
+        ):
+            self._trip()
+
+    def _trip(self):
+        self._trips += 1
+        backoff = min(
+            self._max_backoff_secs, self._base_backoff_secs * 2 ** (self._trips - 1)
+        )
+        # jitter between half and full backoff
+        backoff = random.uniform(backoff / 2, backoff)
+        self._retry_at = time.monotonic() + backoff
+        self.state = BreakerState.OPEN
+        logger.warning(
+            f"{self._name} circuit open after {self._failures} consecutive failure(s), retrying in {backoff:.1f}s"
+        )
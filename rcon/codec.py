@@ -0,0 +1,54 @@
+import struct
+
+HEADER = struct.Struct("<3i")
+HEADER_SIZE = HEADER.size
+# pkt_size covers id + type + body + two null terminators
+PACKET_OVERHEAD = 10
+TERMINATOR = b"\x00\x00"
+
+# bound once, skips the attribute lookups on the hot path
+_pack_header = HEADER.pack
+_unpack_header_from = HEADER.unpack_from
+
+
+def encode_packet(pkt_id: int, pkt_type: int, body: str) -> bytes:
+    body_bytes = body.encode("utf-8")
+    return b"".join(
+        (
+            _pack_header(len(body_bytes) + PACKET_OVERHEAD, pkt_id, pkt_type),
+            body_bytes,
+            TERMINATOR,
+        )
+    )
+
+
+def encode_packets(packets: list[tuple[int, int, str]]) -> bytes:
+    """Encode several packets into one buffer, ready for a single write"""
+    parts: list[bytes] = []
+    for pkt_id, pkt_type, body in packets:
+        body_bytes = body.encode("utf-8")
+        parts.append(_pack_header(len(body_bytes) + PACKET_OVERHEAD, pkt_id, pkt_type))
+        parts.append(body_bytes)
+        parts.append(TERMINATOR)
+    return b"".join(parts)
+
+
+def decode_header(header: bytes | memoryview, offset: int = 0) -> tuple[int, int, int]:
+    return _unpack_header_from(header, offset)
+
+
+def decode_body(payload: bytes | memoryview) -> str:
+    """Decode a packet payload (body + null terminators) into a clean string"""
+    if type(payload) is bytes:
+        body = payload.decode("utf-8", "replace")
+    else:
+        body = str(payload, "utf-8", "replace")
+    return body.rstrip("\x00").rstrip()
+
+
+def decode_packet(frame: bytes) -> tuple[int, int, str]:
+    """Decode one whole frame (header included) into (pkt_id, pkt_type, body)"""
+    (pkt_size, pkt_id, pkt_type) = _unpack_header_from(frame, 0)
+    view = memoryview(frame)
+    payload_end = HEADER_SIZE + pkt_size - 8
+    return (pkt_id, pkt_type, decode_body(view[HEADER_SIZE:payload_end]))
@@ -0,0 +1,63 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+# longer than any lag between two connections to the same server
+DEFAULT_WINDOW_SECS = 10
+
+
+@dataclass(slots=True)
+class SeenLine:
+    last_seen: float
+    emitted: int = 0
+    counts: list[int] = field(default_factory=list)
+
+
+class EventDeduplicator:
+    """Merges the same event stream received over several connections
+
+    A line is let through when a source has now seen it more times than it was
+    let through, so each copy is delivered once by whichever connection got it
+    first, and lines that genuinely repeat (two 'gg' in chat) still all make it
+    """
+
+    _window_secs: float
+    _sources: int
+    # oldest touched first, line -> what each source has seen of it
+    _lines: OrderedDict[str, SeenLine]
+    duplicates: int
+
+    def __init__(self, sources: int = 2, window_secs: float = DEFAULT_WINDOW_SECS):
+        self._window_secs = window_secs
+        self._sources = sources
+        self._lines = OrderedDict()
+        self.duplicates = 0
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def _expire(self, now: float):
+        cutoff = now - self._window_secs
+        while self._lines:
+            oldest = next(iter(self._lines.values()))
+            if oldest.last_seen >= cutoff:
+                return
+            self._lines.popitem(last=False)
+
+    def accept(self, source: int, line: str, now: float | None = None) -> bool:
+        if now is None:
+            now = time.monotonic()
+        self._expire(now)
+        seen = self._lines.get(line)
+        if seen is None:
+            seen = SeenLine(now, counts=[0] * self._sources)
+            self._lines[line] = seen
+        else:
+            seen.last_seen = now
+            self._lines.move_to_end(line)
+        seen.counts[source] += 1
+        if seen.counts[source] > seen.emitted:
+            seen.emitted += 1
+            return True
+        self.duplicates += 1
+        return False
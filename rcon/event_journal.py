@@ -0,0 +1,328 @@
+import asyncio
+import gzip
+import json
+import mmap
+import os
+import shutil
+import struct
+import threading
+import time
+from contextvars import ContextVar
+from typing import BinaryIO, Iterator
+from common import logger
+
+DEFAULT_DIRECTORY = "./persist/journal"
+DEFAULT_SEGMENT_BYTES = 16 * 1024 * 1024
+DEFAULT_SEGMENT_SECS = 3600
+# a week of hourly segments
+DEFAULT_RETAINED_SEGMENTS = 168
+FLUSH_INTERVAL_SECS = 1
+# received at (unix seconds), body length in bytes
+RECORD_HEADER = struct.Struct("<dI")
+SEGMENT_PREFIX = "segment_"
+SEGMENT_SUFFIX = ".log"
+COMPRESSED_SUFFIX = ".log.gz"
+CHECKPOINTS_FILE = "checkpoints.json"
+# receive time the line being handed to subscribers was journaled with, so whatever
+# they make of it can be checkpointed by it
+LINE_RECEIVED_AT: ContextVar[float | None] = ContextVar(
+    "line_received_at", default=None
+)
+
+
+def segment_started_at(file_name: str) -> float:
+    """Segments are named after the millisecond their first record was received"""
+    stem = file_name.removeprefix(SEGMENT_PREFIX).split(".", 1)[0]
+    return int(stem) / 1000
+
+
+def list_segments(directory: str) -> list[str]:
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        file_name
+        for file_name in os.listdir(directory)
+        if file_name.startswith(SEGMENT_PREFIX)
+        and (
+            file_name.endswith(SEGMENT_SUFFIX) or file_name.endswith(COMPRESSED_SUFFIX)
+        )
+    )
+
+
+def compress_segment(path: str) -> str:
+    compressed_path = path.removesuffix(SEGMENT_SUFFIX) + COMPRESSED_SUFFIX
+    with open(path, "rb") as source, gzip.open(compressed_path, "wb") as target:
+        shutil.copyfileobj(source, target)
+    os.remove(path)
+    return compressed_path
+
+
+def _read_records(data) -> Iterator[tuple[float, str]]:
+    offset = 0
+    size = len(data)
+    header_size = RECORD_HEADER.size
+    while offset + header_size <= size:
+        (received_at, body_size) = RECORD_HEADER.unpack_from(data, offset)
+        offset += header_size
+        end = offset + body_size
+        if end > size:
+            # torn write from a crash, nothing after it is whole
+            return
+        yield (received_at, data[offset:end].decode("utf-8"))
+        offset = end
+
+
+def read_segment(path: str) -> Iterator[tuple[float, str]]:
+    """Records of a segment in the order they were received, as (received_at, line)"""
+    if path.endswith(COMPRESSED_SUFFIX):
+        with gzip.open(path, "rb") as compressed:
+            yield from _read_records(compressed.read())
+        return
+    with open(path, "rb") as segment:
+        if os.fstat(segment.fileno()).st_size == 0:
+            return
+        with mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield from _read_records(mapped)
+
+
+def read_journal(
+    directory: str = DEFAULT_DIRECTORY,
+    since: float = 0,
+    until: float = float("inf"),
+) -> Iterator[tuple[float, str]]:
+    """Records received after since and before until, across every segment"""
+    segments = list_segments(directory)
+    for index, file_name in enumerate(segments):
+        if segment_started_at(file_name) >= until:
+            return
+        next_started_at = (
+            segment_started_at(segments[index + 1])
+            if index + 1 < len(segments)
+            else float("inf")
+        )
+        if next_started_at <= since:
+            continue
+        for received_at, line in read_segment(os.path.join(directory, file_name)):
+            if since < received_at < until:
+                yield (received_at, line)
+
+
+def read_checkpoint(directory: str, name: str) -> float | None:
+    path = os.path.join(directory, CHECKPOINTS_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf8") as checkpoints_file:
+        return json.load(checkpoints_file).get(name, None)
+
+
+def write_checkpoint(directory: str, name: str, received_at: float):
+    """Record that everything name got before received_at is safely stored elsewhere"""
+    path = os.path.join(directory, CHECKPOINTS_FILE)
+    checkpoints: dict[str, float] = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf8") as checkpoints_file:
+            checkpoints = json.load(checkpoints_file)
+    checkpoints[name] = received_at
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf8") as checkpoints_file:
+        json.dump(checkpoints, checkpoints_file, indent=2)
+    os.replace(temp_path, path)
+
+
+class EventJournal:
+    """Append only log of raw listener lines with their receive time
+
+    Appends only go to an in-process buffer, the buffer is written out, and segments
+    opened and closed, off the event loop every FLUSH_INTERVAL_SECS, so the ingest path
+    never waits on disk. Closed segments are compressed and pruned by a single
+    maintenance task, also off the event loop
+    """
+
+    directory: str
+    _segment_bytes: int
+    _segment_secs: float
+    _compress: bool
+    _retained_segments: int
+    # records waiting to be written as (received_at of the segment they open, or None
+    # to go on with the current one, record bytes)
+    _batches: list[tuple[float | None, bytearray]]
+    # segments as appends see them, the buffer may not have reached disk yet
+    _segment_size: int
+    _segment_opened_at: float | None
+    # file handling happens on worker threads, one writer at a time
+    _write_lock: threading.Lock
+    _file: BinaryIO | None
+    _segment_path: str | None
+    _maintenance: asyncio.Task | None
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_DIRECTORY,
+        segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+        segment_secs: float = DEFAULT_SEGMENT_SECS,
+        compress: bool = True,
+        retained_segments: int = DEFAULT_RETAINED_SEGMENTS,
+    ) -> None:
+        self.directory = directory
+        self._segment_bytes = segment_bytes
+        self._segment_secs = segment_secs
+        self._compress = compress
+        self._retained_segments = retained_segments
+        self._batches = []
+        self._segment_size = 0
+        self._segment_opened_at = None
+        self._write_lock = threading.Lock()
+        self._file = None
+        self._segment_path = None
+        self._maintenance = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _open_segment(self, received_at: float):
+        started_at_ms = int(received_at * 1000)
+        path = os.path.join(
+            self.directory, f"{SEGMENT_PREFIX}{started_at_ms:015d}{SEGMENT_SUFFIX}"
+        )
+        while os.path.exists(path) or os.path.exists(
+            path.removesuffix(SEGMENT_SUFFIX) + COMPRESSED_SUFFIX
+        ):
+            started_at_ms += 1
+            path = os.path.join(
+                self.directory, f"{SEGMENT_PREFIX}{started_at_ms:015d}{SEGMENT_SUFFIX}"
+            )
+        self._file = open(path, "ab", buffering=64 * 1024)
+        self._segment_path = path
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        self._segment_path = None
+
+    def _rotate(self, received_at: float):
+        self._batches.append((received_at, bytearray()))
+        self._segment_size = 0
+        self._segment_opened_at = received_at
+
+    def append(self, line: str, received_at: float | None = None):
+        if received_at is None:
+            received_at = time.time()
+        if (
+            self._segment_opened_at is None
+            or self._segment_size >= self._segment_bytes
+            or received_at - self._segment_opened_at >= self._segment_secs
+        ):
+            self._rotate(received_at)
+        elif not self._batches:
+            self._batches.append((None, bytearray()))
+        body = line.encode("utf-8")
+        record = RECORD_HEADER.pack(received_at, len(body)) + body
+        self._batches[-1][1].extend(record)
+        self._segment_size += len(record)
+
+    def _take_batches(self) -> list[tuple[float | None, bytearray]]:
+        (batches, self._batches) = (self._batches, [])
+        return batches
+
+    def _write_batches(
+        self, batches: list[tuple[float | None, bytearray]]
+    ) -> str | None:
+        """Write records out, blocking; returns the last segment opened on the way, if any"""
+        opened = None
+        with self._write_lock:
+            for opens_at, data in batches:
+                if opens_at is not None:
+                    self._close_segment()
+                    self._open_segment(opens_at)
+                    opened = self._segment_path
+                if data and self._file is not None:
+                    self._file.write(data)
+            if self._file is not None:
+                self._file.flush()
+        return opened
+
+    def flush(self):
+        """Write out everything appended so far and tidy up rotated segments, blocking"""
+        opened = self._write_batches(self._take_batches())
+        if opened is not None:
+            self.maintain(opened)
+
+    async def _flush(self):
+        opened = await asyncio.to_thread(self._write_batches, self._take_batches())
+        if opened is not None:
+            self._start_maintenance(opened)
+
+    def _start_maintenance(self, current_path: str | None):
+        if self._maintenance is not None and not self._maintenance.done():
+            # it picks up every closed segment, the next rotation gets what this one missed
+            return
+        self._maintenance = asyncio.create_task(self._maintain(current_path))
+
+    async def _maintain(self, current_path: str | None):
+        try:
+            await asyncio.to_thread(self.maintain, current_path)
+        except Exception as e:
+            logger.error(f"EventJournal: maintenance failed: {e}")
+
+    def _closed_segments(self, current: str | None) -> list[str]:
+        return [
+            file_name
+            for file_name in list_segments(self.directory)
+            if current is None or file_name < current
+        ]
+
+    def maintain(self, current_path: str | None = None):
+        """Compress closed segments and drop the oldest beyond retention, blocking
+
+        Runs off the event loop, so the segment being written is passed in rather than
+        read, only segments named before it are touched
+        """
+        current = os.path.basename(current_path) if current_path else None
+        segments = self._closed_segments(current)
+        if self._compress:
+            for file_name in segments:
+                if not file_name.endswith(SEGMENT_SUFFIX):
+                    continue
+                try:
+                    compress_segment(os.path.join(self.directory, file_name))
+                except Exception as e:
+                    logger.error(f"EventJournal: failed to compress {file_name}: {e}")
+            segments = self._closed_segments(current)
+        # the current segment counts towards retention too
+        expired = max(0, len(segments) + 1 - self._retained_segments)
+        for file_name in segments[:expired]:
+            try:
+                os.remove(os.path.join(self.directory, file_name))
+            except Exception as e:
+                logger.error(f"EventJournal: failed to remove {file_name}: {e}")
+
+    def _close(self, batches: list[tuple[float | None, bytearray]]):
+        opened = self._write_batches(batches)
+        if opened is not None:
+            self.maintain(opened)
+        with self._write_lock:
+            self._close_segment()
+
+    def close(self):
+        self._close(self._take_batches())
+
+    async def start(self):
+        if self._segment_opened_at is None:
+            self._rotate(time.time())
+        # opening the first segment tidies up segments left by a previous run
+        await self._flush()
+        try:
+            while True:
+                await asyncio.sleep(FLUSH_INTERVAL_SECS)
+                if (
+                    self._segment_opened_at is not None
+                    and time.time() - self._segment_opened_at >= self._segment_secs
+                ):
+                    # quiet servers still rotate on time
+                    self._rotate(time.time())
+                try:
+                    await self._flush()
+                except Exception as e:
+                    logger.error(f"EventJournal: failed to flush: {e}")
+        finally:
+            await asyncio.to_thread(self._close, self._take_batches())
@@ -0,0 +1,357 @@
+import argparse
+import asyncio
+import random
+import secrets
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+import faker
+from common import logger
+from rcon.codec import HEADER, PACKET_OVERHEAD, TERMINATOR, encode_packet
+from rcon.framing import MAX_FRAGMENT_SIZE, RconFrameReader
+
+# Fake Mordhau RCON server, speaks the same auth/exec protocol rcon/rcon.py expects
+# and pushes synthetic listener events, meant for offline load tests
+# run from repo root: python -m rcon.fake_server --help
+
+SERVERDATA_AUTH = 3
+SERVERDATA_AUTH_RESPONSE = 2
+SERVERDATA_RESPONSE_VALUE = 0
+EVENT_PKT_ID = 0
+DATE_FORMAT = r"%Y.%m.%d-%H.%M.%S"
+MATCH_STATES = ["Waiting to start", "In progress", "Leaving map"]
+LISTENABLE_EVENTS = ["chat", "killfeed", "login", "matchstate"]
+MAX_BODY_PER_PACKET = MAX_FRAGMENT_SIZE - PACKET_OVERHEAD
+
+fake = faker.Faker()
+
+
+@dataclass
+class LoadProfile:
+    players: int = 80
+    killfeed_per_sec: float = 2.0
+    chat_per_sec: float = 0.5
+    login_per_sec: float = 0.1
+    matchstate_interval_secs: float = 600.0
+    latency_ms: float = 20.0
+    jitter_ms: float = 10.0
+    rate_multiplier: float = 1.0
+
+
+@dataclass
+class FakePlayer:
+    playfab_id: str
+    user_name: str
+    team: int
+
+
+@dataclass
+class FakeConnection:
+    id: int
+    writer: asyncio.StreamWriter
+    authenticated: bool = False
+    subscriptions: set[str] = field(default_factory=set)
+    last_send_at: float = 0
+
+
+def make_player() -> FakePlayer:
+    return FakePlayer(
+        secrets.token_hex(8).upper(), fake.user_name(), random.randint(0, 1)
+    )
+
+
+def encode_split_response(pkt_id: int, body: str) -> bytes:
+    # like the game server, big bodies are cut on raw bytes, a utf-8 char may straddle two packets
+    body_bytes = body.encode("utf-8")
+    parts: list[bytes] = []
+    for start in range(0, max(len(body_bytes), 1), MAX_BODY_PER_PACKET):
+        end = start + MAX_BODY_PER_PACKET
+        chunk = body_bytes[start:end]
+        parts.append(
+            HEADER.pack(len(chunk) + PACKET_OVERHEAD, pkt_id, SERVERDATA_RESPONSE_VALUE)
+        )
+        parts.append(chunk)
+        parts.append(TERMINATOR)
+    return b"".join(parts)
+
+
+class FakeMordhauServer:
+    _password: str
+    _profile: LoadProfile
+    _connections: dict[int, FakeConnection]
+    _server: asyncio.Server | None
+    _generators: list[asyncio.Task]
+    players: dict[str, FakePlayer]
+    match_state: str
+    commands: Counter[str]
+    events: Counter[str]
+
+    def __init__(
+        self,
+        password: str = "",
+        profile: LoadProfile | None = None,
+    ) -> None:
+        self._password = password
+        self._profile = profile or LoadProfile()
+        if self._profile.matchstate_interval_secs <= 0:
+            raise ValueError(
+                f"matchstate_interval_secs must be positive, got {self._profile.matchstate_interval_secs}"
+            )
+        self._connections = {}
+        self._server = None
+        self._generators = []
+        self._connection_counter = 0
+        self.players = {}
+        for _ in range(self._profile.players):
+            player = make_player()
+            self.players[player.playfab_id] = player
+        self.match_state = "In progress"
+        self.commands = Counter()
+        self.events = Counter()
+
+    @property
+    def port(self) -> int:
+        if not self._server or not self._server.sockets:
+            return 0
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host: str = "127.0.0.1", port: int = 7779):
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        profile = self._profile
+        multiplier = profile.rate_multiplier
+        self._generators = [
+            asyncio.create_task(
+                self._generate(profile.killfeed_per_sec * multiplier, self._killfeed)
+            ),
+            asyncio.create_task(
+                self._generate(profile.chat_per_sec * multiplier, self._chat)
+            ),
+            asyncio.create_task(
+                self._generate(profile.login_per_sec * multiplier, self._login_churn)
+            ),
+            asyncio.create_task(
+                self._generate(
+                    multiplier / profile.matchstate_interval_secs,
+                    self._next_match_state,
+                )
+            ),
+        ]
+        logger.info(
+            f"Fake Mordhau RCON server listening on {host}:{self.port} with {len(self.players)} players"
+        )
+
+    async def stop(self):
+        for task in self._generators:
+            task.cancel()
+        for connection in list(self._connections.values()):
+            connection.writer.close()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def _send(self, connection: FakeConnection, pkt_id: int, body: str):
+        # responses keep their order even with jitter, a later one never overtakes
+        profile = self._profile
+        loop = asyncio.get_running_loop()
+        delay = max(0, profile.latency_ms + random.uniform(-1, 1) * profile.jitter_ms)
+        send_at = max(connection.last_send_at, loop.time() + delay / 1000)
+        connection.last_send_at = send_at
+        payload = encode_split_response(pkt_id, body)
+        loop.call_at(send_at, self._write, connection, payload)
+
+    def _write(self, connection: FakeConnection, payload: bytes):
+        if connection.writer.is_closing():
+            return
+        connection.writer.write(payload)
+
+    def info(self) -> str:
+        return "\n".join(
+            [
+                "HostName: FAKE_SERVER",
+                "ServerName: Fake Mordhau Server",
+                "Version: Release 26, Revision 25635, Enforced 1, Release Ver: 7",
+                "GameMode: Skirmish",
+                "Map: Grad",
+            ]
+        )
+
+    def playerlist(self) -> str:
+        if not self.players:
+            return "There are currently no players present"
+        return "\n".join(
+            [
+                f"{p.playfab_id}, {p.user_name}, {random.randint(20, 120)} ms, team {p.team}"
+                for p in self.players.values()
+            ]
+        )
+
+    def handle_command(self, connection: FakeConnection, command: str) -> str:
+        (command_key, _, args) = command.partition(" ")
+        command_key = command_key.lower()
+        self.commands[command_key] += 1
+        if command_key == "listen":
+            event = args.strip().lower()
+            if event not in LISTENABLE_EVENTS:
+                return f"Unknown event {event}"
+            connection.subscriptions.add(event)
+            return f"Listening to {event} events"
+        elif command_key == "alive":
+            return "Keeping client alive for another 300 seconds"
+        elif command_key == "say":
+            return "Message sent"
+        elif command_key == "renameplayer":
+            (playfab_id, _, new_name) = args.partition(" ")
+            player = self.players.get(playfab_id)
+            if not player:
+                return f"Player {playfab_id} not found"
+            player.user_name = new_name
+            return f"Renamed player {playfab_id} to {new_name}"
+        elif command_key == "info":
+            return self.info()
+        elif command_key == "playerlist":
+            return self.playerlist()
+        return f"Unknown command {command_key}"
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        self._connection_counter += 1
+        connection = FakeConnection(self._connection_counter, writer)
+        self._connections[connection.id] = connection
+        frames = RconFrameReader(reader)
+        try:
+            while True:
+                packet = await frames.read_packet()
+                if packet.pkt_type == SERVERDATA_AUTH:
+                    connection.authenticated = packet.body == self._password
+                    response_id = packet.pkt_id if connection.authenticated else -1
+                    writer.write(
+                        encode_packet(response_id, SERVERDATA_AUTH_RESPONSE, "")
+                    )
+                    continue
+                if not connection.authenticated:
+                    writer.write(encode_packet(-1, SERVERDATA_AUTH_RESPONSE, ""))
+                    continue
+                response = self.handle_command(connection, packet.body)
+                self._send(connection, packet.pkt_id, response)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            self._connections.pop(connection.id, None)
+            writer.close()
+
+    def broadcast(self, event: str, line: str):
+        self.events[event] += 1
+        payload = encode_packet(EVENT_PKT_ID, SERVERDATA_RESPONSE_VALUE, line)
+        for connection in self._connections.values():
+            if event in connection.subscriptions and not connection.writer.is_closing():
+                connection.writer.write(payload)
+
+    async def _generate(self, rate: float, emit):
+        if rate <= 0:
+            return
+        while True:
+            await asyncio.sleep(random.expovariate(rate))
+            emit()
+
+    def _now(self) -> str:
+        return datetime.now().strftime(DATE_FORMAT)
+
+    def _killfeed(self):
+        if len(self.players) < 2:
+            return
+        (killer, killed) = random.sample(list(self.players.values()), 2)
+        self.broadcast(
+            "killfeed",
+            f"Killfeed: {self._now()}: {killer.playfab_id} ({killer.user_name}) killed {killed.playfab_id} ({killed.user_name})",
+        )
+
+    def _chat(self):
+        if not self.players:
+            return
+        player = random.choice(list(self.players.values()))
+        message = fake.sentence(nb_words=random.randint(2, 10))
+        self.broadcast(
+            "chat",
+            f"Chat: {player.playfab_id}, {player.user_name}, (ALL) {message}",
+        )
+
+    def _login_churn(self):
+        # keeps the population around the profile's player count
+        logging_out = self.players and (
+            len(self.players) >= self._profile.players or random.random() < 0.5
+        )
+        if logging_out:
+            player = random.choice(list(self.players.values()))
+            self.players.pop(player.playfab_id)
+            instance = "out"
+        else:
+            player = make_player()
+            self.players[player.playfab_id] = player
+            instance = "in"
+        self.broadcast(
+            "login",
+            f"Login: {self._now()}: {player.user_name} ({player.playfab_id}) logged {instance}",
+        )
+
+    def _next_match_state(self):
+        index = MATCH_STATES.index(self.match_state)
+        self.match_state = MATCH_STATES[(index + 1) % len(MATCH_STATES)]
+        self.broadcast("matchstate", f"MatchState: {self.match_state}")
+
+    def stats(self) -> str:
+        lagging = [
+            connection.writer.transport.get_write_buffer_size()
+            for connection in self._connections.values()
+        ]
+        return (
+            f"connections={len(self._connections)} players={len(self.players)} "
+            f"events={dict(self.events)} commands={dict(self.commands)} "
+            f"max_write_buffer={max(lagging, default=0)}"
+        )
+
+
+async def main(args: argparse.Namespace):
+    profile = LoadProfile(
+        players=args.players,
+        killfeed_per_sec=args.killfeed_rate,
+        chat_per_sec=args.chat_rate,
+        login_per_sec=args.login_rate,
+        matchstate_interval_secs=args.matchstate_interval,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_multiplier=args.multiplier,
+    )
+    server = FakeMordhauServer(args.password, profile)
+    await server.start(args.host, args.port)
+    started = time.time()
+    try:
+        while True:
+            await asyncio.sleep(args.stats_interval)
+            logger.info(f"[{round(time.time() - started)}s] {server.stats()}")
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    logger.use_date_time_logger()
+    parser = argparse.ArgumentParser(description="Fake Mordhau RCON server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7779)
+    parser.add_argument("--password", default="")
+    parser.add_argument("--players", type=int, default=80)
+    parser.add_argument("--killfeed-rate", type=float, default=2.0)
+    parser.add_argument("--chat-rate", type=float, default=0.5)
+    parser.add_argument("--login-rate", type=float, default=0.1)
+    parser.add_argument("--matchstate-interval", type=float, default=600.0)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument(
+        "--multiplier",
+        type=float,
+        default=1.0,
+        help="scales every event rate, i.e. 10 for a 10x peak load test",
+    )
+    parser.add_argument("--stats-interval", type=float, default=10.0)
+    asyncio.run(main(parser.parse_args()))
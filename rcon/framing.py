@@ -0,0 +1,108 @@
+import asyncio
+from rcon.codec import (
+    HEADER_SIZE,
+    PACKET_OVERHEAD,
+    TERMINATOR,
+    decode_body,
+    decode_header,
+    encode_packet,
+)
+
+# servers split responses bigger than this into several packets sharing the same id
+MAX_FRAGMENT_SIZE = 4096
+# anything bigger than this is not a sane RCON packet, stream is most likely desynced
+MAX_ACCEPTED_PACKET_SIZE = 1 << 20
+CONTINUATION_TIMEOUT_SECS = 0.5
+
+
+# src: https://github.com/pmrowla/pysrcds/blob/master/srcds/rcon.py
+class RconPacket:
+    """RCON packet"""
+
+    __slots__ = ("pkt_id", "pkt_type", "body")
+
+    def __init__(self, pkt_id=0, pkt_type=-1, body=""):
+        self.pkt_id = pkt_id
+        self.pkt_type = pkt_type
+        self.body = body
+
+    def __str__(self):
+        """Return the body string."""
+        return self.body
+
+    def size(self):
+        """Return the pkt_size field for this packet."""
+        return len(self.body.encode("utf-8")) + PACKET_OVERHEAD
+
+    def pack(self):
+        """Return the packed version of the packet."""
+        return encode_packet(self.pkt_id, self.pkt_type, self.body)
+
+
+class RconFrameReader:
+    """Reads whole RCON frames out of a stream, never returning short reads"""
+
+    _reader: asyncio.StreamReader
+    _lookahead: tuple[int, int, int, bytes] | None
+
+    def __init__(self, reader: asyncio.StreamReader) -> None:
+        self._reader = reader
+        self._lookahead = None
+
+    async def _read_header(self) -> tuple[int, int, int]:
+        try:
+            header = await self._reader.readexactly(HEADER_SIZE)
+        except asyncio.IncompleteReadError as e:
+            raise ConnectionError(
+                f"RCON connection closed by server ({len(e.partial)}/{HEADER_SIZE} header bytes read)"
+            ) from e
+        (pkt_size, pkt_id, pkt_type) = decode_header(header)
+        if pkt_size < PACKET_OVERHEAD or pkt_size > MAX_ACCEPTED_PACKET_SIZE:
+            raise ValueError(f"MALFORMED PACKET, INVALID SIZE {pkt_size}")
+        return (pkt_size, pkt_id, pkt_type)
+
+    async def _read_payload(self, pkt_size: int) -> bytes:
+        # pkt_size includes the id and type fields which are part of the header
+        try:
+            return await self._reader.readexactly(pkt_size - 8)
+        except asyncio.IncompleteReadError as e:
+            raise ConnectionError(
+                f"RCON connection closed by server mid packet ({len(e.partial)}/{pkt_size - 8} body bytes read)"
+            ) from e
+
+    async def _read_frame(self) -> tuple[int, int, int, bytes]:
+        if self._lookahead is not None:
+            frame = self._lookahead
+            self._lookahead = None
+            return frame
+        (pkt_size, pkt_id, pkt_type) = await self._read_header()
+        payload = await self._read_payload(pkt_size)
+        return (pkt_size, pkt_id, pkt_type, payload)
+
+    async def read_packet(self) -> RconPacket:
+        """Read exactly one RCON packet"""
+        (_, pkt_id, pkt_type, payload) = await self._read_frame()
+        return RconPacket(pkt_id, pkt_type, decode_body(payload))
+
+    async def read_response(
+        self, continuation_timeout: float = CONTINUATION_TIMEOUT_SECS
+    ) -> RconPacket:
+        """Read one RCON response, reassembling it if the server split it in several packets"""
+        (pkt_size, pkt_id, pkt_type, payload) = await self._read_frame()
+        fragments = [memoryview(payload)[: -len(TERMINATOR)]]
+        while pkt_size >= MAX_FRAGMENT_SIZE:
+            try:
+                # waiting on the header alone is safe to time out, readexactly
+                # won't consume anything until the whole header is buffered
+                async with asyncio.timeout(continuation_timeout):
+                    (pkt_size, next_id, next_type) = await self._read_header()
+            except TimeoutError:
+                break
+            next_payload = await self._read_payload(pkt_size)
+            if next_id != pkt_id:
+                self._lookahead = (pkt_size, next_id, next_type, next_payload)
+                break
+            fragments.append(memoryview(next_payload)[: -len(TERMINATOR)])
+        if len(fragments) == 1:
+            return RconPacket(pkt_id, pkt_type, decode_body(fragments[0]))
+        return RconPacket(pkt_id, pkt_type, decode_body(b"".join(fragments)))
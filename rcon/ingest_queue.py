@@ -0,0 +1,143 @@
+import asyncio
+from collections import Counter, deque
+from itertools import count
+from enum import Enum
+from typing import Callable
+
+DEFAULT_MAX_SIZE = 10000
+# when full under DROP_BY_TYPE, lines of the first type go before the second and so on,
+# anything not listed is only dropped once nothing listed is left
+DEFAULT_DROP_ORDER = ("Chat", "Killfeed")
+
+
+class OverflowPolicy(Enum):
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    DROP_BY_TYPE = "drop_by_type"
+
+
+def event_type(line: str) -> str:
+    (prefix, _, _) = line.partition(":")
+    return prefix
+
+
+class IngestQueue:
+    """Bounded buffer of raw event lines between a socket reader and its subscribers"""
+
+    # (arrival, received at, line) per drop rank, lines not in the drop order share
+    # the last one
+    _lanes: list[deque[tuple[int, float | None, str]]]
+    _ranks: dict[str, int]
+    _arrivals: count
+    _size: int
+    _max_size: int
+    _policy: OverflowPolicy
+    _not_empty: asyncio.Event
+    _not_full: asyncio.Event
+    _on_drop: Callable[[str], None] | None
+    dropped: Counter[str]
+    high_watermark: int
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_MAX_SIZE,
+        policy: OverflowPolicy = OverflowPolicy.DROP_BY_TYPE,
+        drop_order: tuple[str, ...] = DEFAULT_DROP_ORDER,
+        on_drop: Callable[[str], None] | None = None,
+    ) -> None:
+        self._ranks = {line_type: rank for (rank, line_type) in enumerate(drop_order)}
+        self._lanes = [deque() for _ in range(len(drop_order) + 1)]
+        self._arrivals = count()
+        self._size = 0
+        self._max_size = max(1, max_size)
+        self._policy = policy
+        self._on_drop = on_drop
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self.dropped = Counter()
+        self.high_watermark = 0
+
+    @property
+    def depth(self) -> int:
+        return self._size
+
+    def full(self) -> bool:
+        return self._size >= self._max_size
+
+    @property
+    def blocking(self) -> bool:
+        """Whether put waits for room right now"""
+        return self._policy == OverflowPolicy.BLOCK and self.full()
+
+    def _drop(self, line: str):
+        line_type = event_type(line)
+        self.dropped[line_type] += 1
+        if self._on_drop:
+            self._on_drop(line_type)
+
+    def _drop_rank(self, line: str) -> int:
+        return self._ranks.get(event_type(line), len(self._lanes) - 1)
+
+    def _pop_oldest(self) -> tuple[float | None, str]:
+        lane = min((lane for lane in self._lanes if lane), key=lambda lane: lane[0][0])
+        self._size -= 1
+        (_, received_at, line) = lane.popleft()
+        return (received_at, line)
+
+    def _make_room(self, line: str) -> bool:
+        """Evict a queued line for the incoming one, False if the incoming one is dropped instead"""
+        if self._policy == OverflowPolicy.DROP_OLDEST:
+            self._drop(self._pop_oldest()[1])
+            return True
+        incoming_rank = self._drop_rank(line)
+        # oldest queued line of the most droppable type present
+        victim_rank = next(rank for (rank, lane) in enumerate(self._lanes) if lane)
+        if incoming_rank < victim_rank:
+            self._drop(line)
+            return False
+        self._size -= 1
+        self._drop(self._lanes[victim_rank].popleft()[2])
+        return True
+
+    def _append(self, line: str, received_at: float | None):
+        self._lanes[self._drop_rank(line)].append(
+            (next(self._arrivals), received_at, line)
+        )
+        self._size += 1
+        self.high_watermark = max(self.high_watermark, self._size)
+        self._not_empty.set()
+        if self.full():
+            self._not_full.clear()
+
+    def put_nowait(self, line: str, received_at: float | None = None) -> bool:
+        """Queue line, evicting per policy when full; BLOCK drops the line instead of waiting
+
+        received_at travels with the line, see get_received
+        """
+        if self.full():
+            if self._policy == OverflowPolicy.BLOCK:
+                self._drop(line)
+                return False
+            if not self._make_room(line):
+                return False
+        self._append(line, received_at)
+        return True
+
+    async def put(self, line: str, received_at: float | None = None) -> bool:
+        if self._policy == OverflowPolicy.BLOCK:
+            while self.full():
+                await self._not_full.wait()
+        return self.put_nowait(line, received_at)
+
+    async def get_received(self) -> tuple[float | None, str]:
+        """Oldest line as (received_at it was queued with, line)"""
+        while not self._size:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        entry = self._pop_oldest()
+        self._not_full.set()
+        return entry
+
+    async def get(self) -> str:
+        return (await self.get_received())[1]
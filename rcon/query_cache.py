@@ -0,0 +1,133 @@
+import asyncio
+import time
+from common import logger
+from common.gc_shield import backtask
+from common.metrics import METRICS
+from rcon.rcon_pool import RconConnectionPool, RconPriority
+
+DEFAULT_TTL_SECS = 5
+# read only commands, safe to answer from a recent response
+CACHEABLE_COMMANDS = ("info", "playerlist")
+
+
+class RconQueryCache:
+    """Short lived cache for read only RCON commands
+
+    Concurrent requests for the same command share a single in-flight call, and
+    anything fetched while an invalidation happened is returned but not cached
+    """
+
+    _pool: RconConnectionPool
+    _ttl_secs: float
+    # command -> (expires_at, response)
+    _entries: dict[str, tuple[float, str]]
+    # command -> (lane it was fetched on, future)
+    _in_flight: dict[str, tuple[RconPriority, asyncio.Future[str]]]
+    _generation: int
+
+    def __init__(
+        self, rcon_pool: RconConnectionPool, ttl_secs: float = DEFAULT_TTL_SECS
+    ) -> None:
+        self._pool = rcon_pool
+        self._ttl_secs = ttl_secs
+        self._entries = {}
+        self._in_flight = {}
+        self._generation = 0
+
+    def invalidate(self, command: str | None = None):
+        self._generation += 1
+        if command is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(command, None)
+
+    def _cached(self, command: str) -> str | None:
+        entry = self._entries.get(command)
+        if entry is None:
+            return None
+        (expires_at, response) = entry
+        if expires_at < time.monotonic():
+            del self._entries[command]
+            return None
+        return response
+
+    async def _fetch(
+        self,
+        commands: list[str],
+        futures: list[asyncio.Future[str]],
+        priority: RconPriority,
+        generation: int,
+    ):
+        try:
+            client = await self._pool.get_client(priority)
+            try:
+                results = await client.execute_many(commands)
+                if any(isinstance(result, Exception) for result in results):
+                    client.used = 120
+            finally:
+                await self._pool.release_client(client, priority)
+        except Exception as e:
+            results = [e for _ in commands]
+        expires_at = time.monotonic() + self._ttl_secs
+        for command, future, result in zip(commands, futures, results):
+            if self._in_flight.get(command, (None, None))[1] is future:
+                del self._in_flight[command]
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                logger.error(f"[RconQueryCache] Failed to query `{command}`: {result}")
+                future.set_exception(result)
+                continue
+            if generation == self._generation:
+                self._entries[command] = (expires_at, result)
+            future.set_result(result)
+
+    async def query_many(
+        self, commands: list[str], priority: RconPriority = RconPriority.GAMEPLAY
+    ) -> list[str]:
+        """Answer each command from cache, an in-flight call or one shared batch of the rest"""
+        uncacheable = [c for c in commands if c not in CACHEABLE_COMMANDS]
+        if uncacheable:
+            raise ValueError(f"Commands {uncacheable} are not cacheable")
+        loop = asyncio.get_running_loop()
+        pending: list[asyncio.Future[str]] = []
+        to_fetch: list[str] = []
+        to_fetch_futures: list[asyncio.Future[str]] = []
+        for command in commands:
+            cached = self._cached(command)
+            in_flight = self._in_flight.get(command)
+            if cached is not None:
+                METRICS.increment("rcon.query_cache.hit")
+                future = loop.create_future()
+                future.set_result(cached)
+            elif in_flight is not None and in_flight[0] <= priority:
+                # only join calls at least as urgent, a queued background call would hold us back
+                METRICS.increment("rcon.query_cache.shared")
+                future = in_flight[1]
+            else:
+                METRICS.increment("rcon.query_cache.miss")
+                future = loop.create_future()
+                self._in_flight[command] = (priority, future)
+                to_fetch.append(command)
+                to_fetch_futures.append(future)
+            pending.append(future)
+        if to_fetch:
+            # run apart from the caller, the callers sharing these futures outlive its cancellation
+            backtask(
+                self._fetch(to_fetch, to_fetch_futures, priority, self._generation)
+            )
+        # shielded, a cancelled caller must not cancel a future other callers share
+        results = await asyncio.gather(
+            *[asyncio.shield(future) for future in pending], return_exceptions=True
+        )
+        for result in results:
+            # raise the first failure, like a plain execute would
+            if isinstance(result, BaseException):
+                raise result
+        return [str(result) for result in results]
+
+    async def query(
+        self, command: str, priority: RconPriority = RconPriority.GAMEPLAY
+    ) -> str:
+        (response,) = await self.query_many([command], priority)
+        return response
@@ -1,47 +1,22 @@
 import asyncio
-import struct
 from contextlib import AbstractAsyncContextManager
 from common import logger
+from common.metrics import METRICS
 import faker
 import time
 from config_client.data import bot_config
+from rcon.codec import encode_packet, encode_packets
+from rcon.framing import RconFrameReader, RconPacket
 
 # Packet types
 SERVERDATA_AUTH = 3
 SERVERDATA_EXECCOMMAND = 2
 DEFAULT_RCON_CONNECT_TIMEOUT = 5
+DEFAULT_MAX_IN_FLIGHT = 8
 
 fake = faker.Faker()
 
 
-# src: https://github.com/pmrowla/pysrcds/blob/master/srcds/rcon.py
-class RconPacket:
-    """RCON packet"""
-
-    def __init__(self, pkt_id=0, pkt_type=-1, body=""):
-        self.pkt_id = pkt_id
-        self.pkt_type = pkt_type
-        self.body = body
-
-    def __str__(self):
-        """Return the body string."""
-        return self.body
-
-    def size(self):
-        """Return the pkt_size field for this packet."""
-        return len(self.body) + 10
-
-    def pack(self):
-        """Return the packed version of the packet."""
-        return struct.pack(
-            "<3i{0}s".format(len(self.body) + 2),
-            self.size(),
-            self.pkt_id,
-            self.pkt_type,
-            bytearray(self.body, "utf-8"),
-        )
-
-
 # src: https://github.com/pmrowla/pysrcds/blob/master/srcds/rcon.py
 def get_login_packet(pwd: str):
     serverdata_auth = 3
@@ -57,9 +32,18 @@ class RconClient:
     _address: str
     _reader: asyncio.StreamReader
     _writer: asyncio.StreamWriter
+    _frames: RconFrameReader
     _counter: int
     _connect_timeout: int
     _cmd_lock: asyncio.Lock
+    _pipelined: bool
+    _pending: dict[int, asyncio.Future[RconPacket]]
+    _in_flight: asyncio.Semaphore
+    _max_in_flight: int
+    # a batch takes its slots one after the other, one batch at a time so two can't
+    # each hold part of what the other waits for
+    _batch_slots: asyncio.Lock
+    _response_router: asyncio.Task | None
     created: float
     used: float
     id: str
@@ -72,7 +56,22 @@ class RconClient:
     def age_since_used(self):
         return time.time() - self.used
 
-    def __init__(self) -> None:
+    @property
+    def pipelined(self):
+        return self._pipelined
+
+    @property
+    def in_flight(self):
+        return len(self._pending)
+
+    @property
+    def routing(self) -> bool:
+        """Whether responses on this socket are being read and handed to their commands"""
+        return self._response_router is not None and not self._response_router.done()
+
+    def __init__(
+        self, pipelined: bool = False, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT
+    ) -> None:
         self._port = bot_config.rcon_port
         self._connect_timeout = bot_config.rcon_connect_timeout
         self._password = bot_config.rcon_password
@@ -80,24 +79,22 @@ class RconClient:
         self._counter = 0
         self.id = fake.city().replace(" ", "_").lower()
         self._cmd_lock = asyncio.Lock()
+        self._pipelined = pipelined
+        self._pending = {}
+        self._max_in_flight = max(1, max_in_flight)
+        self._in_flight = asyncio.Semaphore(self._max_in_flight)
+        self._batch_slots = asyncio.Lock()
+        self._response_router = None
         self.created = time.time()
         self.used = self.created
 
     async def recv_pkt(self) -> RconPacket:
         """Read one RCON packet"""
-        while True:
-            header = await self._reader.read(struct.calcsize("<3i"))
-            header_length = len(header)
-            if header_length != 0:
-                break
-            else:
-                await asyncio.sleep(1)
+        return await self._frames.read_packet()
 
-        (pkt_size, pkt_id, pkt_type) = struct.unpack("<3i", header)
-        body_bytes = await self._reader.read(pkt_size - 8)
-        body_raw = body_bytes.decode()
-        body_clean = body_raw.rstrip("\x00").rstrip()
-        return RconPacket(pkt_id, pkt_type, body_clean)
+    async def recv_response(self) -> RconPacket:
+        """Read one RCON response, reassembled if split across several packets"""
+        return await self._frames.read_response()
 
     def build_packet_id(self):
         self._counter += 1
@@ -107,9 +104,9 @@ class RconClient:
         async with self._cmd_lock:
             async with asyncio.timeout(10):
                 self._writer.write(
-                    RconPacket(
+                    encode_packet(
                         self.build_packet_id(), SERVERDATA_EXECCOMMAND, "alive"
-                    ).pack()
+                    )
                 )
                 self.used = time.time()
                 await self._writer.drain()
@@ -125,8 +122,9 @@ class RconClient:
         reader, writer = connection
         self._reader = reader
         self._writer = writer
+        self._frames = RconFrameReader(reader)
         pkt_id = self.build_packet_id()
-        writer.write(RconPacket(pkt_id, SERVERDATA_AUTH, self._password).pack())
+        writer.write(encode_packet(pkt_id, SERVERDATA_AUTH, self._password))
         await writer.drain()
         auth_response = await self.recv_pkt()
         if auth_response.pkt_id != pkt_id:
@@ -134,25 +132,234 @@ class RconClient:
                 f"AUTHENTICATION FAILURE, MISMATCHING PKT ID INPUT={pkt_id}; OUTPUT={auth_response.pkt_id}"
             )
         self.used = time.time()
+        if self._pipelined:
+            # held on the client rather than through backtask, it lives as long as the socket
+            self._response_router = asyncio.create_task(self._route_responses())
 
-    async def execute(self, command: str, msg_type: int = SERVERDATA_EXECCOMMAND):
-        command_key = command.split(" ", 1)[0]
-        logger.debug(f"{self.id} executing command: {command_key}")
+    async def on_unsolicited(self, packet: RconPacket):
+        logger.debug(
+            f"{self.id} received packet {packet.pkt_id} with no pending command, ignoring"
+        )
+
+    def _fail_pending(self, error: Exception):
+        pending = list(self._pending.values())
+        self._pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_exception(error)
+
+    async def _route_responses(self):
+        try:
+            while True:
+                response = await self.recv_response()
+                future = self._pending.pop(response.pkt_id, None)
+                if future is None:
+                    await self.on_unsolicited(response)
+                elif not future.done():
+                    future.set_result(response)
+        except asyncio.CancelledError:
+            self._fail_pending(ConnectionError(f"RCON client {self.id} closed"))
+            raise
+        except Exception as e:
+            logger.error(
+                f"{self.id} response router stopped: {str(e) or type(e).__name__}"
+            )
+            self._fail_pending(e)
+            # nothing will be read from this socket anymore, make sure pools drop it
+            self.used = 0
+
+    async def _execute_pipelined(self, command: str, msg_type: int) -> str:
+        if not self.routing:
+            raise ConnectionError(f"RCON client {self.id} is not routing responses")
+        async with self._in_flight:
+            pckt_id = self.build_packet_id()
+            future: asyncio.Future[RconPacket] = (
+                asyncio.get_running_loop().create_future()
+            )
+            self._pending[pckt_id] = future
+            try:
+                async with asyncio.timeout(10):
+                    async with self._cmd_lock:
+                        self._writer.write(encode_packet(pckt_id, msg_type, command))
+                        self.used = time.time()
+                        await self._writer.drain()
+                    response = await future
+            finally:
+                self._pending.pop(pckt_id, None)
+            return response.body
+
+    async def _execute_sequential(self, command: str, msg_type: int) -> str:
         async with self._cmd_lock:
             async with asyncio.timeout(10):
                 pckt_id = self.build_packet_id()
-                self._writer.write(RconPacket(pckt_id, msg_type, command).pack())
+                self._writer.write(encode_packet(pckt_id, msg_type, command))
                 self.used = time.time()
                 await self._writer.drain()
-                response = await self.recv_pkt()
-                logger.debug(f"{self.id} executed command: {command_key}")
+                response = await self.recv_response()
                 if response.pkt_id != pckt_id:
                     raise ValueError(
                         f"PACKET ID MISMATCH INPUT={pckt_id}; OUTPUT={response.pkt_id}"
                     )
                 return response.body
 
+    async def execute(self, command: str, msg_type: int = SERVERDATA_EXECCOMMAND):
+        command_key = command.split(" ", 1)[0]
+        logger.debug(f"{self.id} executing command: {command_key}")
+        try:
+            with METRICS.timer(f"rcon.command.{command_key}"):
+                if self._pipelined:
+                    body = await self._execute_pipelined(command, msg_type)
+                else:
+                    body = await self._execute_sequential(command, msg_type)
+        except Exception:
+            METRICS.increment(f"rcon.command.{command_key}.errors")
+            raise
+        logger.debug(f"{self.id} executed command: {command_key}")
+        return body
+
+    async def _acquire_slots(self, count: int):
+        acquired = 0
+        try:
+            async with self._batch_slots:
+                while acquired < count:
+                    await self._in_flight.acquire()
+                    acquired += 1
+        except BaseException:
+            for _ in range(acquired):
+                self._in_flight.release()
+            raise
+
+    async def _execute_many_pipelined(
+        self, commands: list[str], msg_type: int
+    ) -> list[str | Exception]:
+        """Batches of at most max_in_flight commands, each command holding its own slot"""
+        results: list[str | Exception] = []
+        for start in range(0, len(commands), self._max_in_flight):
+            end = start + self._max_in_flight
+            results.extend(
+                await self._execute_batch_pipelined(commands[start:end], msg_type)
+            )
+        return results
+
+    async def _execute_batch_pipelined(
+        self, commands: list[str], msg_type: int
+    ) -> list[str | Exception]:
+        if not self.routing:
+            error = ConnectionError(f"RCON client {self.id} is not routing responses")
+            return [error for _ in commands]
+        loop = asyncio.get_running_loop()
+        await self._acquire_slots(len(commands))
+        try:
+            pckt_ids = [self.build_packet_id() for _ in commands]
+            futures: list[asyncio.Future[RconPacket]] = []
+            for pckt_id in pckt_ids:
+                future: asyncio.Future[RconPacket] = loop.create_future()
+                self._pending[pckt_id] = future
+                futures.append(future)
+            try:
+                async with asyncio.timeout(10):
+                    async with self._cmd_lock:
+                        self._writer.write(
+                            encode_packets(
+                                [
+                                    (pckt_id, msg_type, command)
+                                    for (pckt_id, command) in zip(pckt_ids, commands)
+                                ]
+                            )
+                        )
+                        self.used = time.time()
+                        await self._writer.drain()
+                # unlike gather, wait leaves the futures that already resolved untouched
+                await asyncio.wait(futures, timeout=10)
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                for pckt_id in pckt_ids:
+                    self._pending.pop(pckt_id, None)
+        finally:
+            for _ in commands:
+                self._in_flight.release()
+        results: list[str | Exception] = []
+        for future in futures:
+            if not future.done():
+                future.cancel()
+                results.append(TimeoutError())
+                continue
+            error = future.exception()
+            if isinstance(error, Exception):
+                results.append(error)
+                continue
+            results.append(future.result().body)
+        return results
+
+    async def _execute_many_sequential(
+        self, commands: list[str], msg_type: int
+    ) -> list[str | Exception]:
+        responses: dict[int, str] = {}
+        error: Exception | None = None
+        async with self._cmd_lock:
+            pckt_ids = [self.build_packet_id() for _ in commands]
+            expected = set(pckt_ids)
+            try:
+                async with asyncio.timeout(10):
+                    self._writer.write(
+                        encode_packets(
+                            [
+                                (pckt_id, msg_type, command)
+                                for (pckt_id, command) in zip(pckt_ids, commands)
+                            ]
+                        )
+                    )
+                    self.used = time.time()
+                    await self._writer.drain()
+                    while len(responses) < len(pckt_ids):
+                        response = await self.recv_response()
+                        if response.pkt_id not in expected:
+                            logger.debug(
+                                f"{self.id} ignoring unexpected packet {response.pkt_id} during batch"
+                            )
+                            continue
+                        responses[response.pkt_id] = response.body
+            except Exception as e:
+                error = e
+                # the stream may be left mid batch, make sure pools drop this client
+                self.used = 0
+        return [
+            responses[pckt_id] if pckt_id in responses else error or TimeoutError()
+            for pckt_id in pckt_ids
+        ]
+
+    async def execute_many(
+        self, commands: list[str], msg_type: int = SERVERDATA_EXECCOMMAND
+    ) -> list[str | Exception]:
+        """Send all commands in a single write and collect their responses in order
+
+        A failed command yields its exception in place of a response, results for the
+        commands answered before the failure are kept
+        """
+        if not commands:
+            return []
+        command_keys = [command.split(" ", 1)[0] for command in commands]
+        logger.debug(f"{self.id} executing commands: {command_keys}")
+        with METRICS.timer("rcon.batch"):
+            if self._pipelined:
+                results = await self._execute_many_pipelined(commands, msg_type)
+            else:
+                results = await self._execute_many_sequential(commands, msg_type)
+        for command_key, result in zip(command_keys, results):
+            if isinstance(result, Exception):
+                METRICS.increment(f"rcon.command.{command_key}.errors")
+        logger.debug(f"{self.id} executed commands: {command_keys}")
+        return results
+
     async def close(self):
+        if self._response_router:
+            self._response_router.cancel()
+        if getattr(self, "_writer", None) is None:
+            # never got past connecting, nothing to close
+            return
         try:
             async with self._cmd_lock:
                 self._writer.close()
@@ -1,10 +1,17 @@
 import asyncio
+import time
 from reactivex import Subject, operators
 from common.gc_shield import backtask
+from common.metrics import METRICS
+from rcon.event_journal import LINE_RECEIVED_AT, EventJournal
+from rcon.ingest_queue import DEFAULT_MAX_SIZE, IngestQueue, OverflowPolicy
+from rcon.framing import RconPacket
 from rcon.rcon import RconClient
 from common import logger
 
 RECONNECT_WAIT_TIME_SECS = 5
+# lines handed to subscribers before giving the socket reader a turn
+DISPATCH_BATCH_SIZE = 50
 
 
 class RconListener(Subject[str], RconClient):
@@ -14,14 +21,90 @@ class RconListener(Subject[str], RconClient):
     _address: str
 
     _listening: bool
+    _ingest: IngestQueue
+    _journal: EventJournal | None
 
     def __init__(
-        self, event: list[str] | str = "chat", listening: bool = False
+        self,
+        event: list[str] | str = "chat",
+        listening: bool = False,
+        queue_size: int = DEFAULT_MAX_SIZE,
+        overflow_policy: OverflowPolicy = OverflowPolicy.DROP_BY_TYPE,
+        journal: EventJournal | None = None,
     ) -> None:
         self._event = event
         self._listening = listening
+        self._journal = journal
+        self._ingest = IngestQueue(
+            queue_size, overflow_policy, on_drop=self._on_dropped
+        )
         Subject.__init__(self)
-        RconClient.__init__(self)
+        # responses are told apart from pushed events by packet id, which is also
+        # what lets the pool send commands over this socket
+        RconClient.__init__(self, pipelined=True)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._ingest.depth
+
+    @property
+    def dropped(self):
+        return self._ingest.dropped
+
+    @property
+    def backed_up(self) -> bool:
+        """Whether reading the socket waits on subscribers, commands sent now would too"""
+        return self._ingest.blocking
+
+    @property
+    def _metrics_name(self) -> str:
+        if type(self._event) is list:
+            return "_".join(self._event)
+        return str(self._event)
+
+    async def _dispatch_events(self):
+        """Hand queued lines to subscribers, apart from the socket reads"""
+        depth_gauge = f"rcon.listener.{self._metrics_name}.depth"
+        handled = 0
+        while True:
+            (received_at, line) = await self._ingest.get_received()
+            token = LINE_RECEIVED_AT.set(received_at)
+            try:
+                self.on_next(line)
+            except Exception as e:
+                logger.error(
+                    f"{self._event} listener: subscriber failed on '{line}': {e}"
+                )
+            finally:
+                LINE_RECEIVED_AT.reset(token)
+            handled += 1
+            if handled % DISPATCH_BATCH_SIZE == 0:
+                METRICS.set_gauge(depth_gauge, self._ingest.depth)
+                await asyncio.sleep(0)
+            elif not self._ingest.depth:
+                # caught up, otherwise the last batch's depth would stay reported
+                METRICS.set_gauge(depth_gauge, 0)
+
+    def _on_dropped(self, line_type: str):
+        METRICS.increment(f"rcon.listener.{self._metrics_name}.dropped.{line_type}")
+        logger.debug(f"{self._event} listener: queue full, dropped {line_type} event")
+
+    async def on_unsolicited(self, packet: RconPacket):
+        logger.debug(f"{self._event} listener received event: {packet.body}")
+        if packet.body.startswith("Keeping client alive"):
+            return
+        received_at = time.time()
+        if self._journal:
+            try:
+                # before queueing, lines the queue drops are still on record
+                self._journal.append(packet.body, received_at)
+            except Exception as e:
+                logger.error(f"{self._event} listener: failed to journal event: {e}")
+        if self.in_flight:
+            # this runs in the response router, waiting for room would hold up responses
+            self._ingest.put_nowait(packet.body, received_at)
+            return
+        await self._ingest.put(packet.body, received_at)
 
     async def warmer(self):
         while True:
@@ -56,28 +139,35 @@ class RconListener(Subject[str], RconClient):
                     r = await self.execute(f"listen {event}")
                     logger.info(f"{self._event} listener: {r}")
             rewarm_task = backtask(self.warmer())
-            while True:
-                pck = await self.recv_pkt()
-                logger.debug(f"{self._event} listener received event: {pck.body}")
-                if pck.body.startswith("Keeping client alive"):
-                    continue
-                self.on_next(pck.body)
-        except Exception:
+            # events now come through on_unsolicited, until the socket stops being read
+            if self._response_router:
+                await self._response_router
+            raise ConnectionError("stopped receiving events")
+        except BaseException:
             if rewarm_task:
                 rewarm_task.cancel()
+            if self._response_router:
+                self._response_router.cancel()
+            if getattr(self, "_writer", None) is not None:
+                self._writer.close()
             raise
 
     async def start(self):
-        while True:
-            try:
-                logger.info(f"{self._event} listener: Initiating...")
-                await self._start(self._listening)
-                return
-            except Exception as e:
-                logger.error(
-                    f"{self._event} listener:  Connection error occured: {str(e) or type(e).__name__}. Attempting reconnection in {RECONNECT_WAIT_TIME_SECS} seconds..."
-                )
-                await asyncio.sleep(RECONNECT_WAIT_TIME_SECS)
+        # survives reconnects, lines queued before a drop still reach subscribers
+        dispatcher = asyncio.create_task(self._dispatch_events())
+        try:
+            while True:
+                try:
+                    logger.info(f"{self._event} listener: Initiating...")
+                    await self._start(self._listening)
+                    return
+                except Exception as e:
+                    logger.error(
+                        f"{self._event} listener:  Connection error occured: {str(e) or type(e).__name__}. Attempting reconnection in {RECONNECT_WAIT_TIME_SECS} seconds..."
+                    )
+                    await asyncio.sleep(RECONNECT_WAIT_TIME_SECS)
+        finally:
+            dispatcher.cancel()
 
 
 if __name__ == "__main__":
@@ -1,84 +1,411 @@
 import asyncio
+from collections import Counter, deque
+from enum import IntEnum
 from common import logger
+from common.gc_shield import backtask
+from common.metrics import METRICS
+from rcon.circuit_breaker import CircuitBreaker, CircuitOpenError
 from rcon.rcon import RconClient
+from rcon.rcon_listener import RconListener
+
+# the game server drops connections left quiet for too long, health checks keep idle ones under this
+MAX_IDLE_SECS = 60
+DEFAULT_MAX_AGE_SECS = 3600
+DEFAULT_HEALTH_CHECK_INTERVAL_SECS = 20
+# commands at once over an attached listener socket, a burst beyond it goes to pool connections
+DEFAULT_LISTENER_MAX_IN_FLIGHT = 2
+
+
+class RconPriority(IntEnum):
+    # lower value is served first
+    INTERACTIVE = 0
+    GAMEPLAY = 1
+    BACKGROUND = 2
+
+
+# share of the pool a lane may hold together with every lane below it,
+# whatever is left over stays reserved for the lanes above
+DEFAULT_LANE_SHARES: dict[RconPriority, float] = {
+    RconPriority.INTERACTIVE: 1.0,
+    RconPriority.GAMEPLAY: 0.8,
+    RconPriority.BACKGROUND: 0.5,
+}
 
 
 class RconConnectionPool:
-    _pool: asyncio.Queue[RconClient]
-    _in_use: set[RconClient]
+    _idle: deque[RconClient]
+    # client -> lane of every caller currently holding it, only pipelined clients hold more than one
+    _in_use: dict[RconClient, list[RconPriority]]
+    # callers waiting for a client per lane, a result of None means a slot was reserved to open one
+    _waiters: dict[RconPriority, deque[asyncio.Future[RconClient | None]]]
+    _held: Counter[RconPriority]
+    # connections being opened for a lane, counted against it like the leases they become
+    _reserved: Counter[RconPriority]
+    _lane_limits: dict[RconPriority, int]
+    # connections being authenticated or health checked, they count towards max_size
+    _pending: int
+    _max_in_flight: int
+    # guards connection creation, fails fast while the game server is unreachable
+    breaker: CircuitBreaker
+    # listener socket commands may also be sent over, the pool never closes it
+    _listener: RconListener | None
+    # lane of every caller currently holding the listener, its slots are shared out
+    # between lanes like the pool's
+    _listener_leases: list[RconPriority]
+    _listener_lane_limits: dict[RconPriority, int]
+    _lane_shares: dict[RconPriority, float]
 
-    def __init__(self, max_size: int = 10) -> None:
+    def __init__(
+        self,
+        max_size: int = 10,
+        max_in_flight: int = 1,
+        min_idle: int = 0,
+        max_age_secs: float = DEFAULT_MAX_AGE_SECS,
+        health_check_interval_secs: float = DEFAULT_HEALTH_CHECK_INTERVAL_SECS,
+        lane_shares: dict[RconPriority, float] | None = None,
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
         self._max_size = max_size
-        self._pool: asyncio.Queue[RconClient] = asyncio.Queue(maxsize=max_size)
-        self._lock = asyncio.Lock()
-        self._in_use: set[RconClient] = set()
-
-    async def generate_client(self):
-        client = RconClient()
-        await client.authenticate()
-
-    async def get_client(self) -> RconClient:
-        if self._pool.empty():
-            async with self._lock:
-                total_clients = len(self._in_use) + self._pool.qsize()
-                logger.debug(f"Total clients: {total_clients}")
-                if total_clients < self._max_size:
-                    client = RconClient()
-                    logger.debug(f"Created client {client.id}, authenticating...")
+        self._max_in_flight = max(1, max_in_flight)
+        self._min_idle = min(max(0, min_idle), max_size)
+        self._max_age_secs = max_age_secs
+        self._health_check_interval_secs = health_check_interval_secs
+        self._idle = deque()
+        self._in_use = {}
+        self._waiters = {priority: deque() for priority in RconPriority}
+        self._held = Counter()
+        self._reserved = Counter()
+        self._pending = 0
+        self.breaker = breaker or CircuitBreaker("RCON pool")
+        self._listener = None
+        self._listener_leases = []
+        self._lane_shares = {**DEFAULT_LANE_SHARES, **(lane_shares or {})}
+        self._lane_limits = self._limits_for(max_size * self._max_in_flight)
+        self._listener_lane_limits = self._limits_for(DEFAULT_LISTENER_MAX_IN_FLIGHT)
+
+    @property
+    def total_clients(self) -> int:
+        return len(self._in_use) + len(self._idle) + self._pending
+
+    def _new_client(self) -> RconClient:
+        if self._max_in_flight > 1:
+            return RconClient(pipelined=True, max_in_flight=self._max_in_flight)
+        return RconClient()
+
+    def _is_expired(self, client: RconClient) -> bool:
+        return client.age_since_used > MAX_IDLE_SECS or client.age > self._max_age_secs
+
+    def _limits_for(self, capacity: int) -> dict[RconPriority, int]:
+        return {
+            priority: max(1, int(self._lane_shares[priority] * capacity))
+            for priority in RconPriority
+        }
+
+    @staticmethod
+    def _within_limits(
+        priority: RconPriority,
+        held: Counter[RconPriority],
+        limits: dict[RconPriority, int],
+    ) -> bool:
+        # a lease counts against its own lane and every lane above it
+        held_at_or_below = 0
+        for lane in reversed(RconPriority):
+            held_at_or_below += held[lane]
+            if lane <= priority and held_at_or_below >= limits[lane]:
+                return False
+        return True
+
+    def _has_share(self, priority: RconPriority) -> bool:
+        return self._within_limits(
+            priority, self._held + self._reserved, self._lane_limits
+        )
+
+    def _is_queue_ahead(self, priority: RconPriority) -> bool:
+        return any(
+            not waiter.done()
+            for lane in RconPriority
+            if lane <= priority
+            for waiter in self._waiters[lane]
+        )
+
+    async def _open_client(self) -> RconClient:
+        """Authenticate a new client on a slot already reserved in _pending"""
+        try:
+            try:
+                self.breaker.before_attempt()
+            except CircuitOpenError:
+                METRICS.increment("rcon.pool.circuit_rejected")
+                raise
+            client = self._new_client()
+            logger.debug(f"Created client {client.id}, authenticating...")
+            try:
+                with METRICS.timer("rcon.pool.connect"):
                     await client.authenticate()
-                    self._in_use.add(client)
-                    return client
-        # if we're here it means we couldnt create new client
-        if self._pool.empty():
-            logger.debug("All clients busy, waiting...")
-        client = await self._pool.get()
-        logger.debug(f"Polled client {client.id} from pool")
-        while client is not None and client.age_since_used > 60:
-            logger.debug(f"Client {client.id} stale, dropping...")
+            except asyncio.CancelledError:
+                self.breaker.record_abandoned()
+                backtask(self._close(client))
+                raise
+            except Exception:
+                METRICS.increment("rcon.pool.open_failed")
+                self.breaker.record_failure()
+                backtask(self._close(client))
+                raise
+            METRICS.increment("rcon.pool.opened")
+            self.breaker.record_success()
+            return client
+        finally:
+            self._pending -= 1
+
+    async def generate_client(self) -> RconClient:
+        self._pending += 1
+        return await self._open_client()
+
+    async def _close(self, client: RconClient):
+        METRICS.increment("rcon.pool.closed")
+        try:
             await client.close()
-            client = None
-            if not self._pool.empty():
-                client = await self._pool.get()
-                logger.debug(f"Polled freshier client {client.id} from pool")
-        if client is None:
-            logger.debug("No fresh clients available, recursing...")
-            return await self.get_client()
-        async with self._lock:
-            self._in_use.add(client)
+        except Exception as e:
+            logger.error(
+                f"Attempted to close client {client.id}, failed with error {e}"
+            )
+
+    def _lease(self, client: RconClient, priority: RconPriority) -> RconClient:
+        self._in_use.setdefault(client, []).append(priority)
+        self._held[priority] += 1
         return client
 
-    async def release_client(self, client: RconClient) -> None:
-        async with self._lock:
-            total_clients = len(self._in_use) + self._pool.qsize()
-            logger.debug(
-                f"releasing client {client.id}, total clients: {total_clients}"
+    def _lease_shared_client(self, priority: RconPriority) -> RconClient | None:
+        if self._max_in_flight <= 1:
+            return None
+        candidates = [
+            (len(lanes), client)
+            for (client, lanes) in self._in_use.items()
+            if len(lanes) < self._max_in_flight and not self._is_expired(client)
+        ]
+        if not candidates:
+            return None
+        (leases, client) = min(candidates, key=lambda item: item[0])
+        logger.debug(f"Sharing pipelined client {client.id} ({leases + 1} leases)")
+        return self._lease(client, priority)
+
+    def _lease_idle_client(self, priority: RconPriority) -> RconClient | None:
+        while self._idle:
+            # most recently released first, it is the least likely to have gone stale
+            client = self._idle.pop()
+            if self._is_expired(client):
+                logger.debug(f"Client {client.id} stale, dropping...")
+                METRICS.increment("rcon.pool.stale_dropped")
+                backtask(self._close(client))
+                continue
+            logger.debug(f"Polled client {client.id} from pool")
+            return self._lease(client, priority)
+        return None
+
+    def attach_listener(
+        self,
+        listener: RconListener,
+        max_in_flight: int = DEFAULT_LISTENER_MAX_IN_FLIGHT,
+    ):
+        """Serve commands over an authenticated, pipelined listener before opening connections"""
+        if not listener.pipelined:
+            raise ValueError(f"Listener {listener.id} can't tell responses from events")
+        self._listener = listener
+        self._listener_lane_limits = self._limits_for(max(1, max_in_flight))
+        self._listener_leases = []
+
+    def _lease_listener(self, priority: RconPriority) -> RconClient | None:
+        listener = self._listener
+        if listener is None or not listener.routing:
+            return None
+        if listener.backed_up:
+            # responses would queue up behind the events its subscribers haven't taken
+            METRICS.increment("rcon.pool.listener_backed_up")
+            return None
+        if self._is_queue_ahead(priority) or not self._within_limits(
+            priority, Counter(self._listener_leases), self._listener_lane_limits
+        ):
+            METRICS.increment("rcon.pool.listener_overflow")
+            return None
+        METRICS.increment("rcon.pool.listener")
+        self._listener_leases.append(priority)
+        return listener
+
+    def _release_listener(self, priority: RconPriority):
+        if priority not in self._listener_leases:
+            logger.error(
+                f"Attempted to release a listener slot not leased to {priority.name}"
+            )
+            return
+        self._listener_leases.remove(priority)
+
+    def _lease_available(self, priority: RconPriority) -> RconClient | None:
+        return self._lease_shared_client(priority) or self._lease_idle_client(priority)
+
+    def _dispatch(self):
+        """Serve waiters, highest lane first and first come first served within a lane"""
+        for priority in RconPriority:
+            queue = self._waiters[priority]
+            while queue:
+                waiter = queue[0]
+                if waiter.done():
+                    queue.popleft()
+                    continue
+                # lanes below share this lane's limits, if this one is blocked so are they
+                if not self._has_share(priority):
+                    return
+                client = self._lease_available(priority)
+                if client is not None:
+                    queue.popleft()
+                    waiter.set_result(client)
+                    continue
+                if self.total_clients >= self._max_size:
+                    return
+                queue.popleft()
+                self._pending += 1
+                self._reserved[priority] += 1
+                waiter.set_result(None)
+
+    async def get_client(
+        self, priority: RconPriority = RconPriority.GAMEPLAY
+    ) -> RconClient:
+        with METRICS.timer(f"rcon.pool.wait.{priority.name.lower()}"):
+            return self._lease_listener(priority) or await self._acquire(priority)
+
+    async def _acquire(self, priority: RconPriority) -> RconClient:
+        if self._has_share(priority) and not self._is_queue_ahead(priority):
+            client = self._lease_available(priority)
+            if client is not None:
+                return client
+            if self.total_clients < self._max_size:
+                self._pending += 1
+                self._reserved[priority] += 1
+                return await self._create_lease(priority)
+        logger.debug(f"All clients busy for {priority.name} lane, waiting...")
+        waiter: asyncio.Future[RconClient | None] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._waiters[priority].append(waiter)
+        try:
+            client = await waiter
+        except asyncio.CancelledError:
+            # handed a client or a slot right as the caller gave up, pass it on
+            if waiter.done() and not waiter.cancelled():
+                handed = waiter.result()
+                if handed is None:
+                    self._pending -= 1
+                    self._reserved[priority] -= 1
+                else:
+                    self._release(handed, priority)
+                self._dispatch()
+            raise
+        if client is not None:
+            return client
+        return await self._create_lease(priority)
+
+    async def _create_lease(self, priority: RconPriority) -> RconClient:
+        try:
+            client = await self._open_client()
+        except BaseException:
+            self._reserved[priority] -= 1
+            self._dispatch()
+            raise
+        self._reserved[priority] -= 1
+        return self._lease(client, priority)
+
+    def _release(self, client: RconClient, priority: RconPriority) -> RconClient | None:
+        """Drop the lease priority holds on client, returns the client if it must be closed"""
+        lanes = self._in_use.get(client)
+        if not lanes or priority not in lanes:
+            logger.error(
+                f"Attempted to release a client ({client.id}) not leased to {priority.name}"
             )
-            if client in self._in_use:
-                self._in_use.remove(client)
-                logger.debug("Releasing RCON client")
-                await self._pool.put(client)
-            else:
-                logger.error(
-                    f"Attempted to release a client ({client.id}) not part of the pool"
-                )
-
-    async def discard_client(self, client: RconClient):
-        async with self._lock:
+            return None
+        lanes.remove(priority)
+        self._held[priority] -= 1
+        expired = self._is_expired(client)
+        if not lanes:
+            del self._in_use[client]
+            if not expired:
+                self._idle.append(client)
+        self._dispatch()
+        return client if expired and not lanes else None
+
+    async def release_client(
+        self, client: RconClient, priority: RconPriority = RconPriority.GAMEPLAY
+    ) -> None:
+        """Hand back client, priority being the lane it was leased with by get_client"""
+        if client is self._listener:
+            self._release_listener(priority)
+            return
+        logger.debug(
+            f"releasing client {client.id}, total clients: {self.total_clients}"
+        )
+        expired = self._release(client, priority)
+        if expired is not None:
+            logger.debug(f"Client {client.id} expired on release, closing...")
+            METRICS.increment("rcon.pool.expired_on_release")
+            await self._close(expired)
+
+    async def discard_client(
+        self, client: RconClient, priority: RconPriority = RconPriority.GAMEPLAY
+    ):
+        if client is self._listener:
+            # it reconnects on its own, closing it would cost events
+            self._release_listener(priority)
+            return
+        METRICS.increment("rcon.pool.discarded")
+        for lane in self._in_use.pop(client, []):
+            self._held[lane] -= 1
+        self._dispatch()
+        await self._close(client)
+
+    async def _health_check(self, client: RconClient):
+        try:
+            if client.age > self._max_age_secs:
+                logger.debug(f"Client {client.id} reached max age, rotating...")
+                METRICS.increment("rcon.pool.rotated")
+                await self._close(client)
+                return
+            try:
+                await client.execute("alive")
+            except Exception as e:
+                logger.warning(f"Client {client.id} failed health check, dropping: {e}")
+                METRICS.increment("rcon.pool.health_check_failed")
+                await self._close(client)
+                return
+            self._idle.append(client)
+        finally:
+            self._pending -= 1
+            self._dispatch()
+
+    async def maintain(self):
+        """Health check idle clients and top the pool up to min_idle"""
+        checking = list(self._idle)
+        self._idle.clear()
+        self._pending += len(checking)
+        await asyncio.gather(*[self._health_check(c) for c in checking])
+        while len(self._idle) < self._min_idle and self.total_clients < self._max_size:
+            try:
+                client = await self.generate_client()
+            except Exception as e:
+                logger.warning(f"Failed to warm RCON client: {e}")
+                self._dispatch()
+                return
+            self._idle.append(client)
+            self._dispatch()
+
+    async def start(self):
+        while True:
             try:
-                if client in self._in_use:
-                    self._in_use.remove(client)
-                await client.close()
+                await self.maintain()
             except Exception as e:
-                logger.error(
-                    f"Attempted to close client {client.id}, failed with error {e}"
-                )
+                logger.error(f"RCON pool maintenance failed: {e}")
+            await asyncio.sleep(self._health_check_interval_secs)
 
     async def close_all(self) -> None:
-        async with self._lock:
-            while not self._pool.empty():
-                client = await self._pool.get()
-                await client.close()
-            for client in self._in_use:
-                await client.close()
-            self._in_use.clear()
-            self._pool = asyncio.Queue(maxsize=self._max_size)
+        clients = list(self._idle) + list(self._in_use)
+        self._idle.clear()
+        self._in_use.clear()
+        self._held.clear()
+        for client in clients:
+            await self._close(client)
@@ -0,0 +1,64 @@
+import asyncio
+import time
+from reactivex import Subject
+from common import logger
+from common.metrics import METRICS
+from rcon.event_dedupe import DEFAULT_WINDOW_SECS, EventDeduplicator
+from rcon.event_journal import LINE_RECEIVED_AT, EventJournal
+from rcon.rcon_listener import RconListener
+
+SOURCE_NAMES = ("primary", "standby")
+
+
+class RedundantListener(Subject[str]):
+    """Two always connected listeners for the same events, merged into one stream
+
+    Whichever connection delivers a line first wins, the other copy is dropped, so
+    while one of them reconnects the other carries on without a gap
+    """
+
+    _listeners: tuple[RconListener, RconListener]
+    _dedupe: EventDeduplicator
+    _journal: EventJournal | None
+
+    def __init__(
+        self,
+        primary: RconListener,
+        standby: RconListener,
+        journal: EventJournal | None = None,
+        window_secs: float = DEFAULT_WINDOW_SECS,
+    ) -> None:
+        self._listeners = (primary, standby)
+        self._dedupe = EventDeduplicator(len(self._listeners), window_secs)
+        self._journal = journal
+        super().__init__()
+        for source, listener in enumerate(self._listeners):
+            listener.subscribe(lambda line, source=source: self._on_line(source, line))
+
+    @property
+    def primary(self) -> RconListener:
+        return self._listeners[0]
+
+    @property
+    def duplicates(self) -> int:
+        return self._dedupe.duplicates
+
+    def _on_line(self, source: int, line: str):
+        if not self._dedupe.accept(source, line):
+            METRICS.increment("rcon.listener.dedupe.duplicates")
+            return
+        METRICS.increment(f"rcon.listener.dedupe.first.{SOURCE_NAMES[source]}")
+        if self._journal:
+            received_at = LINE_RECEIVED_AT.get() or time.time()
+            token = LINE_RECEIVED_AT.set(received_at)
+            try:
+                self._journal.append(line, received_at)
+                self.on_next(line)
+            finally:
+                LINE_RECEIVED_AT.reset(token)
+            return
+        self.on_next(line)
+
+    async def start(self):
+        logger.info("RedundantListener: starting primary and standby listeners")
+        await asyncio.gather(*[listener.start() for listener in self._listeners])
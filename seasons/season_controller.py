@@ -55,7 +55,8 @@ class SeasonWatch(reactivex.Observer[SeasonEvent]):
                 raise ValueError("Unable to end a season that has not started")
             top_20_items: list[dict] = (
                 await self._kills_collection.find(
-                    {f"season.{self._season_config.name}": {"$exists": True}}
+                    {f"season.{self._season_config.name}": {"$exists": True}},
+                    {"kills": 0},
                 )
                 .sort(f"season.{self._season_config.name}.kill_count", -1)
                 .limit(20)
@@ -7,6 +7,9 @@ from common.compute import (
     slice_text_array_at_total_length,
     split_chunks,
     human_format,
+    compute_roster_diff,
+    compute_flush_interval,
+    compute_untagged_name,
 )
 
 
@@ -233,3 +236,25 @@ def test_human_format_small_numbers():
     assert human_format(1) == "1"
     assert human_format(999) == "999"
     assert human_format(0) == "0"
+
+
+def test_roster_diff():
+    known = {"A": "alice", "B": "bob"}
+    online = {"B": "[tag] bob", "C": "carol"}
+    (joined, left) = compute_roster_diff(known, online)
+    assert joined == {"C": "carol"}
+    assert left == {"A": "alice"}
+
+
+def test_compute_flush_interval():
+    assert compute_flush_interval(0, 100, 5, 60) == 60
+    assert compute_flush_interval(1, 100, 5, 60) == 60
+    assert compute_flush_interval(4, 100, 5, 60) == 25
+    assert compute_flush_interval(1000, 100, 5, 60) == 5
+
+
+def test_compute_untagged_name():
+    tags = ["VIP", "100h"]
+    assert compute_untagged_name("[VIP] John", "[{0}]", tags) == "John"
+    assert compute_untagged_name("[100h] John", "[{0}]", tags) == "John"
+    assert compute_untagged_name("John [Clan]", "[{0}]", tags) == "John [Clan]"
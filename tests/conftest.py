@@ -0,0 +1,8 @@
+import os
+from dataclasses import fields
+from config_client.models import BotConfig
+
+# modules reading the bot config on import need one, tests don't rely on its values
+if not BotConfig.exists():
+    for config_field in fields(BotConfig):
+        os.environ.setdefault(config_field.name.upper(), str(config_field.default))
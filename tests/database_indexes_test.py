@@ -0,0 +1,106 @@
+import asyncio
+from config_client.models import SeasonConfig
+from database.indexes import (
+    REQUIRED_INDEXES,
+    is_managed_index,
+    rebuild_indexes,
+    required_indexes,
+    season_index_name,
+)
+from db_kills.kill_edges import KILL_EDGES_COLLECTION
+from db_kills.player_ids import PLAYER_IDS_COLLECTION
+
+
+def test_required_indexes_without_season():
+    indexes = required_indexes()
+    assert indexes.keys() == REQUIRED_INDEXES.keys()
+    assert [model.document["name"] for model in indexes["kills"]] == [
+        "playfab_id",
+        "kill_count",
+    ]
+
+
+def test_required_indexes_with_season():
+    season = SeasonConfig(name="spring")
+    kills_indexes = required_indexes(season)["kills"]
+    season_index = kills_indexes[-1].document
+    assert (
+        season_index["name"] == season_index_name(season) == "season_spring_kill_count"
+    )
+    assert season_index["key"] == {"season.spring.kill_count": -1}
+    assert season_index["partialFilterExpression"] == {
+        "season.spring": {"$exists": True}
+    }
+    # the base list is left untouched
+    assert len(REQUIRED_INDEXES["kills"]) == len(kills_indexes) - 1
+
+
+def test_managed_indexes():
+    kills_indexes = required_indexes()["kills"]
+    assert is_managed_index("kill_count", kills_indexes)
+    assert is_managed_index("season_winter_kill_count", kills_indexes)
+    assert not is_managed_index("_id_", kills_indexes)
+    assert not is_managed_index("user_name_1", kills_indexes)
+
+
+class FakeIndexesCollection:
+    def __init__(self, name: str, existing: dict[str, dict]) -> None:
+        self.name = name
+        self.existing = existing
+        self.dropped: list[str] = []
+        self.created: list[str] = []
+
+    async def index_information(self):
+        return self.existing
+
+    async def drop_index(self, index_name: str):
+        self.dropped.append(index_name)
+
+    async def create_indexes(self, models: list):
+        for model in models:
+            if model.document["name"] == "kill_count":
+                raise RuntimeError("no space left")
+            self.created.append(model.document["name"])
+
+
+def test_rebuild_keeps_unique_indexes_and_reports_failures():
+    collections = {
+        "kills": FakeIndexesCollection(
+            "kills",
+            {
+                "_id_": {"key": [("_id", 1)]},
+                "playfab_id": {"key": [("playfab_id", 1)]},
+                "season_winter_kill_count": {"key": [("season.winter.kill_count", -1)]},
+            },
+        ),
+        PLAYER_IDS_COLLECTION: FakeIndexesCollection(
+            PLAYER_IDS_COLLECTION,
+            # same key, missing its unique flag
+            {"playfab_id": {"key": [("playfab_id", 1)], "unique": False}},
+        ),
+        KILL_EDGES_COLLECTION: FakeIndexesCollection(
+            KILL_EDGES_COLLECTION,
+            {
+                "killer_victim": {
+                    "key": [("killer_id", 1), ("victim_id", 1)],
+                    "unique": True,
+                },
+                "killer_count": {"key": [("killer_id", 1)], "unique": True},
+            },
+        ),
+    }
+    database = {
+        name: collections.get(name, FakeIndexesCollection(name, {}))
+        for name in REQUIRED_INDEXES
+    }
+    failures = asyncio.run(rebuild_indexes(database))  # type: ignore
+    kills = collections["kills"]
+    edges = collections[KILL_EDGES_COLLECTION]
+    assert kills.dropped == ["season_winter_kill_count"]
+    assert failures.keys() == {
+        "kills.kill_count",
+        f"{KILL_EDGES_COLLECTION}.killer_count",
+    }
+    assert edges.dropped == []
+    assert edges.created == ["killer_victim"]
+    assert collections[PLAYER_IDS_COLLECTION].dropped == ["playfab_id"]
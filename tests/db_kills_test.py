@@ -0,0 +1,215 @@
+import asyncio
+import tempfile
+from collections import Counter
+from pymongo.errors import BulkWriteError
+from reactivex import Subject
+from common.models import PlayerStore
+from common.parsers import parse_killfeed_event
+from db_kills.main import JOURNAL_CHECKPOINT, DbKills
+from db_kills.player_ids import PlayerIds
+from rcon.event_journal import read_checkpoint
+
+
+class FakeCursor:
+    def __init__(self, documents: list[dict]) -> None:
+        self._documents = documents
+
+    async def __aiter__(self):
+        for document in self._documents:
+            yield document
+
+
+class FakePlayerIdsCollection:
+    def __init__(self) -> None:
+        self.documents: dict = {}
+
+    def find(self, query: dict):
+        wanted = set(query["playfab_id"]["$in"])
+        return FakeCursor(
+            [
+                document
+                for document in self.documents.values()
+                if document.get("playfab_id") in wanted
+            ]
+        )
+
+    async def find_one_and_update(self, query, update, upsert, return_document):
+        sequence = self.documents.setdefault(query["_id"], {"next": 0})
+        sequence["next"] += update["$inc"]["next"]
+        return sequence
+
+    async def insert_many(self, documents: list[dict], ordered: bool):
+        for document in documents:
+            self.documents[document["_id"]] = document
+
+
+class FakeBulkWriteResult:
+    def __init__(self, count: int) -> None:
+        self.modified_count = count
+        self.upserted_count = 0
+
+
+class FakeKillsCollection:
+    def __init__(self) -> None:
+        self.operations: list = []
+
+    async def bulk_write(self, operations: list, ordered: bool = True):
+        self.operations.extend(operations)
+        return FakeBulkWriteResult(len(operations))
+
+
+def make_db_kills() -> tuple[DbKills, FakeKillsCollection, FakeKillsCollection]:
+    kills = FakeKillsCollection()
+    edges = FakeKillsCollection()
+    db_kills = DbKills(
+        kills,  # type: ignore
+        edges,  # type: ignore
+        PlayerIds(FakePlayerIdsCollection()),  # type: ignore
+        Subject(),
+        PlayerStore(),
+        None,
+    )
+    return (db_kills, kills, edges)
+
+
+def test_kill_with_no_killer_only_counts_the_death():
+    async def main():
+        (db_kills, kills, edges) = make_db_kills()
+        for line in [
+            "Killfeed: 2024.10.12-21.23.58:  (Bot) killed 2BDD4A2E1C1C15D8 (John)",
+            "Killfeed: 2024.10.12-21.23.59: 5A6F3E8B2C1D4F7A (Jane) killed 2BDD4A2E1C1C15D8 (John)",
+        ]:
+            await db_kills._process_killfeed(parse_killfeed_event(line))
+        await db_kills._flush()
+        return (kills.operations, edges.operations)
+
+    (kill_operations, edge_operations) = asyncio.run(main())
+    deaths = [
+        operation._doc["$inc"]["death_count"]
+        for operation in kill_operations
+        if "death_count" in operation._doc["$inc"]
+    ]
+    assert deaths == [2]
+    assert [operation._filter["playfab_id"] for operation in kill_operations] == [
+        "5A6F3E8B2C1D4F7A",
+        "2BDD4A2E1C1C15D8",
+    ]
+    assert len(edge_operations) == 1
+
+
+class FlakyKillsCollection(FakeKillsCollection):
+    """Fails the second operation of the next bulk write it gets"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.fail_next = True
+
+    async def bulk_write(self, operations: list, ordered: bool = True):
+        if not self.fail_next:
+            return await super().bulk_write(operations, ordered)
+        self.fail_next = False
+        self.operations.extend(operations[:1] + operations[2:])
+        raise BulkWriteError(
+            {
+                "writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate"}],
+                "nModified": len(operations) - 1,
+                "nUpserted": 0,
+            }
+        )
+
+
+def test_failed_write_is_retried_and_holds_the_checkpoint():
+    async def main(journal_directory: str):
+        kills = FlakyKillsCollection()
+        edges = FakeKillsCollection()
+        db_kills = DbKills(
+            kills,  # type: ignore
+            edges,  # type: ignore
+            PlayerIds(FakePlayerIdsCollection()),  # type: ignore
+            Subject(),
+            PlayerStore(),
+            None,
+            journal_directory,
+        )
+        for received_at, line in [
+            (
+                1.0,
+                "Killfeed: 2024.10.12-21.23.58: 5A6F3E8B2C1D4F7A (Jane) killed 2BDD4A2E1C1C15D8 (John)",
+            ),
+            (
+                2.0,
+                "Killfeed: 2024.10.12-21.23.59: 7C8D9E0F1A2B3C4D (Jim) killed 2BDD4A2E1C1C15D8 (John)",
+            ),
+        ]:
+            await db_kills._process_killfeed(parse_killfeed_event(line), received_at)
+        await db_kills._flush()
+        checkpoint_after_failure = read_checkpoint(
+            journal_directory, JOURNAL_CHECKPOINT
+        )
+        deaths_after_failure = len(kills.operations)
+        await db_kills._process_killfeed(
+            parse_killfeed_event(
+                "Killfeed: 2024.10.12-21.24.00: 5A6F3E8B2C1D4F7A (Jane) killed 7C8D9E0F1A2B3C4D (Jim)"
+            ),
+            3.0,
+        )
+        await db_kills._flush()
+        return (
+            kills.operations,
+            checkpoint_after_failure,
+            deaths_after_failure,
+            read_checkpoint(journal_directory, JOURNAL_CHECKPOINT),
+        )
+
+    with tempfile.TemporaryDirectory() as journal_directory:
+        (operations, checkpoint_after_failure, written_after_failure, checkpoint) = (
+            asyncio.run(main(journal_directory))
+        )
+    kill_counts: Counter[str] = Counter()
+    death_counts: Counter[str] = Counter()
+    for operation in operations:
+        increments = operation._doc["$inc"]
+        kill_counts[operation._filter["playfab_id"]] += increments.get("kill_count", 0)
+        death_counts[operation._filter["playfab_id"]] += increments.get(
+            "death_count", 0
+        )
+    # only the killer upserts went out, the deaths waited for the one that failed
+    assert written_after_failure == 1
+    assert checkpoint_after_failure is None
+    assert checkpoint == 3.0
+    assert kill_counts == Counter({"5A6F3E8B2C1D4F7A": 2, "7C8D9E0F1A2B3C4D": 1})
+    assert +death_counts == Counter({"2BDD4A2E1C1C15D8": 2, "7C8D9E0F1A2B3C4D": 1})
+
+
+def test_checkpoint_is_the_newest_line_written():
+    async def main(journal_directory: str):
+        kills = FakeKillsCollection()
+        db_kills = DbKills(
+            kills,  # type: ignore
+            FakeKillsCollection(),  # type: ignore
+            PlayerIds(FakePlayerIdsCollection()),  # type: ignore
+            Subject(),
+            PlayerStore(),
+            None,
+            journal_directory,
+        )
+        await db_kills._process_killfeed(
+            parse_killfeed_event(
+                "Killfeed: 2024.10.12-21.23.58: 5A6F3E8B2C1D4F7A (Jane) killed 2BDD4A2E1C1C15D8 (John)"
+            ),
+            10.0,
+        )
+        await db_kills._flush()
+        written = read_checkpoint(journal_directory, JOURNAL_CHECKPOINT)
+        # received and journaled, but not written yet
+        await db_kills._process_killfeed(
+            parse_killfeed_event(
+                "Killfeed: 2024.10.12-21.23.59: 7C8D9E0F1A2B3C4D (Jim) killed 2BDD4A2E1C1C15D8 (John)"
+            ),
+            11.0,
+        )
+        return (written, read_checkpoint(journal_directory, JOURNAL_CHECKPOINT))
+
+    with tempfile.TemporaryDirectory() as journal_directory:
+        (written, pending) = asyncio.run(main(journal_directory))
+    assert written == pending == 10.0
@@ -0,0 +1,44 @@
+from common.event_dispatcher import MALFORMED_PREFIX, EventDispatcher, line_prefix
+
+
+def test_line_prefix():
+    assert line_prefix("Login: 2024.01.01-00.00.00: someone (ABC) logged in") == "Login"
+    assert line_prefix("no separator here") == MALFORMED_PREFIX
+    assert line_prefix("Two words: x") == MALFORMED_PREFIX
+
+
+def test_routes_each_line_once_to_its_stream():
+    calls: list[str] = []
+    dispatcher = EventDispatcher()
+
+    def parse(line: str):
+        calls.append(line)
+        return line.upper()
+
+    received_a: list[str] = []
+    received_b: list[str] = []
+    stream = dispatcher.register("Login", parse)
+    stream.subscribe(received_a.append)
+    dispatcher.stream("Login").subscribe(received_b.append)
+    dispatcher.on_next("Login: x")
+    assert calls == ["Login: x"]
+    assert received_a == received_b == ["LOGIN: X"]
+
+
+def test_counts_unknown_and_skips_unparsed():
+    dispatcher = EventDispatcher()
+    received: list = []
+    dispatcher.register("Chat", lambda _: None, skip_unparsed=True).subscribe(
+        received.append
+    )
+    dispatcher.on_next("Chat: garbage")
+    dispatcher.on_next("Punishment: x")
+    dispatcher.on_next("Punishment: y")
+    assert received == []
+    assert dispatcher.unknown == {"Punishment": 2}
+
+
+def test_default_events_registered():
+    dispatcher = EventDispatcher.with_default_events()
+    for prefix in ["Login", "Killfeed", "Chat", "MatchState"]:
+        assert dispatcher.stream(prefix) is not None
@@ -0,0 +1,99 @@
+import asyncio
+import os
+from rcon import event_journal
+from rcon.event_journal import (
+    COMPRESSED_SUFFIX,
+    EventJournal,
+    list_segments,
+    read_checkpoint,
+    read_journal,
+    read_segment,
+    write_checkpoint,
+)
+
+
+def test_reads_back_appended_lines(tmp_path):
+    journal = EventJournal(str(tmp_path))
+    journal.append("Login: a", 1.0)
+    journal.append("Chat: b\r\nc", 2.0)
+    journal.flush()
+    assert list(read_journal(str(tmp_path))) == [
+        (1.0, "Login: a"),
+        (2.0, "Chat: b\r\nc"),
+    ]
+    assert list(read_journal(str(tmp_path), since=1.0)) == [(2.0, "Chat: b\r\nc")]
+    assert list(read_journal(str(tmp_path), until=2.0)) == [(1.0, "Login: a")]
+
+
+def test_rotates_and_compresses_closed_segments(tmp_path):
+    journal = EventJournal(str(tmp_path), segment_bytes=40, segment_secs=10)
+    for index in range(6):
+        journal.append(f"Killfeed: {index}", float(index + 1))
+    journal.append("Killfeed: late", 100.0)
+    journal.close()
+    segments = list_segments(str(tmp_path))
+    assert len(segments) == 4
+    assert all(name.endswith(COMPRESSED_SUFFIX) for name in segments[:-1])
+    assert [line for (_, line) in read_journal(str(tmp_path))] == [
+        *[f"Killfeed: {index}" for index in range(6)],
+        "Killfeed: late",
+    ]
+    assert list(read_journal(str(tmp_path), since=5.0)) == [
+        (6.0, "Killfeed: 5"),
+        (100.0, "Killfeed: late"),
+    ]
+
+
+def test_prunes_segments_beyond_retention(tmp_path):
+    journal = EventJournal(str(tmp_path), segment_secs=1, retained_segments=2)
+    for index in range(5):
+        journal.append(f"Login: {index}", float(index + 1))
+    journal.close()
+    assert [line for (_, line) in read_journal(str(tmp_path))] == [
+        "Login: 3",
+        "Login: 4",
+    ]
+
+
+def test_stops_at_torn_record(tmp_path):
+    journal = EventJournal(str(tmp_path))
+    journal.append("Login: whole", 1.0)
+    journal.append("Login: torn", 2.0)
+    journal.close()
+    (segment,) = list_segments(str(tmp_path))
+    path = os.path.join(str(tmp_path), segment)
+    os.truncate(path, os.path.getsize(path) - 3)
+    assert list(read_segment(path)) == [(1.0, "Login: whole")]
+
+
+def test_checkpoints(tmp_path):
+    assert read_checkpoint(str(tmp_path), "db_kills") is None
+    write_checkpoint(str(tmp_path), "db_kills", 12.5)
+    write_checkpoint(str(tmp_path), "other", 1)
+    assert read_checkpoint(str(tmp_path), "db_kills") == 12.5
+
+
+def test_writes_and_rotates_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(event_journal, "FLUSH_INTERVAL_SECS", 0.01)
+    journal = EventJournal(str(tmp_path), segment_bytes=40)
+
+    async def main():
+        task = asyncio.create_task(journal.start())
+        await asyncio.sleep(0.05)
+        for index in range(6):
+            journal.append(f"Killfeed: {index}")
+        # nothing touches the disk until the next flush
+        assert len(list_segments(str(tmp_path))) == 1
+        await asyncio.sleep(0.1)
+        maintenance = journal._maintenance
+        assert maintenance is not None and maintenance.done()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
+    segments = list_segments(str(tmp_path))
+    assert len(segments) == 3
+    assert all(name.endswith(COMPRESSED_SUFFIX) for name in segments[:-1])
+    assert [line for (_, line) in read_journal(str(tmp_path))] == [
+        f"Killfeed: {index}" for index in range(6)
+    ]
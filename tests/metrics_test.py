@@ -0,0 +1,33 @@
+from common.metrics import Histogram, MetricsRegistry
+
+
+def test_histogram_percentiles_use_bucket_bounds():
+    histogram = Histogram((10, 100, 1000))
+    for value in [5] * 90 + [50] * 9 + [700]:
+        histogram.observe(value)
+    assert histogram.count == 100
+    assert histogram.min == 5
+    assert histogram.max == 700
+    assert histogram.percentile(50) == 10
+    assert histogram.percentile(95) == 100
+    assert histogram.percentile(100) == 700
+
+
+def test_histogram_overflow_reports_max():
+    histogram = Histogram((10,))
+    histogram.observe(25000)
+    assert histogram.percentile(99) == 25000
+    assert histogram.as_dict()["buckets"] == {"inf": 1}
+
+
+def test_registry_snapshot_filters_by_prefix():
+    registry = MetricsRegistry()
+    with registry.timer("rcon.command.info"):
+        pass
+    registry.increment("rcon.pool.opened")
+    registry.increment("db.flush")
+    snapshot = registry.snapshot("rcon.")
+    assert list(snapshot["histograms"]) == ["rcon.command.info"]
+    assert snapshot["counters"] == {"rcon.pool.opened": 1}
+    registry.reset()
+    assert registry.snapshot()["counters"] == {}
@@ -1,3 +1,5 @@
+from datetime import datetime
+import pytest
 from common import parsers, models
 
 
@@ -80,7 +82,7 @@ def test_transforms_kill_records_to_db_mutation():
     )
     expected_mutation = {
         "$set": {"playfab_id": "SA213123AKA872", "user_name": "John Wayne (smartass)"},
-        "$inc": {"kill_count": 7, "kills.ASDDU1231215GR": 2, "kills.ASEEU81712181G": 5},
+        "$inc": {"kill_count": 7},
     }
     expected_death_updates = [
         {"$set": {"playfab_id": "ASDDU1231215GR"}, "$inc": {"death_count": 2}},
@@ -91,8 +93,73 @@ def test_transforms_kill_records_to_db_mutation():
     assert death_updates == expected_death_updates
 
 
+def test_transforms_kill_records_to_one_death_update_per_victim_and_encoded_edges():
+    records = [
+        models.KillRecord("SA213123AKA872", "John Wayne", {"ASDDU1231215GR": 2}),
+        models.KillRecord(
+            "ASEEU81712181G", "Jane Doe", {"ASDDU1231215GR": 1, "SA213123AKA872": 3}
+        ),
+    ]
+    player_ids = {"SA213123AKA872": 0, "ASEEU81712181G": 1, "ASDDU1231215GR": 2}
+    (death_updates, mutations, edge_updates) = parsers.transform_kill_records_to_db(
+        records, player_ids
+    )
+    assert [mutation["$set"]["playfab_id"] for mutation in mutations] == [
+        "SA213123AKA872",
+        "ASEEU81712181G",
+    ]
+    assert death_updates == [
+        {"$set": {"playfab_id": "ASDDU1231215GR"}, "$inc": {"death_count": 3}},
+        {"$set": {"playfab_id": "SA213123AKA872"}, "$inc": {"death_count": 3}},
+    ]
+    assert edge_updates == [
+        {"$set": {"killer_id": 0, "victim_id": 2}, "$inc": {"count": 2}},
+        {"$set": {"killer_id": 1, "victim_id": 2}, "$inc": {"count": 1}},
+        {"$set": {"killer_id": 1, "victim_id": 0}, "$inc": {"count": 3}},
+    ]
+
+
 def test_parse_matchstate():
     expected_matchstate = "In progress"
     raw_matchstate = "MatchState: In progress"
     matchstate = parsers.parse_matchstate(raw_matchstate)
     assert matchstate == expected_matchstate
+
+
+def test_parse_date_matches_strptime():
+    dates = [
+        "2024.10.12-21.23.58",
+        "2000.01.01-00.00.00",
+        "2024.02.29-23.59.59",
+        "1999.12.31-12.30.05",
+        "2024.1.2-3.4.5",
+    ]
+    for date in dates:
+        assert parsers.parse_date(date) == datetime.strptime(date, parsers.DATE_FORMAT)
+
+
+def test_parse_date_rejects_what_strptime_rejects():
+    for date in [
+        "2023.02.29-00.00.00",
+        "2024.13.01-00.00.00",
+        "2024.10.12 21.23.58",
+        "2024.1_.12-21.23.58",
+        "2024.10.12-21.23.58x",
+    ]:
+        with pytest.raises(ValueError):
+            datetime.strptime(date, parsers.DATE_FORMAT)
+        with pytest.raises(ValueError):
+            parsers.parse_date(date)
+
+
+def test_parsed_player_ids_are_shared():
+    login = parsers.parse_login_event(
+        "Login: 2024.10.12-21.23.58: John Wayne (SA213123AKA872) logged in"
+    )
+    kill = parsers.parse_killfeed_event(
+        "Killfeed: 2024.10.12-21.33.28: SA213123AKA872 (John Wayne) killed ASDDU1231215GR (Blattant Ottobloking)"
+    )
+    assert login and kill
+    assert login.player_id is kill.killer_id
+    with pytest.raises(AttributeError):
+        kill.killer_id = "ASDDU1231215GR"  # type: ignore
@@ -0,0 +1,40 @@
+import asyncio
+from common.models import LoginEvent, PlayerStore
+from config_client.models import PtConfig
+from player_reconciler.main import PlayerReconciler
+
+
+class FakeQueryCache:
+    def __init__(self, playerlist: str) -> None:
+        self.playerlist = playerlist
+
+    async def query(self, command: str, priority):
+        return self.playerlist
+
+
+def test_missed_login_is_reconciled_without_its_tag():
+    events: list[LoginEvent] = []
+    store = PlayerStore({"SA213123AKA872": "John Wayne"})
+    reconciler = PlayerReconciler(
+        FakeQueryCache(
+            "ASDDU1231215GR, [VIP] Blattant Ottobloking, 32 ms, team 0"
+        ),  # type: ignore
+        store,
+        events.append,
+        PtConfig(tags={"ASDDU1231215GR": "VIP"}),
+    )
+
+    async def main():
+        # a difference is only acted on once a second snapshot agrees
+        await reconciler.reconcile()
+        assert events == []
+        await reconciler.reconcile()
+
+    asyncio.run(main())
+    assert [
+        (event.player_id, event.user_name, event.instance, event.reconciled)
+        for event in events
+    ] == [
+        ("ASDDU1231215GR", "Blattant Ottobloking", "in", True),
+        ("SA213123AKA872", "John Wayne", "out", True),
+    ]
@@ -0,0 +1,70 @@
+import pytest
+from rcon.circuit_breaker import BreakerState, CircuitBreaker, CircuitOpenError
+
+
+def test_trips_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3, base_backoff_secs=60)
+    for _ in range(2):
+        breaker.before_attempt()
+        breaker.record_failure()
+    assert breaker.state == BreakerState.CLOSED
+    breaker.before_attempt()
+    breaker.record_failure()
+    assert breaker.state == BreakerState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_attempt()
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker("test", failure_threshold=2, base_backoff_secs=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == BreakerState.CLOSED
+
+
+def test_half_open_allows_single_probe():
+    breaker = CircuitBreaker("test", failure_threshold=1, base_backoff_secs=0)
+    breaker.record_failure()
+    assert breaker.state == BreakerState.OPEN
+    breaker.before_attempt()
+    assert breaker.state == BreakerState.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_attempt()
+    breaker.record_success()
+    assert breaker.state == BreakerState.CLOSED
+    breaker.before_attempt()
+
+
+def test_failed_probe_reopens_with_longer_backoff():
+    breaker = CircuitBreaker(
+        "test", failure_threshold=1, base_backoff_secs=0, max_backoff_secs=60
+    )
+    breaker.record_failure()
+    breaker.before_attempt()
+    breaker._base_backoff_secs = 10
+    breaker.record_failure()
+    assert breaker.state == BreakerState.OPEN
+    # second trip in a row doubles the backoff, jitter keeps it above half of that
+    assert breaker.retry_in > 9
+    with pytest.raises(CircuitOpenError):
+        breaker.before_attempt()
+
+
+def test_abandoned_probe_lets_another_through():
+    breaker = CircuitBreaker("test", failure_threshold=1, base_backoff_secs=0)
+    breaker.record_failure()
+    breaker.before_attempt()
+    breaker.record_abandoned()
+    breaker.before_attempt()
+    assert breaker.state == BreakerState.HALF_OPEN
+
+
+def test_failures_while_open_keep_the_backoff():
+    breaker = CircuitBreaker("test", failure_threshold=2, base_backoff_secs=10)
+    # attempts started before the trip fail after it
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.state == BreakerState.OPEN
+    assert breaker._trips == 1
+    assert breaker.retry_in <= 10
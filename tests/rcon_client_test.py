@@ -0,0 +1,35 @@
+import asyncio
+from rcon.fake_server import FakeMordhauServer, LoadProfile
+from rcon.rcon import RconClient
+
+
+def test_pipelined_batch_stays_within_max_in_flight():
+    async def main():
+        server = FakeMordhauServer("secret", LoadProfile(rate_multiplier=0))
+        await server.start("127.0.0.1", 0)
+        client = RconClient(pipelined=True, max_in_flight=2)
+        client._address = "127.0.0.1"
+        client._port = server.port
+        client._password = "secret"
+        try:
+            await client.authenticate()
+            in_flight_at_writes: list[int] = []
+            write = client._writer.write
+
+            def counting_write(data):
+                in_flight_at_writes.append(client.in_flight)
+                write(data)
+
+            client._writer.write = counting_write  # type: ignore
+            results = await client.execute_many(["info"] * 5)
+            return (results, in_flight_at_writes, client._in_flight._value)
+        finally:
+            await client.close()
+            await server.stop()
+
+    (results, in_flight_at_writes, free_slots) = asyncio.run(main())
+    assert all(
+        isinstance(result, str) and result.startswith("HostName") for result in results
+    )
+    assert in_flight_at_writes == [2, 2, 1]
+    assert free_slots == 2
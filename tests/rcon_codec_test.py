@@ -0,0 +1,48 @@
+import struct
+from rcon import codec
+
+
+def legacy_pack(pkt_id: int, pkt_type: int, body: str) -> bytes:
+    body_bytes = body.encode("utf-8")
+    return struct.pack(
+        "<3i{0}s".format(len(body_bytes) + 2),
+        len(body_bytes) + 10,
+        pkt_id,
+        pkt_type,
+        body_bytes,
+    )
+
+
+def test_encode_packet_matches_legacy_layout():
+    encoded = codec.encode_packet(12, 2, "say hello")
+    assert encoded == legacy_pack(12, 2, "say hello")
+
+
+def test_encode_packet_sizes_by_utf8_bytes():
+    encoded = codec.encode_packet(1, 2, "say olá")
+    (pkt_size, _, _) = codec.decode_header(encoded)
+    assert pkt_size == len("say olá".encode("utf-8")) + 10
+    assert len(encoded) == pkt_size + 4
+
+
+def test_decode_packet_roundtrip():
+    encoded = codec.encode_packet(7, 0, "MatchState: In progress")
+    assert codec.decode_packet(encoded) == (7, 0, "MatchState: In progress")
+
+
+def test_decode_body_from_memoryview():
+    encoded = codec.encode_packet(3, 0, "Chat: ABC, name, (ALL) hi  ")
+    view = memoryview(encoded)
+    (_, pkt_id, pkt_type) = codec.decode_header(view)
+    header_size = codec.HEADER_SIZE
+    body = codec.decode_body(view[header_size:])
+    assert (pkt_id, pkt_type) == (3, 0)
+    assert body == "Chat: ABC, name, (ALL) hi"
+
+
+def test_encode_packets_concatenates_in_order():
+    packets = [(1, 2, "info"), (2, 2, "playerlist")]
+    encoded = codec.encode_packets(packets)
+    assert encoded == codec.encode_packet(1, 2, "info") + codec.encode_packet(
+        2, 2, "playerlist"
+    )
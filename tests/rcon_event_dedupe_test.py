@@ -0,0 +1,37 @@
+from rcon.event_dedupe import EventDeduplicator
+
+
+def test_delivers_each_copy_once():
+    dedupe = EventDeduplicator()
+    assert dedupe.accept(0, "Login: a", 0)
+    assert not dedupe.accept(1, "Login: a", 0.1)
+    assert dedupe.accept(1, "Login: b", 0.2)
+    assert not dedupe.accept(0, "Login: b", 0.3)
+    assert dedupe.duplicates == 2
+
+
+def test_repeated_lines_all_make_it():
+    dedupe = EventDeduplicator()
+    assert dedupe.accept(0, "Chat: gg", 0)
+    assert dedupe.accept(0, "Chat: gg", 0.1)
+    assert not dedupe.accept(1, "Chat: gg", 0.2)
+    assert not dedupe.accept(1, "Chat: gg", 0.3)
+    assert dedupe.accept(0, "Chat: gg", 0.4)
+
+
+def test_one_source_keeps_going_when_the_other_drops():
+    dedupe = EventDeduplicator()
+    for index in range(3):
+        assert dedupe.accept(0, f"Killfeed: {index}", index)
+        assert not dedupe.accept(1, f"Killfeed: {index}", index)
+    for index in range(3, 6):
+        assert dedupe.accept(1, f"Killfeed: {index}", index)
+
+
+def test_forgets_lines_outside_window():
+    dedupe = EventDeduplicator(window_secs=5)
+    assert dedupe.accept(0, "Chat: gg", 0)
+    assert dedupe.accept(0, "Chat: hi", 4)
+    assert len(dedupe) == 2
+    assert dedupe.accept(1, "Chat: gg", 6)
+    assert len(dedupe) == 2
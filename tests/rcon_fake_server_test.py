@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from common.parsers import parse_killfeed_event
+from rcon.codec import encode_packet
+from rcon.fake_server import FakeMordhauServer, LoadProfile
+from rcon.framing import RconFrameReader, RconPacket
+
+
+def run_against_server(profile: LoadProfile, session):
+    async def main():
+        server = FakeMordhauServer("secret", profile)
+        await server.start("127.0.0.1", 0)
+        try:
+            (reader, writer) = await asyncio.open_connection("127.0.0.1", server.port)
+            frames = RconFrameReader(reader)
+            writer.write(encode_packet(1, 3, "secret"))
+            auth = await frames.read_packet()
+            assert auth.pkt_id == 1
+            result = await session(server, writer, frames)
+            writer.close()
+            return result
+        finally:
+            await server.stop()
+
+    return asyncio.run(main())
+
+
+def test_large_playerlist_is_split_and_reassembled():
+    profile = LoadProfile(players=200, latency_ms=0, jitter_ms=0, rate_multiplier=0)
+
+    async def session(server: FakeMordhauServer, writer, frames: RconFrameReader):
+        writer.write(encode_packet(5, 2, "playerlist"))
+        response = await frames.read_response()
+        return (server.playerlist().count("\n"), response)
+
+    (expected_newlines, response) = run_against_server(profile, session)
+    assert response.pkt_id == 5
+    assert response.body.count("\n") == expected_newlines
+    assert len(response.body.encode("utf-8")) > 4096
+
+
+def test_listen_streams_parseable_killfeed():
+    profile = LoadProfile(
+        players=10, killfeed_per_sec=200, latency_ms=0, jitter_ms=0, chat_per_sec=0
+    )
+
+    async def session(_, writer, frames: RconFrameReader) -> list[RconPacket]:
+        writer.write(encode_packet(2, 2, "listen killfeed"))
+        ack = await frames.read_packet()
+        assert ack.pkt_id == 2
+        return [await frames.read_packet() for _ in range(5)]
+
+    events = run_against_server(profile, session)
+    parsed = [parse_killfeed_event(event.body) for event in events]
+    assert all(event is not None for event in parsed)
+
+
+def test_matchstate_interval_must_be_positive():
+    with pytest.raises(ValueError):
+        FakeMordhauServer("secret", LoadProfile(matchstate_interval_secs=0))
@@ -0,0 +1,71 @@
+import asyncio
+import struct
+import pytest
+from rcon.framing import RconFrameReader, RconPacket, MAX_FRAGMENT_SIZE
+
+
+def make_frame(pkt_id: int, pkt_type: int, body: bytes) -> bytes:
+    return struct.pack("<3i", len(body) + 10, pkt_id, pkt_type) + body + b"\x00\x00"
+
+
+def run_reader(chunks: list[bytes], eof: bool, read):
+    async def main():
+        reader = asyncio.StreamReader()
+        frames = RconFrameReader(reader)
+
+        async def feed():
+            for chunk in chunks:
+                await asyncio.sleep(0)
+                reader.feed_data(chunk)
+            if eof:
+                reader.feed_eof()
+
+        feeder = asyncio.create_task(feed())
+        try:
+            return await read(frames)
+        finally:
+            await feeder
+
+    return asyncio.run(main())
+
+
+def test_reads_packet_split_across_segments():
+    frame = make_frame(7, 0, b"Killfeed: hello")
+    chunks = [frame[:3], frame[3:14], frame[14:]]
+    packet = run_reader(chunks, False, lambda f: f.read_packet())
+    assert packet.pkt_id == 7
+    assert packet.body == "Killfeed: hello"
+
+
+def test_reassembles_multi_packet_response():
+    first_body = b"a" * (MAX_FRAGMENT_SIZE - 10)
+    second_body = b"b" * 100
+    chunks = [make_frame(3, 0, first_body), make_frame(3, 0, second_body)]
+    packet = run_reader(chunks, False, lambda f: f.read_response())
+    assert packet.pkt_id == 3
+    assert packet.body == ("a" * (MAX_FRAGMENT_SIZE - 10)) + ("b" * 100)
+
+
+def test_keeps_foreign_packet_after_full_fragment():
+    first_body = b"a" * (MAX_FRAGMENT_SIZE - 10)
+    chunks = [make_frame(3, 0, first_body), make_frame(4, 0, b"next")]
+
+    async def read(frames: RconFrameReader) -> list[RconPacket]:
+        return [await frames.read_response(), await frames.read_packet()]
+
+    (first, second) = run_reader(chunks, False, read)
+    assert first.pkt_id == 3
+    assert len(first.body) == MAX_FRAGMENT_SIZE - 10
+    assert second.pkt_id == 4
+    assert second.body == "next"
+
+
+def test_raises_on_eof():
+    frame = make_frame(1, 0, b"cut short")
+    with pytest.raises(ConnectionError):
+        run_reader([frame[:16]], True, lambda f: f.read_packet())
+
+
+def test_raises_on_malformed_size():
+    with pytest.raises(ValueError):
+        run_reader([struct.pack("<3i", 2, 1, 0)], False, lambda f: f.read_packet())
@@ -0,0 +1,50 @@
+import asyncio
+from rcon.ingest_queue import IngestQueue, OverflowPolicy
+
+
+def drain(queue: IngestQueue) -> list[str]:
+    async def main():
+        return [await queue.get() for _ in range(queue.depth)]
+
+    return asyncio.run(main())
+
+
+def test_drop_oldest_keeps_newest_lines():
+    queue = IngestQueue(2, OverflowPolicy.DROP_OLDEST)
+    for line in ["Chat: 1", "Login: 2", "Killfeed: 3"]:
+        assert queue.put_nowait(line)
+    assert drain(queue) == ["Login: 2", "Killfeed: 3"]
+    assert queue.dropped == {"Chat": 1}
+
+
+def test_drop_by_type_evicts_most_droppable_first():
+    queue = IngestQueue(3, OverflowPolicy.DROP_BY_TYPE, ("Chat", "Killfeed"))
+    for line in ["Login: 1", "Killfeed: 2", "Chat: 3"]:
+        queue.put_nowait(line)
+    assert queue.put_nowait("MatchState: 4")
+    assert queue.put_nowait("Login: 5")
+    assert drain(queue) == ["Login: 1", "MatchState: 4", "Login: 5"]
+    assert queue.dropped == {"Chat": 1, "Killfeed": 1}
+
+
+def test_drop_by_type_drops_incoming_when_more_droppable():
+    queue = IngestQueue(1, OverflowPolicy.DROP_BY_TYPE, ("Chat",))
+    queue.put_nowait("Login: 1")
+    assert not queue.put_nowait("Chat: 2")
+    assert drain(queue) == ["Login: 1"]
+    assert queue.dropped == {"Chat": 1}
+
+
+def test_block_waits_for_room():
+    async def main():
+        queue = IngestQueue(1, OverflowPolicy.BLOCK)
+        await queue.put("Chat: 1")
+        blocked = asyncio.create_task(queue.put("Chat: 2"))
+        await asyncio.sleep(0)
+        assert not blocked.done()
+        assert await queue.get() == "Chat: 1"
+        assert await blocked
+        assert await queue.get() == "Chat: 2"
+        assert queue.high_watermark == 1
+
+    asyncio.run(main())
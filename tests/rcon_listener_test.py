@@ -0,0 +1,55 @@
+import asyncio
+import time
+from common.metrics import METRICS
+from rcon.event_journal import LINE_RECEIVED_AT
+from rcon.framing import RconPacket
+from rcon.ingest_queue import OverflowPolicy
+from rcon.rcon_listener import RconListener
+
+
+def test_full_blocking_queue_does_not_hold_up_responses():
+    async def main():
+        listener = RconListener(queue_size=1, overflow_policy=OverflowPolicy.BLOCK)
+        await listener.on_unsolicited(RconPacket(0, 0, "Chat: 1"))
+        assert listener.backed_up
+        # a command waits on the socket, the router must move on
+        listener._pending[1] = asyncio.get_running_loop().create_future()
+        await asyncio.wait_for(listener.on_unsolicited(RconPacket(0, 0, "Chat: 2")), 1)
+        return listener
+
+    listener = asyncio.run(main())
+    assert listener.queue_depth == 1
+    assert listener.dropped == {"Chat": 1}
+
+
+def test_subscribers_see_when_the_line_was_received():
+    async def main():
+        listener = RconListener()
+        seen: list[float | None] = []
+        listener.subscribe(lambda _: seen.append(LINE_RECEIVED_AT.get()))
+        before = time.time()
+        await listener.on_unsolicited(RconPacket(0, 0, "Killfeed: 1"))
+        dispatcher = asyncio.create_task(listener._dispatch_events())
+        await asyncio.sleep(0.01)
+        dispatcher.cancel()
+        return (before, seen)
+
+    (before, seen) = asyncio.run(main())
+    assert len(seen) == 1
+    assert seen[0] is not None and seen[0] >= before
+    assert LINE_RECEIVED_AT.get() is None
+
+
+def test_depth_gauge_reads_zero_once_caught_up():
+    async def main():
+        listener = RconListener()
+        depth_gauge = f"rcon.listener.{listener._metrics_name}.depth"
+        METRICS.set_gauge(depth_gauge, 7)
+        for index in range(3):
+            await listener.on_unsolicited(RconPacket(0, 0, f"Chat: {index}"))
+        dispatcher = asyncio.create_task(listener._dispatch_events())
+        await asyncio.sleep(0.01)
+        dispatcher.cancel()
+        return METRICS.snapshot()["gauges"][depth_gauge]
+
+    assert asyncio.run(main()) == 0
@@ -0,0 +1,124 @@
+import asyncio
+from rcon.rcon_pool import RconConnectionPool, RconPriority
+
+
+class FakeClient:
+    def __init__(self, client_id: int) -> None:
+        self.id = client_id
+        self.age = 0
+        self.age_since_used = 0
+
+    async def authenticate(self):
+        await asyncio.sleep(0.01)
+
+    async def close(self):
+        pass
+
+
+class FakeClientPool(RconConnectionPool):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.opened = 0
+
+    def _new_client(self):
+        self.opened += 1
+        return FakeClient(self.opened)  # type: ignore
+
+
+def test_connections_being_opened_count_against_their_lane():
+    async def main():
+        pool = FakeClientPool(3)
+        background = [
+            asyncio.create_task(pool.get_client(RconPriority.BACKGROUND))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        interactive = await asyncio.wait_for(
+            pool.get_client(RconPriority.INTERACTIVE), 1
+        )
+        await asyncio.sleep(0.05)
+        leased = [task for task in background if task.done()]
+        waiting = [task for task in background if not task.done()]
+        for task in waiting:
+            task.cancel()
+        await asyncio.gather(*waiting, return_exceptions=True)
+        return (interactive, len(leased), len(waiting), pool.opened)
+
+    (interactive, leased, waiting, opened) = asyncio.run(main())
+    assert interactive is not None
+    # the background lane may hold half of the pool, one connection out of three
+    assert leased == 1
+    assert waiting == 2
+    assert opened == 2
+
+
+def test_cancelled_open_frees_its_lane():
+    async def main():
+        pool = FakeClientPool(3)
+        opening = asyncio.create_task(pool.get_client(RconPriority.BACKGROUND))
+        await asyncio.sleep(0)
+        opening.cancel()
+        await asyncio.gather(opening, return_exceptions=True)
+        client = await asyncio.wait_for(pool.get_client(RconPriority.BACKGROUND), 1)
+        return (client, pool._reserved[RconPriority.BACKGROUND], pool._pending)
+
+    (client, reserved, pending) = asyncio.run(main())
+    assert client is not None
+    assert reserved == 0
+    assert pending == 0
+
+
+class FakeListener(FakeClient):
+    pipelined = True
+    routing = True
+    backed_up = False
+
+
+def test_listener_slots_are_shared_out_by_lane():
+    async def main():
+        pool = FakeClientPool(3)
+        listener = FakeListener(0)
+        pool.attach_listener(listener, max_in_flight=2)  # type: ignore
+        background = await pool.get_client(RconPriority.BACKGROUND)
+        gameplay = await pool.get_client(RconPriority.GAMEPLAY)
+        interactive = await pool.get_client(RconPriority.INTERACTIVE)
+        await pool.release_client(interactive, RconPriority.INTERACTIVE)
+        listener.backed_up = True
+        backed_up = await pool.get_client(RconPriority.INTERACTIVE)
+        return (listener, background, gameplay, interactive, backed_up)
+
+    (listener, background, gameplay, interactive, backed_up) = asyncio.run(main())
+    assert background is listener
+    # the other slot stays for interactive callers
+    assert gameplay is not listener
+    assert interactive is listener
+    assert backed_up is not listener
+
+
+def test_release_drops_the_lane_it_was_leased_with():
+    async def main():
+        pool = FakeClientPool(1, max_in_flight=2)
+        background = await pool.get_client(RconPriority.BACKGROUND)
+        interactive = await pool.get_client(RconPriority.INTERACTIVE)
+        await pool.release_client(background, RconPriority.BACKGROUND)
+        return (background, interactive, +pool._held)
+
+    (background, interactive, held) = asyncio.run(main())
+    # both share the one pipelined connection
+    assert background is interactive
+    assert held == {RconPriority.INTERACTIVE: 1}
+
+
+def test_listener_release_drops_the_lane_it_was_leased_with():
+    async def main():
+        pool = FakeClientPool(3)
+        listener = FakeListener(0)
+        pool.attach_listener(listener, max_in_flight=4)  # type: ignore
+        background = await pool.get_client(RconPriority.BACKGROUND)
+        interactive = await pool.get_client(RconPriority.INTERACTIVE)
+        await pool.release_client(background, RconPriority.BACKGROUND)
+        return (listener, background, interactive, pool._listener_leases)
+
+    (listener, background, interactive, leases) = asyncio.run(main())
+    assert background is interactive is listener
+    assert leases == [RconPriority.INTERACTIVE]